@@ -0,0 +1,230 @@
+"""
+Compressed, content-addressed store for the HTML pages and screenshots a crawl saves.
+
+Each run keeps its artifacts in ``artifacts/`` inside its run folder:
+
+- ``objects/<hash>.html.zst`` (or ``.html.gz`` without the zstandard package) and
+  ``objects/<hash>.png``, named by the SHA-256 of their contents, so a page saved
+  twice (or the same page in two places) is stored once
+- ``index.jsonl``, one line per saved artifact: its name (e.g. ``combase_page_3.html``),
+  kind, hash, size and whether it was saved because of an error
+
+The capture level decides what is saved: ``full`` (every page and screenshot),
+``errors`` (only pages and screenshots of failures) or ``none``. Artifacts a
+level leaves out are not even fetched from the browser. Compressing and writing
+happen on a background thread, so the crawl never waits for the disk.
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+from download_manager import DEFAULT_EXPORTS_ROOT
+from page_snapshot import PageSnapshot
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CAPTURE_LEVELS = ['none', 'errors', 'full']
+DEFAULT_CAPTURE = 'full'
+
+# Folder in each run folder
+ARTIFACTS_DIR = 'artifacts'
+INDEX_NAME = 'index.jsonl'
+
+_PAGE_NAME = re.compile(r'^combase_page_(\d+)\.html$')
+
+
+def _compress(data):
+    """Compress HTML with zstd when available, gzip otherwise; returns (bytes, file suffix)."""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=9).compress(data), '.zst'
+    return gzip.compress(data, compresslevel=6), '.gz'
+
+
+def _decompress(data, object_name):
+    if object_name.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {object_name} requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if object_name.endswith('.gz'):
+        return gzip.decompress(data)
+    return data
+
+
+class ArtifactStore:
+    """
+    Saves crawl artifacts compressed and deduplicated, on a background writer thread.
+
+    Args:
+        directory (str or None): Folder for the objects and the index; None saves nothing
+        level (str): Capture level: none, errors or full
+    """
+
+    def __init__(self, directory, level=DEFAULT_CAPTURE):
+        if level not in CAPTURE_LEVELS:
+            raise ValueError(f"Unknown capture level '{level}'. Choose from: {', '.join(CAPTURE_LEVELS)}")
+        self.directory = directory
+        self.level = level if directory else 'none'
+        self.saved = 0
+        self.duplicates = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._known = set()
+        if self.level != 'none':
+            self.objects_dir = os.path.join(directory, 'objects')
+            os.makedirs(self.objects_dir, exist_ok=True)
+            self._known = set(os.listdir(self.objects_dir))
+            self._thread = threading.Thread(target=self._write_loop, name='artifact-writer', daemon=True)
+            self._thread.start()
+
+    def wants(self, error=False):
+        """Whether an artifact (of a failure, when ``error``) is saved at this capture level."""
+        return self.level == 'full' or (self.level == 'errors' and error)
+
+    def save_html(self, name, html, error=False):
+        """Queue a page's HTML to be saved under ``name``."""
+        if html is not None and self.wants(error):
+            self._queue.put((name, 'html', html.encode('utf-8'), error))
+
+    def save_page(self, driver, name, error=False, profile=None):
+        """Fetch the page a browser shows and queue it, only if the capture level keeps it."""
+        if self.wants(error):
+            self.save_html(name, PageSnapshot.capture(driver, profile).html, error)
+
+    def save_screenshot(self, driver, name, error=False):
+        """Take a screenshot and queue it, only if the capture level keeps it."""
+        if self.wants(error):
+            self._queue.put((name, 'png', driver.get_screenshot_as_png(), error))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"Could not save artifact {item[0]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, kind, data, error):
+        digest = hashlib.sha256(data).hexdigest()
+        if kind == 'html':
+            existing = next((f"{digest}.html{suffix}" for suffix in ('.zst', '.gz')
+                             if f"{digest}.html{suffix}" in self._known), None)
+        else:
+            existing = f"{digest}.png" if f"{digest}.png" in self._known else None
+        self.raw_bytes += len(data)
+        if existing:
+            object_name = existing
+            self.duplicates += 1
+        else:
+            # PNG screenshots are compressed already
+            stored, suffix = _compress(data) if kind == 'html' else (data, '')
+            object_name = f"{digest}.{kind}{suffix}"
+            tmp_path = os.path.join(self.objects_dir, f".{object_name}.tmp")
+            with open(tmp_path, 'wb') as file:
+                file.write(stored)
+            os.replace(tmp_path, os.path.join(self.objects_dir, object_name))
+            self._known.add(object_name)
+            self.stored_bytes += len(stored)
+        entry = {'name': name, 'kind': kind, 'object': object_name, 'bytes': len(data), 'error': error,
+                 'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(os.path.join(self.directory, INDEX_NAME), 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+        self.saved += 1
+
+    def close(self):
+        """Wait for queued artifacts to be written and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.saved:
+            print(f"Saved {self.saved} artifacts in {self.directory} "
+                  f"({self.raw_bytes / 1e6:.2f} MB as {self.stored_bytes / 1e6:.2f} MB, "
+                  f"{self.duplicates} already stored)")
+
+
+def read_index(directory):
+    """
+    Return the latest index entry for each artifact name in a store.
+
+    Returns:
+        dict: Artifact name to its index entry
+    """
+    entries = {}
+    index_path = os.path.join(directory, INDEX_NAME)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry['name']] = entry
+    return entries
+
+
+def read_artifact(directory, entry):
+    """Return the contents of an artifact, decompressed."""
+    with open(os.path.join(directory, 'objects', entry['object']), 'rb') as file:
+        return _decompress(file.read(), entry['object'])
+
+
+def stored_pages(directory):
+    """
+    Return the results pages saved in a store, in page order.
+
+    Args:
+        directory (str): A run folder, or its artifacts folder
+
+    Returns:
+        list: (name, html) pairs for every saved ``combase_page_N.html``
+    """
+    if os.path.isdir(os.path.join(directory, ARTIFACTS_DIR)):
+        directory = os.path.join(directory, ARTIFACTS_DIR)
+    pages = []
+    for name, entry in read_index(directory).items():
+        match = _PAGE_NAME.match(name)
+        if match:
+            pages.append((int(match.group(1)), name, entry))
+    return [(name, read_artifact(directory, entry).decode('utf-8')) for _, name, entry in sorted(pages)]
+
+
+def is_archived_run(path):
+    """Whether a path is a run folder with archived artifacts, or an artifacts folder itself."""
+    if os.path.basename(os.path.normpath(path)) == ARTIFACTS_DIR:
+        return os.path.isdir(path)
+    return os.path.isdir(os.path.join(path, ARTIFACTS_DIR))
+
+
+def find_archived_run(export_root=DEFAULT_EXPORTS_ROOT):
+    """
+    Return the most recent folder under an exports folder whose crawl archived results pages.
+
+    Run folders of a single crawl hold their own artifacts; a batch run keeps
+    them in one folder per query, which are searched as well.
+
+    Returns:
+        str or None: The run (or query) folder, for ``stored_pages``
+    """
+    indexes = (glob.glob(os.path.join(export_root, 'run_*', ARTIFACTS_DIR, INDEX_NAME))
+               + glob.glob(os.path.join(export_root, 'run_*', '*', ARTIFACTS_DIR, INDEX_NAME)))
+    for index_path in sorted(indexes, key=os.path.getmtime, reverse=True):
+        run_directory = os.path.dirname(os.path.dirname(index_path))
+        if any(_PAGE_NAME.match(name) for name in read_index(os.path.dirname(index_path))):
+            return run_directory
+    return None
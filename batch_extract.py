@@ -0,0 +1,222 @@
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from artifact_store import is_archived_run, stored_pages
+from record_extractor import page_records, write_records
+from source_extractor import extract_page
+from source_dedup import make_deduplicator
+from source_store import SourceStore
+from sources_sink import SourcesSink
+
+HTML_EXTENSIONS = ('.html', '.htm')
+
+# Older crawls saved the first results page twice, also as combase_search_results.html
+FIRST_PAGE_COPY = 'combase_search_results.html'
+FIRST_PAGE = 'combase_page_1.html'
+_PAGE_NUMBER = re.compile(r'page_(\d+)')
+
+
+def _natural_key(text):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', text)]
+
+
+def page_order_key(path):
+    """
+    Sort key that keeps each directory's pages together, in page order.
+
+    Directories sort naturally (run_2 before run_10), and within one
+    combase_page_2.html comes before combase_page_10.html; files without a page
+    number follow the numbered ones by name.
+    """
+    directory, name = os.path.split(path)
+    page_number = _PAGE_NUMBER.search(name)
+    return (_natural_key(directory), page_number is None, int(page_number.group(1)) if page_number else 0,
+            _natural_key(name))
+
+
+def collect_html_files(patterns):
+    """
+    Expand directories and glob patterns into a list of saved HTML files.
+
+    Args:
+        patterns (list): Directories, glob patterns (``**`` is supported) or file paths
+
+    A ``combase_search_results.html`` next to a ``combase_page_1.html`` is left
+    out, since it is the same first page saved again.
+
+    Returns:
+        list: Unique file paths in deterministic page order
+    """
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                for name in names:
+                    if name.lower().endswith(HTML_EXTENSIONS):
+                        files.add(os.path.join(root, name))
+        else:
+            for path in glob.glob(pattern, recursive=True):
+                if os.path.isfile(path):
+                    files.add(path)
+    files = {path for path in files if os.path.basename(path) != FIRST_PAGE_COPY
+             or os.path.join(os.path.dirname(path), FIRST_PAGE) not in files}
+    return sorted(files, key=page_order_key)
+
+
+def _extract_chunk(paths, parser_backend, records=False):
+    """Worker task: extract sources (or summary records) from a chunk of files."""
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                html_content = file.read()
+            if records:
+                results.append((path, page_records(html_content, parser_backend), None))
+            else:
+                results.append((path, extract_page(html_content, parser_backend).sources, None))
+        except Exception as e:
+            results.append((path, None if records else [], str(e)))
+    return results
+
+
+def iter_extracted_files(paths, workers=None, parser_backend=None, chunk_size=8, records=False):
+    """
+    Extract sources from many HTML files across a process pool.
+
+    Results are yielded in the order of ``paths`` as soon as each file and every
+    file before it has been parsed, so callers can stream them to disk while the
+    remaining chunks are still being processed.
+
+    Args:
+        paths (list): HTML files in the order results should be merged
+        workers (int, optional): Number of worker processes (default: CPU count).
+            With 1 worker the files are parsed in this process.
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        chunk_size (int): Number of files handed to a worker per task
+        records (bool): Extract each page's summary records as a DataFrame instead of its sources
+
+    Yields:
+        tuple: (path, sources or records, error) where error is None on success
+    """
+    chunk_size = max(1, chunk_size)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _extract_chunk(chunk, parser_backend, records)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of chunks in flight so memory stays flat for large archives
+        max_in_flight = workers * 2
+        pending = {}
+        next_to_submit = 0
+        for index in range(len(chunks)):
+            while next_to_submit < len(chunks) and next_to_submit < index + max_in_flight:
+                pending[next_to_submit] = executor.submit(_extract_chunk, chunks[next_to_submit], parser_backend,
+                                                          records)
+                next_to_submit += 1
+            yield from pending.pop(index).result()
+
+
+def batch_extract_sources(patterns, output_file='combase_sources.txt', workers=None, parser_backend=None,
+                          chunk_size=8, dedupe=None, store=None):
+    """
+    Extract sources from every HTML file matching the given directories or globs.
+
+    Args:
+        patterns (list): Directories, glob patterns or file paths
+        output_file (str): Path to the output file (overwritten)
+        workers (int, optional): Number of worker processes (default: CPU count)
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        chunk_size (int): Number of files handed to a worker per task
+        dedupe (str, optional): Deduplication mode (none, exact or normalized)
+        store (str, optional): Path to a SQLite sources database to also record sources in
+
+    Returns:
+        tuple: (number of sources written, paths of the files that could not be parsed)
+    """
+    html_files = collect_html_files(patterns)
+    if not html_files:
+        print("No HTML files matched the given paths.")
+        return 0, []
+
+    print(f"Extracting sources from {len(html_files)} HTML files with {workers or os.cpu_count()} workers...")
+    deduplicator = make_deduplicator(dedupe)
+    source_store = SourceStore(store) if store else None
+    failed = []
+    try:
+        with SourcesSink(output_file, truncate=True, deduplicator=deduplicator) as sink:
+            for path, sources, error in iter_extracted_files(html_files, workers, parser_backend, chunk_size):
+                if error:
+                    print(f"Error extracting sources from {path}: {error}")
+                    failed.append(path)
+                    continue
+                print(f"Found {len(sources)} sources in {path}")
+                sink.extend(sources)
+                if source_store:
+                    page_number = _PAGE_NUMBER.search(os.path.basename(path))
+                    source_store.add_sources(sources,
+                                             page_number=int(page_number.group(1)) if page_number else None)
+    finally:
+        if source_store:
+            source_store.close()
+
+    print(f"Extracted {sink.count} total sources and saved to {output_file}")
+    if deduplicator:
+        print(deduplicator.summary())
+    if failed:
+        print(f"{len(failed)} of {len(html_files)} files could not be parsed")
+    return sink.count, failed
+
+
+def batch_extract_records(patterns, output_file, formats, workers=None, parser_backend=None, chunk_size=8):
+    """
+    Extract the summary records of every results page in run folders, directories or globs.
+
+    A run folder's archived results pages are read from its artifacts; other
+    paths are expanded into saved HTML files, which are parsed across a process
+    pool. Each page becomes a DataFrame, and the pages are written in order as
+    one Data Records table.
+
+    Args:
+        patterns (list): Run folders, directories, glob patterns or file paths
+        output_file (str): Output file name; its extension (if a known format) is replaced per format
+        formats (list): Names from ``combined_output.OUTPUT_FORMATS``
+        workers (int, optional): Number of worker processes (default: CPU count)
+        parser_backend (str, optional): Parser backend; lxml is used when it is installed
+            unless another backend is named
+        chunk_size (int): Number of files handed to a worker per task
+
+    Returns:
+        int: Number of records written
+    """
+    frames = []
+    html_patterns = []
+    for pattern in patterns:
+        if is_archived_run(pattern):
+            for name, html_content in stored_pages(pattern):
+                frame = page_records(html_content, parser_backend)
+                print(f"Found {len(frame)} records in {name} of {pattern}")
+                frames.append(frame)
+        else:
+            html_patterns.append(pattern)
+    html_files = collect_html_files(html_patterns)
+    if html_files:
+        print(f"Extracting records from {len(html_files)} HTML files with {workers or os.cpu_count()} workers...")
+    for path, frame, error in iter_extracted_files(html_files, workers, parser_backend, chunk_size, records=True):
+        if error:
+            print(f"Error extracting records from {path}: {error}")
+            continue
+        print(f"Found {len(frame)} records in {path}")
+        frames.append(frame)
+    if not frames:
+        print("No results pages matched the given paths.")
+        return 0
+
+    count, outputs = write_records(frames, output_file, formats)
+    print(f"Extracted {count} records from {len(frames)} pages and saved them to {', '.join(outputs)}")
+    return count
@@ -0,0 +1,202 @@
+"""
+Batch search: crawl many ComBase queries with one login.
+
+A query is an organism plus optional search-page filters, written one per
+line as ``organism; field=value; field=value``. A filter's field is the id or
+name of an input on the search page (for example a temperature or pH range
+box); its value is typed into that input before the search is run. Blank
+lines and lines starting with ``#`` are ignored.
+
+Queries are handed out from a work queue to one or more logged-in sessions
+(browsers or HTTP sessions). Every query gets its own folder in the batch run
+folder for its exports and crawl checkpoint, and its own sources file, and is
+recorded in the sources database under its label. ``queries.json`` in the run
+folder lists what each query produced.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from crawl_checkpoint import CHECKPOINT_NAME, CrawlCheckpoint
+from download_manager import DownloadManager
+
+# One search: organism text and a tuple of (field, value) search-page filters
+SearchQuery = namedtuple('SearchQuery', ['organism', 'filters'])
+
+SUMMARY_NAME = 'queries.json'
+
+
+def parse_query(text):
+    """
+    Parse one ``organism; field=value; ...`` query.
+
+    Raises:
+        ValueError: If the organism is missing or a filter has no ``=``
+    """
+    parts = [part.strip() for part in text.split(';')]
+    organism = parts[0]
+    if not organism:
+        raise ValueError(f"Query '{text}' has no organism")
+    filters = []
+    for part in parts[1:]:
+        if not part:
+            continue
+        field, separator, value = part.partition('=')
+        if not separator or not field.strip():
+            raise ValueError(f"Filter '{part}' in query '{text}' should look like field=value")
+        filters.append((field.strip(), value.strip()))
+    return SearchQuery(organism, tuple(filters))
+
+
+def read_query_file(path):
+    """
+    Read queries from a file, one per line.
+
+    Returns:
+        list: SearchQuery tuples in file order
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                queries.append(parse_query(line))
+    return queries
+
+
+def query_label(query):
+    """Return the text a query is recorded under, e.g. ``listeria monocytogenes [temp=4]``."""
+    if not query.filters:
+        return query.organism
+    return f"{query.organism} [{', '.join(f'{field}={value}' for field, value in query.filters)}]"
+
+
+def query_slug(query):
+    """Return a file-name-safe name for a query; filtered queries get a short hash to stay distinct."""
+    slug = re.sub(r'[^a-z0-9]+', '_', query.organism.lower()).strip('_') or 'query'
+    if query.filters:
+        slug += '_' + hashlib.sha1(query_label(query).encode('utf-8')).hexdigest()[:8]
+    return slug
+
+
+def query_output_file(output_file, query):
+    """Return the sources file of one query, e.g. ``combase_sources_listeria_monocytogenes.txt``."""
+    stem, extension = os.path.splitext(output_file)
+    return f"{stem}_{query_slug(query)}{extension or '.txt'}"
+
+
+def run_batch(queries, run_directory, output_file, open_session, crawl_query, close_session, workers=1,
+              staging_root=None):
+    """
+    Crawl every query through a shared work queue.
+
+    ``open_session(index)`` returns a logged-in session for worker ``index``;
+    ``crawl_query(session, query, downloads, output_file, checkpoint)`` crawls one
+    query in it and returns True if every page was crawled; ``close_session``
+    releases the session when the queue is empty. A query whose folder already
+    holds a finished checkpoint is skipped, and an unfinished one is resumed, so
+    rerunning a batch in the same run folder only crawls what is left.
+
+    Args:
+        queries (list): SearchQuery tuples
+        run_directory (str): Batch run folder; each query gets a sub-folder
+        output_file (str): Sources file name, suffixed per query
+        open_session (callable): Creates the session for a worker index
+        crawl_query (callable): Crawls one query in a session
+        close_session (callable): Closes a session
+        workers (int): Number of sessions taking queries from the queue
+        staging_root (str, optional): Download staging folder shared by the batch's browsers
+
+    Returns:
+        dict: SearchQuery to True (completed), False (failed or incomplete)
+    """
+    queries = list(dict.fromkeys(queries))
+    work = queue.Queue()
+    for query in queries:
+        work.put(query)
+    results = {}
+    summary = {}
+    lock = threading.Lock()
+
+    def write_summary():
+        entries = [summary[query] for query in queries if query in summary]
+        tmp_path = os.path.join(run_directory, f"{SUMMARY_NAME}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, indent=2)
+        os.replace(tmp_path, os.path.join(run_directory, SUMMARY_NAME))
+
+    def crawl_one(session, query):
+        label = query_label(query)
+        directory = os.path.join(run_directory, query_slug(query))
+        checkpoint_path = os.path.join(directory, CHECKPOINT_NAME)
+        if os.path.exists(checkpoint_path):
+            checkpoint = CrawlCheckpoint.load(checkpoint_path)
+            if checkpoint.complete:
+                print(f"Query '{label}' was already crawled, skipping")
+                return True, checkpoint
+            checkpoint.restore_sources_file()
+            print(f"Resuming query '{label}' after page {checkpoint.last_page}")
+        else:
+            checkpoint = CrawlCheckpoint.for_run(directory, label, query_output_file(output_file, query))
+        downloads = DownloadManager(directory, staging_root=staging_root)
+        for page_number, export_path in checkpoint.exported_files.items():
+            if os.path.exists(export_path):
+                downloads.register(page_number, export_path)
+        print(f"\n=== Query '{label}' ===")
+        completed = crawl_query(session, query, downloads, checkpoint.output_file, checkpoint)
+        return completed, checkpoint
+
+    def run(index):
+        try:
+            session = open_session(index)
+        except Exception as e:
+            print(f"Session {index + 1} could not be opened: {e}")
+            return
+        try:
+            while True:
+                try:
+                    query = work.get_nowait()
+                except queue.Empty:
+                    return
+                checkpoint = None
+                try:
+                    completed, checkpoint = crawl_one(session, query)
+                except Exception as e:
+                    print(f"Query '{query_label(query)}' failed: {e}")
+                    completed = False
+                with lock:
+                    results[query] = completed
+                    summary[query] = {
+                        'query': query_label(query),
+                        'organism': query.organism,
+                        'filters': dict(query.filters),
+                        'directory': os.path.join(run_directory, query_slug(query)),
+                        'output_file': checkpoint.output_file if checkpoint else None,
+                        'pages': checkpoint.total_pages if checkpoint else None,
+                        'sources': checkpoint.source_count if checkpoint else None,
+                        'completed': completed,
+                    }
+                    write_summary()
+        finally:
+            close_session(session)
+
+    workers = max(1, min(workers, len(queries)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query') as executor:
+        for index in range(workers):
+            executor.submit(run, index)
+
+    # Queries left in the queue had no working session to run in
+    for query in queries:
+        results.setdefault(query, False)
+    failed = [query_label(query) for query in queries if not results[query]]
+    print(f"\nBatch finished: {len(queries) - len(failed)} of {len(queries)} queries completed")
+    if failed:
+        print(f"Incomplete queries: {'; '.join(failed)}")
+    print(f"Per-query results saved in {os.path.join(run_directory, SUMMARY_NAME)}")
+    return results
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the ComBase extraction tools.
+
+Each benchmark runs against synthetic data in a temporary directory, so no
+network access or ComBase account is needed. Run one benchmark by name:
+
+    python3 benchmarks.py sink
+    python3 benchmarks.py extract
+    python3 benchmarks.py dedupe
+    python3 benchmarks.py combine --files 300
+    python3 benchmarks.py pipeline --pages 50 --latency 0.05
+    python3 benchmarks.py page-load --pages 20 --asset-latency 0.05
+
+The pipeline benchmark crawls a local combase_stub_server.py end to end (login,
+search, every results page with its export, then combining the exports), also
+with larger results pages and batched exports. The
+page-load benchmark times each results page in Chrome per browsing mode.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+from openpyxl import Workbook, load_workbook
+
+from combase_stub_server import (STUB_PASSWORD, STUB_USERNAME, make_export_workbook, make_results_page, make_source,
+                                 start_stub_server)
+from crawl_profile import CrawlProfile
+from crawl_waits import CrawlWaits
+from download_manager import DownloadManager
+from excel_combiner import combine_exports
+from http_crawler import crawl_with_http
+from export_cache import ExportCache
+from lean_browsing import BROWSING_MODES, page_load_strategy
+from results_paging import DEFAULT_EXPORT_BATCH, DEFAULT_PAGE_SIZE, parse_page_size
+from source_dedup import SourceDeduplicator
+from source_extractor import available_backends, extract_page
+from sources_sink import SourcesSink
+
+
+def legacy_extract_sources(html_content):
+    """The original full-tree BeautifulSoup extraction, used as the reference output."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    return [span.text.strip() for span in soup.find_all('span', id=lambda x: x and x.startswith('lblSource'))]
+
+
+def print_table(headers, rows):
+    """Print a simple aligned results table."""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(value).ljust(w) for value, w in zip(row, widths)))
+
+
+def bench_sink(args):
+    """Per-append cost of SourcesSink as the output file grows."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for total in args.sizes:
+            output_file = os.path.join(tmp_dir, f'sources_{total}.txt')
+            page_size = args.page_size
+            # Time the last page separately to show the cost does not grow with file size
+            start = time.perf_counter()
+            with SourcesSink(output_file, truncate=True) as sink:
+                for page_start in range(0, total - page_size, page_size):
+                    sink.extend(make_source(i) for i in range(page_start, page_start + page_size))
+                last_start = time.perf_counter()
+                sink.extend(make_source(i) for i in range(max(0, total - page_size), total))
+                last_elapsed = time.perf_counter() - last_start
+            elapsed = time.perf_counter() - start
+            rows.append([
+                f"{total:,}",
+                f"{elapsed:.2f}",
+                f"{elapsed / total * 1e6:.2f}",
+                f"{last_elapsed / min(page_size, total) * 1e6:.2f}",
+                f"{os.path.getsize(output_file) / 1e6:.1f}",
+            ])
+    print_table(['sources', 'total s', 'us/append', 'us/append (last page)', 'file MB'], rows)
+
+
+def bench_extract(args):
+    """Throughput of each source extraction backend on synthetic results pages."""
+    pages = [make_results_page(page, args.pages, args.page_size) for page in range(1, args.pages + 1)]
+    total_bytes = sum(len(page.encode('utf-8')) for page in pages)
+    expected = [legacy_extract_sources(page) for page in pages]
+
+    candidates = [('legacy (full tree)', legacy_extract_sources)]
+    for backend in available_backends():
+        candidates.append((backend, lambda html, backend=backend: extract_page(html, backend).sources))
+
+    rows = []
+    for name, extract in candidates:
+        start = time.perf_counter()
+        results = [extract(page) for page in pages]
+        elapsed = time.perf_counter() - start
+        rows.append([
+            name,
+            f"{len(pages) / elapsed:.1f}",
+            f"{total_bytes / elapsed / 1e6:.2f}",
+            'yes' if results == expected else 'NO',
+        ])
+    print(f"{len(pages)} pages, {args.page_size} rows per page, {total_bytes / 1e6:.1f} MB of HTML")
+    print_table(['backend', 'pages/s', 'MB/s', 'same output'], rows)
+
+
+def legacy_dedupe(sources):
+    """The original list-based deduplication from extract_all_sources.py."""
+    unique_sources = []
+    for source in sources:
+        if source not in unique_sources:
+            unique_sources.append(source)
+    return unique_sources
+
+
+def bench_dedupe(args):
+    """Cost per source of ordered deduplication, showing linear growth."""
+    rows = []
+    for total in args.sizes:
+        # Roughly a third exact duplicates and a tenth citation-style variants
+        sources = []
+        for i in range(total):
+            if i % 3 == 0:
+                sources.append(make_source(i // 2))
+            elif i % 10 == 1:
+                sources.append(make_source(i // 2).upper().replace('. ', ', '))
+            else:
+                sources.append(make_source(i))
+
+        for mode in ('exact', 'normalized'):
+            deduplicator = SourceDeduplicator(mode, keep_unique=True)
+            start = time.perf_counter()
+            for source in sources:
+                deduplicator.add(source)
+            elapsed = time.perf_counter() - start
+            rows.append([f"{total:,}", mode, f"{elapsed:.2f}", f"{elapsed / total * 1e6:.2f}",
+                         deduplicator.kept, deduplicator.duplicates,
+                         deduplicator.near_duplicates if mode == 'normalized' else '-'])
+
+        if total <= args.legacy_limit:
+            start = time.perf_counter()
+            unique = legacy_dedupe(sources)
+            elapsed = time.perf_counter() - start
+            rows.append([f"{total:,}", 'legacy list', f"{elapsed:.2f}", f"{elapsed / total * 1e6:.2f}",
+                         len(unique), total - len(unique), '-'])
+    print_table(['sources', 'mode', 'total s', 'us/source', 'kept', 'duplicates', 'near-duplicates'], rows)
+
+
+def legacy_combine(excel_files, output_path):
+    """The original combine_excel_files: read every file into pandas, concatenate, write with openpyxl."""
+    data_records = []
+    logs = []
+    for file in excel_files:
+        xls = pd.ExcelFile(file)
+        if len(xls.sheet_names) >= 2:
+            data_records.append(pd.read_excel(xls, sheet_name=0))
+            logs.append(pd.read_excel(xls, sheet_name=1))
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        pd.concat(data_records, ignore_index=True).to_excel(writer, sheet_name='Data Records', index=False)
+        pd.concat(logs, ignore_index=True).to_excel(writer, sheet_name='Logs', index=False)
+
+
+def write_synthetic_exports(directory, files, rows_per_file):
+    """Write ComBaseExport workbooks; every tenth one has its Data Records columns in reverse order."""
+    paths = []
+    for index in range(files):
+        record_ids = [f"B{index * rows_per_file + row:06d}" for row in range(rows_per_file)]
+        path = os.path.join(directory, f"ComBaseExport_page_{index + 1:04d}.xlsx")
+        with open(path, 'wb') as file:
+            file.write(make_export_workbook(record_ids))
+        if index % 10 == 9:
+            source = load_workbook(path, read_only=True)
+            sheets = [list(sheet.iter_rows(values_only=True)) for sheet in source.worksheets]
+            source.close()
+            workbook = Workbook(write_only=True)
+            for name, rows in zip(('Data Records', 'Logs'), sheets):
+                sheet = workbook.create_sheet(name)
+                for row in rows:
+                    sheet.append(list(reversed(row)) if name == 'Data Records' else row)
+            workbook.save(path)
+        paths.append(path)
+    return paths
+
+
+def _timed_combine(method, excel_files, output_path, workers, results, cache_dir=None):
+    """Run one combine in a fresh process and report wall time and peak RSS in MB."""
+    start = time.perf_counter()
+    if method == 'legacy':
+        legacy_combine(excel_files, output_path)
+    else:
+        cache = ExportCache(cache_dir) if cache_dir else None
+        combine_exports(excel_files, output_path, workers=workers, verbose=False, cache=cache)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024))
+
+
+def bench_combine(args):
+    """
+    Wall time and peak memory of combining many exports: original pandas code vs streaming combiner.
+
+    The cached rows combine twice with a parse cache: once empty, then again after
+    touching every tenth export, which only has to re-hash those files.
+    """
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        excel_files = write_synthetic_exports(tmp_dir, args.files, args.page_size)
+        total_bytes = sum(os.path.getsize(path) for path in excel_files)
+        print(f"Wrote {len(excel_files)} exports ({total_bytes / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+        candidates = [('legacy pandas', 'legacy', None)]
+        for workers in sorted(set([1, os.cpu_count() or 1])):
+            candidates.append((f"streaming, {workers} worker{'s' if workers > 1 else ''}", 'streaming', workers))
+        candidates.append(('cached, first run', 'cached', None))
+        candidates.append(('cached, 10% touched', 'cached', None))
+        cache_dir = os.path.join(tmp_dir, 'cache')
+
+        rows = []
+        outputs = []
+        for name, method, workers in candidates:
+            if name == 'cached, 10% touched':
+                for path in excel_files[::10]:
+                    os.utime(path)
+            output_path = os.path.join(tmp_dir, f"combined_{len(outputs)}.xlsx")
+            results = context.Queue()
+            # Each combine runs in its own process so peak RSS is measured separately
+            process = context.Process(target=_timed_combine,
+                                      args=(method, excel_files, output_path, workers, results,
+                                            cache_dir if method == 'cached' else None))
+            process.start()
+            elapsed, peak_rss, worker_rss = results.get()
+            process.join()
+            outputs.append(output_path)
+            rows.append([name, f"{elapsed:.1f}", f"{len(excel_files) / elapsed:.1f}", f"{peak_rss:.0f}",
+                         f"{worker_rss:.0f}" if workers and workers > 1 else '-'])
+
+        expected = pd.read_excel(outputs[0], sheet_name=None)
+        for row, output_path in zip(rows, outputs):
+            combined = pd.read_excel(output_path, sheet_name=None)
+            same = (list(combined) == list(expected)
+                    and all(combined[sheet].equals(expected[sheet]) for sheet in expected))
+            row.append('yes' if same else 'NO')
+    print_table(['method', 'wall s', 'files/s', 'peak RSS MB', 'worker RSS MB', 'same output'], rows)
+
+
+def _crawl_stub(engine, server, run_directory, output_file, crawl_workers, profile, page_size, export_batch):
+    """Crawl the stub server with one engine and return True if every page was crawled."""
+    downloads = DownloadManager(run_directory)
+    if engine == 'http':
+        return crawl_with_http(STUB_USERNAME, STUB_PASSWORD, output_file=output_file, base_url=server.base_url,
+                               downloads=downloads, workers=crawl_workers, rate_limit=0, profile=profile,
+                               page_size=page_size, export_batch=export_batch)
+    # Imported here so the other benchmarks do not need Selenium and Chrome
+    from crawl_options import CrawlOptions
+    from ntu_fresh_selenium_bs import login_to_combase
+    options = CrawlOptions(output_file=output_file, headless=True, base_url=server.base_url, workers=crawl_workers,
+                           rate_limit=0, page_size=page_size, export_batch=export_batch)
+    driver = login_to_combase(STUB_USERNAME, STUB_PASSWORD, options, downloads=downloads, profile=profile)
+    if driver is None:
+        return False
+    driver.quit()
+    return True
+
+
+def bench_pipeline(args):
+    """
+    Pages per second of a full crawl against the local stand-in server, per engine and number of workers.
+
+    Every run logs in, searches, saves, parses and exports every results page,
+    then combines the exports, with the stand-in answering after ``--latency``
+    seconds (plus ``--export-latency`` for exports). The stand-in serves
+    ``--pages`` pages of ``--page-size`` records until the crawler picks another
+    page size (``--crawl-page-sizes``), and keeps selections across pages, so
+    ``--export-batches`` larger than 1 export several pages at once; pages/s
+    counts the stand-in's ``--pages``. The stage timings of each run are printed
+    after the table, and saved with ``--profile-dir``.
+    """
+    server = start_stub_server(pages=args.pages, rows_per_page=args.page_size, latency=args.latency,
+                               export_latency=args.export_latency, keep_selection=True)
+    expected_sources = args.pages * args.page_size
+    print(f"Stand-in server at {server.base_url}: {args.pages} pages of {args.page_size} records, "
+          f"{args.latency * 1000:.0f} ms latency, {args.export_latency * 1000:.0f} ms extra per export")
+    rows = []
+    profiles = []
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            runs = [(engine, crawl_workers, page_size, export_batch) for engine in args.engines
+                    for crawl_workers in args.crawl_workers for page_size in args.crawl_page_sizes
+                    for export_batch in args.export_batches]
+            for engine, crawl_workers, page_size, export_batch in runs:
+                name = (f"{engine}, {crawl_workers} worker{'s' if crawl_workers > 1 else ''}, "
+                        f"{page_size} rows, batch {export_batch}")
+                run_key = f"{engine}_{crawl_workers}_{page_size}_{export_batch}"
+                run_directory = os.path.join(tmp_dir, run_key)
+                output_file = os.path.join(run_directory, 'combase_sources.txt')
+                profile = CrawlProfile()
+                log = io.StringIO()
+                # The crawl saves each page's HTML in the working directory
+                os.makedirs(run_directory)
+                os.chdir(run_directory)
+                start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(log):
+                        completed = _crawl_stub(engine, server, run_directory, output_file, crawl_workers,
+                                                profile, page_size, export_batch)
+                except Exception as e:
+                    completed = False
+                    log.write(f"{e}\n")
+                finally:
+                    os.chdir(cwd)
+                crawl_elapsed = time.perf_counter() - start
+                if not completed:
+                    print(f"{name}: crawl failed; last output:\n{log.getvalue()[-2000:]}")
+                    continue
+
+                exports = sorted(os.path.join(run_directory, file_name) for file_name in os.listdir(run_directory)
+                                 if file_name.startswith('ComBaseExport_page_'))
+                start = time.perf_counter()
+                with profile.span('combine', nbytes=sum(os.path.getsize(path) for path in exports)) as span:
+                    stats = combine_exports(exports, os.path.join(run_directory, 'ComBaseCombined.xlsx'),
+                                            workers=args.workers, verbose=False)
+                    span['items'] = sum(stats['rows'].values())
+                combine_elapsed = time.perf_counter() - start
+                profile.stop()
+
+                with open(output_file, 'r', encoding='utf-8') as file:
+                    sources = sum(1 for line in file if line.strip())
+                rows.append([name, f"{crawl_elapsed:.1f}", f"{args.pages / crawl_elapsed:.1f}",
+                             f"{combine_elapsed:.2f}", len(exports),
+                             'yes' if sources == expected_sources else f"NO ({sources})"])
+                profiles.append((name, profile))
+                if args.profile_dir:
+                    os.makedirs(args.profile_dir, exist_ok=True)
+                    profile.save(os.path.join(args.profile_dir, f"pipeline_{run_key}.json"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print_table(['run', 'crawl s', 'pages/s', 'combine s', 'exports', 'all sources'], rows)
+    for name, profile in profiles:
+        print(f"\nStages of {name}:")
+        for line in profile.summary():
+            print(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'pages': args.pages, 'page_size': args.page_size, 'latency': args.latency,
+                       'export_latency': args.export_latency,
+                       'runs': [dict(zip(['run', 'crawl_s', 'pages_per_s', 'combine_s', 'exports', 'all_sources'],
+                                         row)) for row in rows]},
+                      file, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+
+def _page_load_times(server, browsing, pages):
+    """
+    Load every results page of the stub server in a headless Chrome with one browsing mode.
+
+    Returns:
+        tuple: Seconds from clicking next until each page was loaded, and the number of sources per page
+    """
+    # Imported here so the other benchmarks do not need Selenium and Chrome
+    from ntu_fresh_selenium_bs import create_driver, go_to_next_page, log_in_browser, search_for_organism
+    waits = CrawlWaits(page_load=page_load_strategy(browsing))
+    driver = create_driver(headless=True, browsing=browsing)
+    try:
+        log_in_browser(driver, STUB_USERNAME, STUB_PASSWORD, base_url=server.base_url, waits=waits)
+        if not search_for_organism(driver, waits=waits):
+            raise RuntimeError("the search did not reach the results page")
+        load_times = []
+        source_counts = [len(extract_page(driver.page_source).sources)]
+        for page_number in range(1, pages):
+            start = time.perf_counter()
+            if not go_to_next_page(driver, page_number, waits):
+                raise RuntimeError(f"could not leave page {page_number}")
+            load_times.append(time.perf_counter() - start)
+            source_counts.append(len(extract_page(driver.page_source).sources))
+        return load_times, source_counts
+    finally:
+        driver.quit()
+
+
+def bench_page_load(args):
+    """
+    Per-page load time of the results pages in Chrome, for each browsing mode.
+
+    The stand-in server's results pages load a logo, icons, a web font and an
+    analytics tag, each answered after ``--asset-latency`` seconds, as well as
+    their own scripts and stylesheet. Every mode walks all ``--pages`` with the
+    pager, and the time from clicking next until the page counts as loaded is
+    compared against the first mode (full browsing by default).
+    """
+    server = start_stub_server(pages=args.pages, rows_per_page=args.page_size, latency=args.latency,
+                               asset_latency=args.asset_latency)
+    print(f"Stand-in server at {server.base_url}: {args.pages} pages of {args.page_size} records, "
+          f"{args.latency * 1000:.0f} ms per page, {args.asset_latency * 1000:.0f} ms per image, font "
+          f"and analytics request")
+    rows = []
+    baseline = None
+    try:
+        for browsing in args.browsing_modes:
+            log = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(log):
+                    load_times, source_counts = _page_load_times(server, browsing, args.pages)
+            except Exception as e:
+                print(f"{browsing}: page loads failed: {e}; last output:\n{log.getvalue()[-2000:]}")
+                continue
+            mean = statistics.mean(load_times) if load_times else 0.0
+            baseline = baseline or mean
+            complete = all(count == args.page_size for count in source_counts)
+            rows.append([browsing, len(load_times), f"{mean * 1000:.0f}",
+                         f"{statistics.median(load_times) * 1000:.0f}" if load_times else '0',
+                         f"{max(load_times, default=0.0) * 1000:.0f}",
+                         f"{baseline / mean:.2f}x" if mean else '-',
+                         'yes' if complete else f"NO ({sum(source_counts)})"])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print_table(['browsing', 'pages', 'mean ms', 'median ms', 'max ms', 'speedup', 'all sources'], rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'pages': args.pages, 'page_size': args.page_size, 'latency': args.latency,
+                       'asset_latency': args.asset_latency,
+                       'runs': [dict(zip(['browsing', 'pages', 'mean_ms', 'median_ms', 'max_ms', 'speedup',
+                                          'all_sources'], row)) for row in rows]},
+                      file, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+
+BENCHMARKS = {
+    'sink': bench_sink,
+    'extract': bench_extract,
+    'dedupe': bench_dedupe,
+    'combine': bench_combine,
+    'pipeline': bench_pipeline,
+    'page-load': bench_page_load,
+}
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Run offline benchmarks for the ComBase extraction tools')
+
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS),
+                        help='Benchmark to run')
+
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Number of sources to generate for each run')
+
+    parser.add_argument('--page-size', type=int, default=50,
+                        help='Number of sources per results page')
+
+    parser.add_argument('--legacy-limit', type=int, default=10_000,
+                        help='Largest size at which to also time the original quadratic implementation')
+
+    parser.add_argument('--pages', type=int, default=200,
+                        help='Number of synthetic results pages to generate')
+
+    parser.add_argument('--files', type=int, default=300,
+                        help='Number of synthetic Excel exports to combine')
+
+    parser.add_argument('--engines', nargs='+', choices=['http', 'selenium'], default=['http'],
+                        help='Crawl engines to run the pipeline benchmark with (selenium needs Chrome)')
+
+    parser.add_argument('--crawl-workers', type=int, nargs='+', default=[1, 4],
+                        help='Numbers of parallel crawl workers to run the pipeline benchmark with')
+
+    parser.add_argument('--crawl-page-sizes', type=parse_page_size, nargs='+', default=[DEFAULT_PAGE_SIZE],
+                        help='Page sizes the pipeline benchmark crawls with: max, site or a number of rows')
+
+    parser.add_argument('--export-batches', type=int, nargs='+', default=[DEFAULT_EXPORT_BATCH],
+                        help='Pages per Excel export to run the pipeline benchmark with (1 exports every page)')
+
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='Seconds the stand-in server waits before answering each page request')
+
+    parser.add_argument('--export-latency', type=float, default=0.0,
+                        help='Extra seconds the stand-in server waits before answering each export')
+
+    parser.add_argument('--asset-latency', type=float, default=0.05,
+                        help='Seconds the stand-in server waits before answering each image, font and analytics request in the page-load benchmark')
+
+    parser.add_argument('--browsing-modes', nargs='+', choices=BROWSING_MODES, default=BROWSING_MODES,
+                        help='Browsing modes to time in the page-load benchmark; the first is the baseline')
+
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes combining the exports in the pipeline benchmark')
+
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='Save the stage timings of each pipeline run as JSON in this folder')
+
+    parser.add_argument('--json', metavar='FILE',
+                        help='Save the pipeline or page-load results table to this JSON file, to compare runs')
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    BENCHMARKS[args.benchmark](args)
+    sys.exit(0)
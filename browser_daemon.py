@@ -0,0 +1,243 @@
+"""
+Warm browser daemon: logged-in browsers kept open between crawl jobs.
+
+Starting Chrome and logging in takes longer than crawling a short query, and
+each run of ntu_fresh_selenium_bs.py used to pay for both. The daemon opens a
+pool of logged-in browsers once and serves jobs over a Unix socket; a job takes
+browsers from the pool, crawls, and hands them back warm for the next job.
+
+The protocol is one JSON request per connection, answered with one JSON line:
+
+- ``{"command": "ping"}``: browsers in the pool, how many are idle, jobs run
+- ``{"command": "crawl", "job": {...}}``: run a crawl job; the answer is what
+  the job handler returns, and its progress is printed on the daemon's console
+- ``{"command": "shutdown"}``: close the browsers and stop the daemon
+
+Every answer has ``ok`` and, when it is false, an ``error`` message.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+DEFAULT_SOCKET = os.path.join(os.path.expanduser('~'), '.combase_daemon.sock')
+
+
+class BrowserPool:
+    """
+    Browsers opened once and lent to one job at a time.
+
+    A browser is checked before it is lent out (for example, that it is still
+    logged in); one that fails the check or has died is closed and replaced.
+
+    Args:
+        open_browser (callable): Opens a logged-in browser for a pool index
+        check_browser (callable): Returns True if a browser can be reused as is;
+            may repair it (log in again) before answering
+        close_browser (callable): Closes a browser
+        size (int): Number of browsers to keep open
+    """
+
+    def __init__(self, open_browser, check_browser, close_browser, size=1):
+        self.open_browser = open_browser
+        self.check_browser = check_browser
+        self.close_browser = close_browser
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._indices = {}
+        self._closed = False
+
+    def start(self):
+        """Open every browser of the pool; those that fail are retried when they are needed."""
+        for index in range(self.size):
+            self._idle.put(self._open(index))
+
+    def _open(self, index):
+        try:
+            browser = self.open_browser(index)
+        except Exception as e:
+            print(f"Browser {index + 1} could not be opened: {e}")
+            return index
+        self._indices[id(browser)] = index
+        return browser
+
+    def acquire(self, timeout=None):
+        """
+        Wait for an idle browser, checked and ready for a job.
+
+        Raises:
+            RuntimeError: If no working browser could be opened
+        """
+        item = self._idle.get(timeout=timeout)
+        if isinstance(item, int):
+            browser = self._open(item)
+        else:
+            browser = item
+            try:
+                usable = self.check_browser(browser)
+            except Exception as e:
+                print(f"Browser {self._indices[id(browser)] + 1} stopped working: {e}")
+                usable = False
+            if not usable:
+                browser = self._replace(browser)
+        if isinstance(browser, int):
+            self._idle.put(browser)
+            raise RuntimeError("no browser could be opened")
+        return browser
+
+    def _replace(self, browser):
+        index = self._indices.pop(id(browser))
+        try:
+            self.close_browser(browser)
+        except Exception:
+            pass
+        return self._open(index)
+
+    def release(self, browser):
+        """Give a browser back to the pool for the next job."""
+        self._idle.put(browser)
+        if self._closed:
+            self.close()
+
+    def idle(self):
+        return self._idle.qsize()
+
+    def close(self):
+        """Close the idle browsers; browsers still lent out are closed when they come back."""
+        self._closed = True
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if not isinstance(browser, int):
+                try:
+                    self.close_browser(browser)
+                except Exception as e:
+                    print(f"Could not close a browser: {e}")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            response = self.server.daemon.handle_request(request)
+        except ValueError as e:
+            response = {'ok': False, 'error': f"bad request: {e}"}
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class BrowserDaemon:
+    """
+    Serves crawl jobs from a pool of warm browsers over a Unix socket.
+
+    Args:
+        socket_path (str): Socket file to listen on (readable by the owner only)
+        pool (BrowserPool): Browsers the jobs run in
+        run_job (callable): ``run_job(pool, job)`` runs one job dict and returns its result dict
+    """
+
+    def __init__(self, socket_path, pool, run_job):
+        self.socket_path = socket_path
+        self.pool = pool
+        self.run_job = run_job
+        self.jobs = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def handle_request(self, request):
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'browsers': self.pool.size, 'idle': self.pool.idle(),
+                    'jobs': self.jobs}
+        if command == 'shutdown':
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {'ok': True}
+        if command == 'crawl':
+            with self._lock:
+                self.jobs += 1
+                job_number = self.jobs
+            print(f"\n=== Job {job_number} ===")
+            start = time.perf_counter()
+            try:
+                result = self.run_job(self.pool, request.get('job') or {})
+            except Exception as e:
+                print(f"Job {job_number} failed: {e}")
+                return {'ok': False, 'error': str(e)}
+            print(f"Job {job_number} finished in {time.perf_counter() - start:.1f}s")
+            return dict(result, ok=True)
+        return {'ok': False, 'error': f"unknown command {command!r}"}
+
+    def serve(self):
+        """Open the browsers and serve jobs until a shutdown request or Ctrl+C."""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError("the browser daemon needs Unix sockets, which this platform does not have")
+        if os.path.exists(self.socket_path):
+            if daemon_status(self.socket_path):
+                raise RuntimeError(f"a browser daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(self.socket_path)
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        print(f"Opening {self.pool.size} browser(s)...")
+        self.pool.start()
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+        print(f"Browser daemon listening on {self.socket_path}; stop it with --stop-daemon or Ctrl+C")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.pool.close()
+            print("Browser daemon stopped")
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET, timeout=None):
+    """
+    Send one request to a daemon and return its answer.
+
+    Raises:
+        OSError: If no daemon is listening on the socket
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    if not data:
+        raise ConnectionError(f"the browser daemon on {socket_path} closed the connection without answering")
+    return json.loads(data)
+
+
+def daemon_status(socket_path=DEFAULT_SOCKET):
+    """Return the ping answer of the daemon on a socket, or None if none is listening."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    try:
+        return send_request({'command': 'ping'}, socket_path, timeout=5)
+    except (OSError, ValueError):
+        return None
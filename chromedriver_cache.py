@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import time
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_DRIVER_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'combase', 'chromedriver.json')
+
+_lock = threading.Lock()
+_resolved = {}
+
+
+def _read_cached_path(cache_file):
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            path = json.load(file).get('path')
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ignoring unreadable chromedriver cache {cache_file}: {e}")
+        return None
+    if path and os.path.isfile(path) and os.access(path, os.X_OK):
+        return path
+    return None
+
+
+def chromedriver_path(refresh=False, cache_file=DEFAULT_DRIVER_CACHE):
+    """
+    Return the path of a chromedriver binary, resolving it only when needed.
+
+    ``ChromeDriverManager().install()`` looks up the latest driver version online
+    (and downloads it when it is new) every time it is called. The path it returns
+    is kept in ``cache_file``, and in memory for the browsers of one process, so
+    later runs start offline while the cached binary still exists.
+
+    Args:
+        refresh (bool): Resolve the driver again, e.g. after Chrome was updated and
+            the cached driver no longer matches it
+        cache_file (str): JSON file remembering the resolved path
+
+    Returns:
+        str: Path of the chromedriver executable
+    """
+    with _lock:
+        if not refresh:
+            path = _resolved.get(cache_file) or _read_cached_path(cache_file)
+            if path:
+                _resolved[cache_file] = path
+                return path
+        print("Resolving the ChromeDriver version...")
+        path = ChromeDriverManager().install()
+        _resolved[cache_file] = path
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_path = f"{cache_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'path': path, 'resolved_at': time.time()}, file, indent=2)
+            os.replace(tmp_path, cache_file)
+        except OSError as e:
+            print(f"Could not cache the chromedriver path in {cache_file}: {e}")
+        return path
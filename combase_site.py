@@ -0,0 +1,10 @@
+# Locations of the ComBase Browser pages used by the crawlers
+
+BASE_URL = "https://combasebrowser.errc.ars.usda.gov"
+
+LOGIN_PATH = "/membership/Login.aspx?ReturnUrl=%2f"
+
+
+def site_url(path, base_url=None):
+    """Join a site path onto the ComBase base URL (or a local stand-in server)."""
+    return (base_url or BASE_URL).rstrip('/') + path
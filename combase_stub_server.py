@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the ComBase Browser site.
+
+Serves synthetic (or saved) pages with the same structure the crawlers rely on:
+the Login1_* login form, the home page Browser link, the organism search form,
+SearchResults.aspx with lblSource spans, exportchk checkboxes, HiddenTotalPages,
+a rows-per-page dropdown and an ASP.NET style pager, and ComBaseExport .xlsx
+downloads. Run it with:
+
+    python3 combase_stub_server.py --port 8765 --pages 20
+
+and point a crawler at it with ``--base-url http://127.0.0.1:8765``. Use
+``--latency``, ``--export-latency`` and ``--asset-latency`` to make it respond
+as slowly as the real site, and ``--keep-selection`` to keep the records
+selected on a results page while other pages are shown, until they are exported.
+With ``--export-keeps-selection`` as well, an export only unticks the records of
+the page it was made from, as a site might.
+"""
+
+import argparse
+import glob
+import html
+import io
+import os
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STUB_USERNAME = 'stub@example.com'
+STUB_PASSWORD = 'stub-password'
+AUTH_COOKIE = '.ASPXAUTH'
+# Search state is kept per ASP.NET session, as on the real site, not per login
+SESSION_COOKIE = 'ASP.NET_SessionId'
+
+# A transparent 1x1 PNG, served for every image
+PIXEL_PNG = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                          '1f15c4890000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082')
+
+# Images, fonts and third-party scripts a results page loads besides its own scripts and stylesheet
+ASSET_CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.woff2': 'font/woff2',
+    '/gtag/js': 'application/javascript',
+}
+
+# Options of the results page's rows-per-page dropdown
+PAGE_SIZES = [10, 25, 50, 100, 250]
+PAGE_SIZE_FIELD = 'ctl00$ContentPlaceHolder1$ddlPageSize'
+
+MATRICES = ['Chicken & poultry meat', 'Beef', 'Pork', 'Eggs', 'Milk', 'Lettuce', 'Culture medium']
+
+
+def make_source(i):
+    """Build a realistic-looking citation string for synthetic data."""
+    return (f"Author{i % 997} A., Writer{i % 89} B. ({1980 + i % 40}) Growth of Salmonella spp. "
+            f"in sample {i}. Journal of Food Protection {i % 70}:{i % 1000}-{i % 1000 + 9}.")
+
+
+def make_record(record_id, organism='Salmonella spp.'):
+    """Build the summary fields of one synthetic ComBase record."""
+    return {
+        'record_id': f"B{record_id:06d}",
+        'organism': organism,
+        'matrix': MATRICES[record_id % len(MATRICES)],
+        'temperature': 4 + record_id % 30,
+        'ph': round(5.5 + (record_id % 20) / 10, 1),
+        'aw': round(0.95 + (record_id % 5) / 100, 2),
+        'source': make_source(record_id),
+    }
+
+
+def make_results_row(i, record_id, organism='Salmonella spp.', checked=False):
+    """Build one ComBase search results row."""
+    record = {key: html.escape(str(value)) for key, value in make_record(record_id, organism).items()}
+    checked = ' checked="checked"' if checked else ''
+    return f"""
+    <div class="cbRowSummaryResult">
+      <div class="row">
+        <div class="col-md-1"><input type="checkbox" class="exportchk" name="chkExport" id="chkExport_{record['record_id']}" value="{record['record_id']}"{checked} /></div>
+        <div class="col-md-2"><span class="text-primary">Record ID</span></div>
+        <div class="col-md-3"><span id="lblRecordID_{i}">{record['record_id']}</span></div>
+        <div class="col-md-2"><span class="text-primary">Organism</span></div>
+        <div class="col-md-4"><span id="lblOrganism_{i}">{record['organism']}</span></div>
+      </div>
+      <div class="row">
+        <div class="col-md-2"><span class="text-primary">Matrix</span></div>
+        <div class="col-md-4"><span id="lblMatrix_{i}">{record['matrix']}</span></div>
+        <div class="col-md-2"><span class="text-primary">Temperature</span></div>
+        <div class="col-md-1"><span id="lblTemperature_{i}">{record['temperature']}</span></div>
+        <div class="col-md-1"><span class="text-primary">pH</span></div>
+        <div class="col-md-1"><span id="lblPH_{i}">{record['ph']}</span></div>
+        <div class="col-md-1"><span class="text-primary">aw</span></div>
+        <div class="col-md-1"><span id="lblAw_{i}">{record['aw']}</span></div>
+      </div>
+      <div class="row">
+        <div class="col-md-2"><span class="text-primary">Source</span></div>
+        <div class="col-md-10"><span id="lblSource_{i}">{record['source']}</span></div>
+      </div>
+    </div>"""
+
+
+def _postback_script():
+    return """<script type="text/javascript">
+function __doPostBack(eventTarget, eventArgument) {
+    var form = document.forms['form1'];
+    form.__EVENTTARGET.value = eventTarget;
+    form.__EVENTARGUMENT.value = eventArgument;
+    form.submit();
+}
+</script>"""
+
+
+def _page_assets():
+    """Head and body markup loading a logo, icons, a web font and an analytics tag, as the real pages do."""
+    head = """<style>@font-face { font-family: 'CbSans'; src: url('/Content/fonts/cbsans.woff2') format('woff2'); }
+body { font-family: 'CbSans', sans-serif; }</style>
+<script async src="/gtag/js?id=G-STUB"></script>"""
+    body = '<img src="/Images/combase_logo.png" alt="ComBase" />' + ''.join(
+        f'<img src="/Images/icon_{name}.png" alt="" />' for name in ('search', 'export', 'help', 'user'))
+    return head, body
+
+
+def _hidden_state(page_key):
+    # Large opaque blobs like the real __VIEWSTATE/__EVENTVALIDATION fields
+    return f"""<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{page_key}{'A' * 4000}" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="C2EE9ABB" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{page_key}{'B' * 500}" />"""
+
+
+def _page_size_dropdown(page_sizes, rows_per_page):
+    """Rows-per-page dropdown posting back when changed, as an ASP.NET AutoPostBack DropDownList does."""
+    options = ''
+    for size in page_sizes:
+        selected = ' selected="selected"' if size == rows_per_page else ''
+        options += f'<option{selected} value="{size}">{size}</option>'
+    return f"""<div class="page-size">Rows per page:
+<select name="{PAGE_SIZE_FIELD}" id="ContentPlaceHolder1_ddlPageSize" onchange="javascript:setTimeout('__doPostBack(\\'{PAGE_SIZE_FIELD}\\',\\'\\')', 0)">{options}</select>
+</div>"""
+
+
+def make_results_page(page_number, total_pages, rows_per_page=50, organism='Salmonella spp.', total_records=None,
+                      page_sizes=(), selected=()):
+    """
+    Build a synthetic SearchResults.aspx page.
+
+    Args:
+        page_number (int): Page to build
+        total_pages (int): Number of pages in the results
+        rows_per_page (int): Records per page
+        organism (str): Organism of the records
+        total_records (int, optional): Records in the results; the last page shows what is left
+        page_sizes (list): Options of the rows-per-page dropdown; no dropdown when empty
+        selected (set): Record IDs whose checkboxes are shown ticked
+    """
+    first_record = (page_number - 1) * rows_per_page
+    row_count = rows_per_page if total_records is None else max(0, min(rows_per_page, total_records - first_record))
+    rows = ''.join(make_results_row(i, first_record + i + 1, organism, f"B{first_record + i + 1:06d}" in selected)
+                   for i in range(row_count))
+    dropdown = _page_size_dropdown(page_sizes, rows_per_page) if page_sizes else ''
+    scripts = ''.join(f'<script src="/Scripts/lib{i}.js"></script>' for i in range(10))
+    assets_head, assets_body = _page_assets()
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>ComBase Browser - Search Results</title>{scripts}
+<link rel="stylesheet" href="/Content/site.css" />{assets_head}{_postback_script()}</head>
+<body>
+{assets_body}
+<form method="post" action="./SearchResults.aspx" id="form1">
+{_hidden_state(f'results{page_number}')}
+<input type="hidden" name="HiddenTotalPages" id="HiddenTotalPages" value="{total_pages}" />
+<input type="hidden" name="HiddenCurrentPage" id="HiddenCurrentPage" value="{page_number}" />
+{dropdown}
+<div class="container">{rows}
+</div>
+<div class="pager">
+  <a class="prev" data-action="prev" href="javascript:__doPostBack('ctl00$ContentPlaceHolder1$pager','prev')">&lsaquo;</a>
+  <span class="page-indicator">{page_number} / {total_pages}</span>
+  <a class="next" data-action="next" href="javascript:__doPostBack('ctl00$ContentPlaceHolder1$pager','next')">&rsaquo;</a>
+</div>
+<input type="submit" name="cbBtnExportToExcel" id="cbBtnExportToExcel" value="Export to Excel" />
+</form>
+</body>
+</html>"""
+
+
+def make_login_page(failure_text=''):
+    """Build the membership/Login.aspx page."""
+    return f"""<!DOCTYPE html>
+<html><head><title>ComBase Browser - Log in</title>{_postback_script()}</head>
+<body>
+<form method="post" action="./Login.aspx?ReturnUrl=%2f" id="form1">
+{_hidden_state('login')}
+<input name="Login1$UserName" type="text" id="Login1_UserName" />
+<input name="Login1$Password" type="password" id="Login1_Password" />
+<input type="submit" name="Login1$Button1" value="Log In" id="Login1_Button1" />
+<span id="Login1_FailureText">{html.escape(failure_text)}</span>
+</form>
+</body></html>"""
+
+
+def make_home_page():
+    """Build the page shown after logging in."""
+    return """<!DOCTYPE html>
+<html><head><title>ComBase</title></head>
+<body>
+<div class="sidebar"><ul>
+  <li><a href="/Default.aspx">Home</a></li>
+  <li><a href="/Search.aspx">ComBase Browser</a></li>
+  <li><a href="/membership/Logout.aspx">Log out</a></li>
+</ul></div>
+<div class="content"><h1>Welcome to ComBase</h1></div>
+</body></html>"""
+
+
+def make_search_page(organisms):
+    """Build the Search.aspx page with a suggest-style organism picker."""
+    items = ''.join(f'<div class="ms-res-item" data-value="{html.escape(name)}">{html.escape(name)}</div>'
+                    for name in organisms)
+    return f"""<!DOCTYPE html>
+<html><head><title>ComBase Browser - Search</title>{_postback_script()}
+<style>.ms-res-ctn {{ display: none; }} .ms-res-ctn.open {{ display: block; }}</style></head>
+<body>
+<form method="post" action="./Search.aspx" id="form1">
+{_hidden_state('search')}
+<div class="ms-ctn">
+  <div class="ms-sel-ctn"><input type="text" autocomplete="off" id="msOrganismInput" /></div>
+  <div class="ms-res-ctn" id="msOrganismResults">{items}</div>
+</div>
+<input type="hidden" name="ctl00$ContentPlaceHolder1$txtOrganism" id="ContentPlaceHolder1_txtOrganism" value="" />
+<input type="submit" name="ctl00$ContentPlaceHolder1$btnDoSearch" id="btnDoSearch" value="Search" />
+</form>
+<script type="text/javascript">
+(function () {{
+    var input = document.getElementById('msOrganismInput');
+    var results = document.getElementById('msOrganismResults');
+    var hidden = document.getElementById('ContentPlaceHolder1_txtOrganism');
+    input.addEventListener('input', function () {{
+        var text = input.value.toLowerCase();
+        results.className = text ? 'ms-res-ctn open' : 'ms-res-ctn';
+        Array.prototype.forEach.call(results.children, function (item) {{
+            item.style.display = item.textContent.toLowerCase().indexOf(text) >= 0 ? 'block' : 'none';
+        }});
+        hidden.value = input.value;
+    }});
+    Array.prototype.forEach.call(results.children, function (item) {{
+        item.addEventListener('click', function () {{
+            hidden.value = item.getAttribute('data-value');
+            input.value = item.textContent;
+            results.className = 'ms-res-ctn';
+        }});
+    }});
+}})();
+</script>
+</body></html>"""
+
+
+def make_export_workbook(record_ids, organism='Salmonella spp.'):
+    """Build a ComBaseExport .xlsx with Data Records and Logs sheets."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    data_sheet = workbook.create_sheet('Data Records')
+    data_sheet.append(['Record ID', 'Organism', 'Matrix', 'Temperature (C)', 'pH', 'Aw', 'Source'])
+    logs_sheet = workbook.create_sheet('Logs')
+    logs_sheet.append(['Record ID', 'Time (h)', 'Log count (log cfu/g)'])
+    for record_id in record_ids:
+        record = make_record(int(record_id.lstrip('B')), organism)
+        data_sheet.append([record['record_id'], record['organism'], record['matrix'], record['temperature'],
+                           record['ph'], record['aw'], record['source']])
+        for hour in range(0, 48, 8):
+            logs_sheet.append([record['record_id'], hour, round(3.0 + hour * 0.05 + (int(record_id.lstrip('B')) % 7) / 10, 2)])
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+class StubState:
+    """Configuration and per-session state shared by the request handlers."""
+
+    def __init__(self, pages=5, rows_per_page=50, fixtures_dir=None, organisms=None, latency=0.0,
+                 export_latency=0.0, asset_latency=0.0, page_sizes=PAGE_SIZES, keep_selection=False,
+                 export_keeps_selection=False):
+        self.pages = pages
+        # Default page size; a search has pages * rows_per_page records, paged at the size each session picks
+        self.rows_per_page = rows_per_page
+        self.total_records = pages * rows_per_page
+        self.page_sizes = sorted(set(page_sizes) | {rows_per_page}) if page_sizes else []
+        # Whether records ticked on one page stay selected while other pages are shown
+        self.keep_selection = keep_selection
+        # Whether an export leaves the records selected on other pages ticked
+        self.export_keeps_selection = export_keeps_selection
+        # Seconds added to every page request, to every export on top of that, and to every
+        # image, font and analytics request
+        self.latency = latency
+        self.export_latency = export_latency
+        self.asset_latency = asset_latency
+        self.organisms = organisms or ['Salmonella spp.', 'Listeria monocytogenes', 'Escherichia coli']
+        self.fixtures = {}
+        if fixtures_dir:
+            # Saved pages replace the synthetic results pages, in page order
+            for path in glob.glob(os.path.join(fixtures_dir, 'combase_page_*.html')):
+                match = re.search(r'combase_page_(\d+)\.html$', path)
+                if match:
+                    with open(path, 'r', encoding='utf-8') as file:
+                        self.fixtures[int(match.group(1))] = file.read()
+            if self.fixtures:
+                self.pages = max(self.fixtures)
+                # Saved pages cannot be re-paged
+                self.page_sizes = []
+        self.logins = set()
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.exports = 0
+
+    def page_count(self, page_size):
+        """Number of results pages at a page size."""
+        if self.fixtures:
+            return self.pages
+        return max(1, -(-self.total_records // page_size))
+
+    def page_record_ids(self, page_number, page_size):
+        """Record IDs shown on a results page."""
+        if page_number in self.fixtures:
+            return re.findall(r'class="exportchk"[^>]*value="([^"]*)"', self.fixtures[page_number])
+        first_record = (page_number - 1) * page_size
+        return [f"B{record_id:06d}"
+                for record_id in range(first_record + 1, min(first_record + page_size, self.total_records) + 1)]
+
+    def results_page(self, page_number, organism, page_size=None, selected=()):
+        if page_number in self.fixtures:
+            return self.fixtures[page_number]
+        page_size = page_size or self.rows_per_page
+        return make_results_page(page_number, self.page_count(page_size), page_size, organism, self.total_records,
+                                 self.page_sizes, selected)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Routes requests to the synthetic ComBase pages."""
+
+    server_version = 'Microsoft-IIS/10.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        token = cookie[AUTH_COOKIE].value if AUTH_COOKIE in cookie else None
+        session_id = cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+        with self.state.lock:
+            if token not in self.state.logins:
+                return token, None
+            if session_id not in self.state.sessions:
+                # A logged-in client without session state gets a new ASP.NET session
+                session_id = secrets.token_hex(12)
+                self.state.sessions[session_id] = {'page': 1}
+                self.cookies_to_set.append(f'{SESSION_COOKIE}={session_id}; path=/; HttpOnly')
+            return token, self.state.sessions[session_id]
+
+    def _read_form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        return parse_qs(body, keep_blank_values=True)
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        for value in self.cookies_to_set:
+            self.send_header('Set-Cookie', value)
+        self.cookies_to_set = []
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _redirect(self, location, headers=None):
+        headers = dict(headers or {})
+        headers['Location'] = location
+        self._send(302, b'', headers=headers)
+
+    def _require_login(self):
+        token, session = self._session()
+        if session is None:
+            self._redirect('/membership/Login.aspx?ReturnUrl=%2f')
+            return None
+        return session
+
+    def parse_request(self):
+        self.cookies_to_set = []
+        return super().parse_request()
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        for suffix, content_type in ASSET_CONTENT_TYPES.items():
+            if path.endswith(suffix):
+                time.sleep(self.state.asset_latency)
+                self._send(200, PIXEL_PNG if suffix == '.png' else b'', content_type=content_type)
+                return
+        if path.endswith('.js') or path.endswith('.css') or path in ('/robots.txt', '/favicon.ico'):
+            self._send(200, '', content_type='text/plain')
+            return
+        time.sleep(self.state.latency)
+        if path == '/membership/Login.aspx':
+            self._send(200, make_login_page())
+        elif path in ('/', '/Default.aspx'):
+            if self._require_login() is not None:
+                self._send(200, make_home_page())
+        elif path == '/Search.aspx':
+            if self._require_login() is not None:
+                self._send(200, make_search_page(self.state.organisms))
+        elif path == '/SearchResults.aspx':
+            session = self._require_login()
+            if session is not None:
+                session['page'] = 1
+                self._send(200, self.state.results_page(1, session.get('organism', 'Salmonella spp.'),
+                                                        session.get('page_size'), session.get('selected', ())))
+        else:
+            self._send(404, 'Not found', content_type='text/plain')
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        form = self._read_form()
+        field = lambda name: (form.get(name) or [''])[0]
+        time.sleep(self.state.latency)
+
+        if path == '/membership/Login.aspx':
+            if not field('__VIEWSTATE'):
+                self._send(400, 'Missing __VIEWSTATE', content_type='text/plain')
+            elif field('Login1$UserName') == self.server.username and field('Login1$Password') == self.server.password:
+                token = secrets.token_hex(16)
+                with self.state.lock:
+                    self.state.logins.add(token)
+                self._redirect('/Default.aspx', {'Set-Cookie': f'{AUTH_COOKIE}={token}; path=/; HttpOnly'})
+            else:
+                self._send(200, make_login_page('Your login attempt was not successful. Please try again.'))
+            return
+
+        session = self._require_login()
+        if session is None:
+            return
+
+        if path == '/Search.aspx':
+            organism = field('ctl00$ContentPlaceHolder1$txtOrganism').strip()
+            matches = [name for name in self.state.organisms if organism and organism.lower() in name.lower()]
+            session['organism'] = matches[0] if matches else (organism or 'Salmonella spp.')
+            session['selected'] = set()
+            self._redirect('/SearchResults.aspx')
+        elif path == '/SearchResults.aspx':
+            page = int(field('HiddenCurrentPage') or session.get('page', 1))
+            organism = session.get('organism', 'Salmonella spp.')
+            page_size = session.get('page_size', self.state.rows_per_page)
+            selected = {value for value in form.get('chkExport', []) if value}
+            if self.state.keep_selection:
+                # Records of the page that was posted follow its boxes; other pages' selections stay
+                shown = set(self.state.page_record_ids(session.get('page', 1), page_size))
+                selected |= session.get('selected', set()) - shown
+                session['selected'] = selected
+            if 'cbBtnExportToExcel' in form:
+                if self.state.keep_selection and self.state.export_keeps_selection:
+                    session['selected'] = selected - shown
+                else:
+                    session['selected'] = set()
+                selected = sorted(selected)
+                time.sleep(self.state.export_latency)
+                with self.state.lock:
+                    self.state.exports += 1
+                    export_number = self.state.exports
+                filename = f"ComBaseExport_{export_number}.xlsx"
+                self._send(200, make_export_workbook(selected, organism),
+                           content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                           headers={'Content-Disposition': f'attachment; filename={filename}'})
+                return
+            new_size = field(PAGE_SIZE_FIELD)
+            if new_size.isdigit() and int(new_size) in self.state.page_sizes:
+                page_size = session['page_size'] = int(new_size)
+            if field('__EVENTTARGET') == PAGE_SIZE_FIELD:
+                # Changing the page size starts the results over from the first page
+                page = 1
+            elif field('__EVENTTARGET').endswith('pager'):
+                step = 1 if field('__EVENTARGUMENT') == 'next' else -1
+                page = page + step
+            page = min(max(1, page), self.state.page_count(page_size))
+            session['page'] = page
+            self._send(200, self.state.results_page(page, organism, page_size, session.get('selected', ())))
+        else:
+            self._send(404, 'Not found', content_type='text/plain')
+
+    do_HEAD = do_GET
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server carrying the stub configuration."""
+
+    daemon_threads = True
+
+    def __init__(self, address, state, username=STUB_USERNAME, password=STUB_PASSWORD, verbose=False):
+        super().__init__(address, StubHandler)
+        self.state = state
+        self.username = username
+        self.password = password
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(port=0, **state_options):
+    """
+    Start a stand-in server on a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        **state_options: Passed to StubState (pages, rows_per_page, fixtures_dir, organisms,
+            latency, export_latency, asset_latency, page_sizes, keep_selection, export_keeps_selection)
+
+    Returns:
+        StubServer: Running server; call ``shutdown()`` when done
+    """
+    server = StubServer(('127.0.0.1', port), StubState(**state_options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the ComBase Browser site')
+
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port to listen on')
+
+    parser.add_argument('--pages', type=int, default=5,
+                        help='Number of results pages per search')
+
+    parser.add_argument('--rows', type=int, default=50,
+                        help='Number of records per results page, until a client picks another page size')
+
+    parser.add_argument('--page-sizes', type=int, nargs='*', default=PAGE_SIZES,
+                        help='Options of the rows-per-page dropdown; pass none to leave the dropdown out')
+
+    parser.add_argument('--keep-selection', action='store_true',
+                        help='Keep records selected while other results pages are shown, until they are exported')
+
+    parser.add_argument('--export-keeps-selection', action='store_true',
+                        help='With --keep-selection, leave the records selected on other pages ticked after an export')
+
+    parser.add_argument('--fixtures',
+                        help='Directory of saved combase_page_N.html files to serve as results pages')
+
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds to wait before answering each page request')
+
+    parser.add_argument('--export-latency', type=float, default=0.0,
+                        help='Extra seconds to wait before answering each Excel export')
+
+    parser.add_argument('--asset-latency', type=float, default=0.0,
+                        help='Seconds to wait before answering each image, font and analytics request')
+
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Log every request')
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    server = StubServer(('127.0.0.1', args.port),
+                        StubState(pages=args.pages, rows_per_page=args.rows, fixtures_dir=args.fixtures,
+                                  latency=args.latency, export_latency=args.export_latency,
+                                  asset_latency=args.asset_latency, page_sizes=args.page_sizes,
+                                  keep_selection=args.keep_selection,
+                                  export_keeps_selection=args.export_keeps_selection),
+                        verbose=args.verbose)
+    print(f"ComBase stand-in running at {server.base_url}")
+    print(f"Log in with username '{STUB_USERNAME}' and password '{STUB_PASSWORD}'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
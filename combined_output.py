@@ -0,0 +1,294 @@
+"""
+Writers for the combined Data Records and Logs tables.
+
+The combiner streams rows into one writer per requested format, so several
+formats are written in a single pass over the exports:
+
+- ``xlsx``: one workbook, spilling a table onto extra sheets past Excel's row limit
+- ``csv``: one CSV file per table, appended in chunks
+- ``parquet``: one Parquet file per table, written a row group at a time (needs pyarrow)
+- ``feather``: one Feather (Arrow IPC) file per table, written a batch at a time (needs pyarrow)
+
+Column types are decided once for the whole combine from the kinds of value
+seen in each column (see ``column_dtypes``), so every chunk of a table is
+written with the same schema.
+"""
+
+import datetime
+import os
+
+import pandas as pd
+from openpyxl import Workbook
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Rows per sheet in .xlsx, including the header row
+MAX_SHEET_ROWS = 1_048_576
+
+# Rows buffered before a chunk is written to CSV, Parquet or Feather
+CHUNK_ROWS = 50_000
+
+_VALUE_KINDS = {
+    bool: 'bool',
+    int: 'int',
+    float: 'float',
+    datetime.datetime: 'datetime',
+    datetime.date: 'datetime',
+    str: 'text',
+}
+
+
+def value_kinds(headers, rows):
+    """
+    Return the kinds of value (int, float, bool, datetime, text) seen in each column.
+
+    Returns:
+        list: Sorted kind names per column; empty for columns with only blanks
+    """
+    kinds = [set() for _ in headers]
+    for row in rows:
+        for column_kinds, value in zip(kinds, row):
+            if value is not None:
+                column_kinds.add(_VALUE_KINDS.get(type(value), 'text'))
+    return [sorted(column_kinds) for column_kinds in kinds]
+
+
+def column_dtypes(columns, kinds_by_column):
+    """
+    Choose one pandas dtype per column from the value kinds seen across all files.
+
+    Whole numbers stay integers (nullable ``Int64``), numbers mixing ints and
+    floats become ``float64``, and columns mixing numbers with text are stored as
+    text, so a chunk never has to change the type chosen for an earlier one.
+
+    Args:
+        columns (list): Column names of the table
+        kinds_by_column (dict): Column name to the set of value kinds seen
+
+    Returns:
+        dict: Column name to dtype name
+    """
+    dtypes = {}
+    for name in columns:
+        kinds = kinds_by_column.get(name, set())
+        if kinds == {'int'}:
+            dtypes[name] = 'Int64'
+        elif kinds and kinds <= {'int', 'float'}:
+            dtypes[name] = 'float64'
+        elif kinds == {'bool'}:
+            dtypes[name] = 'boolean'
+        elif kinds == {'datetime'}:
+            dtypes[name] = 'datetime64[us]'
+        else:
+            dtypes[name] = 'string'
+    return dtypes
+
+
+def typed_frame(rows, columns, dtypes):
+    """Build a DataFrame from rows with the dtypes chosen by ``column_dtypes``."""
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for name, dtype in dtypes.items():
+        if dtype == 'string':
+            frame[name] = frame[name].map(lambda value: None if value is None else str(value), na_action='ignore')
+        frame[name] = frame[name].astype(dtype)
+    return frame
+
+
+def table_file_name(base_path, sheet_name, extension):
+    """Return the file a table is written to, e.g. ``ComBaseCombined_data_records.parquet``."""
+    return f"{base_path}_{sheet_name.lower().replace(' ', '_')}.{extension}"
+
+
+class XlsxOutput:
+    """
+    One workbook with a sheet per table, written in ``write_only`` mode.
+
+    A table longer than Excel's 1,048,576-row limit continues on
+    ``<name> (2)``, ``<name> (3)``... sheets, each starting with the header row.
+    """
+
+    extension = 'xlsx'
+
+    def __init__(self, base_path, sheet_names, schemas, dtypes=None):
+        self.path = f"{base_path}.xlsx"
+        self.paths = [self.path]
+        self.workbook = Workbook(write_only=True)
+        self.sheet_names = sheet_names
+        self.schemas = schemas
+        self.sheets = [None] * len(sheet_names)
+        self.all_sheets = [[] for _ in sheet_names]
+        self.sheet_rows = [0] * len(sheet_names)
+        self.sheet_counts = [0] * len(sheet_names)
+        for index in range(len(sheet_names)):
+            self._new_sheet(index)
+
+    def _new_sheet(self, index):
+        self.sheet_counts[index] += 1
+        name = self.sheet_names[index]
+        if self.sheet_counts[index] > 1:
+            name = f"{name} ({self.sheet_counts[index]})"
+            print(f"{self.sheet_names[index]} has more rows than fit on one sheet, continuing on '{name}'")
+        self.sheets[index] = self.workbook.create_sheet(name)
+        self.all_sheets[index].append(self.sheets[index])
+        self.sheets[index].append(self.schemas[index])
+        self.sheet_rows[index] = 1
+
+    def write(self, index, rows):
+        for row in rows:
+            if self.sheet_rows[index] >= MAX_SHEET_ROWS:
+                self._new_sheet(index)
+            self.sheets[index].append(row)
+            self.sheet_rows[index] += 1
+
+    def close(self):
+        # Overflow sheets are created as rows arrive; keep each table's sheets together
+        position = 0
+        for sheets in self.all_sheets:
+            for sheet in sheets:
+                self.workbook.move_sheet(sheet.title, position - self.workbook.index(sheet))
+                position += 1
+        self.workbook.save(self.path)
+
+
+class _ChunkedOutput:
+    """Buffers each table's rows and hands them to ``_write_chunk`` as typed DataFrames."""
+
+    def __init__(self, base_path, sheet_names, schemas, dtypes):
+        self.paths = [table_file_name(base_path, name, self.extension) for name in sheet_names]
+        self.schemas = schemas
+        self.dtypes = dtypes
+        self.buffers = [[] for _ in sheet_names]
+
+    def write(self, index, rows):
+        buffer = self.buffers[index]
+        buffer.extend(rows)
+        if len(buffer) >= CHUNK_ROWS:
+            self._flush(index)
+
+    def _flush(self, index, final=False):
+        if self.buffers[index] or final:
+            self._write_chunk(index, typed_frame(self.buffers[index], self.schemas[index], self.dtypes[index]))
+            self.buffers[index] = []
+
+    def close(self):
+        for index in range(len(self.buffers)):
+            self._flush(index, final=True)
+            self._close_table(index)
+
+    def _write_chunk(self, index, frame):
+        raise NotImplementedError
+
+    def _close_table(self, index):
+        pass
+
+
+class CsvOutput(_ChunkedOutput):
+    """One CSV file per table, appended a chunk at a time."""
+
+    extension = 'csv'
+
+    def __init__(self, base_path, sheet_names, schemas, dtypes):
+        super().__init__(base_path, sheet_names, schemas, dtypes)
+        self.started = [False] * len(sheet_names)
+
+    def _write_chunk(self, index, frame):
+        frame.to_csv(self.paths[index], mode='a' if self.started[index] else 'w',
+                     header=not self.started[index], index=False)
+        self.started[index] = True
+
+
+class _ArrowOutput(_ChunkedOutput):
+    """Arrow-based writers; the schema is fixed from the dtypes before the first chunk."""
+
+    def __init__(self, base_path, sheet_names, schemas, dtypes):
+        super().__init__(base_path, sheet_names, schemas, dtypes)
+        self.arrow_schemas = [
+            pyarrow.Schema.from_pandas(typed_frame([], columns, table_dtypes), preserve_index=False)
+            for columns, table_dtypes in zip(schemas, dtypes)
+        ]
+        self.writers = [self._open_table(path, schema) for path, schema in zip(self.paths, self.arrow_schemas)]
+
+    def _write_chunk(self, index, frame):
+        table = pyarrow.Table.from_pandas(frame, schema=self.arrow_schemas[index], preserve_index=False)
+        self.writers[index].write_table(table)
+
+    def _close_table(self, index):
+        self.writers[index].close()
+
+
+class ParquetOutput(_ArrowOutput):
+    """One Parquet file per table, with a row group per chunk."""
+
+    extension = 'parquet'
+
+    def _open_table(self, path, schema):
+        return pyarrow.parquet.ParquetWriter(path, schema)
+
+
+class FeatherOutput(_ArrowOutput):
+    """One Feather (Arrow IPC file format) file per table, with a record batch per chunk."""
+
+    extension = 'feather'
+
+    def _open_table(self, path, schema):
+        return pyarrow.ipc.new_file(path, schema)
+
+
+OUTPUT_FORMATS = {
+    'xlsx': XlsxOutput,
+    'csv': CsvOutput,
+    'parquet': ParquetOutput,
+    'feather': FeatherOutput,
+}
+
+DEFAULT_OUTPUT_FORMAT = 'xlsx'
+
+
+def available_formats():
+    """Return the output formats usable in this environment."""
+    return [name for name in OUTPUT_FORMATS if name in ('xlsx', 'csv') or pyarrow is not None]
+
+
+def output_base(output_path):
+    """Strip a known output format extension, so ``ComBaseCombined.xlsx`` and ``ComBaseCombined`` name the same outputs."""
+    base, extension = os.path.splitext(output_path)
+    return base if extension.lstrip('.').lower() in OUTPUT_FORMATS else output_path
+
+
+def format_from_path(output_path):
+    """Return the output format named by a file extension, or the default format."""
+    extension = os.path.splitext(output_path)[1].lstrip('.').lower()
+    return extension if extension in OUTPUT_FORMATS else DEFAULT_OUTPUT_FORMAT
+
+
+def check_formats(formats):
+    """Raise ValueError if a format is unknown or needs a package that is not installed."""
+    for name in formats:
+        if name not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{name}'. Choose from: {', '.join(OUTPUT_FORMATS)}")
+        if name not in available_formats():
+            raise ValueError(f"Writing {name} files requires the pyarrow package (pip install pyarrow)")
+
+
+def open_outputs(formats, output_path, sheet_names, schemas, dtypes):
+    """
+    Open one writer per requested format.
+
+    Args:
+        formats (list): Names from ``OUTPUT_FORMATS``
+        output_path (str): Output file name; its extension (if a known format) is replaced per format
+        sheet_names (list): Table names, e.g. Data Records and Logs
+        schemas (list): Column names per table
+        dtypes (list): Column dtypes per table, from ``column_dtypes``
+
+    Returns:
+        list: Writers with ``write(index, rows)``, ``close()`` and ``paths``
+    """
+    check_formats(formats)
+    base_path = output_base(output_path)
+    return [OUTPUT_FORMATS[name](base_path, sheet_names, schemas, dtypes) for name in dict.fromkeys(formats)]
@@ -0,0 +1,194 @@
+import glob
+import json
+import os
+import time
+
+# Written into the run folder, next to that run's exports
+CHECKPOINT_NAME = 'crawl_state.json'
+
+
+class CrawlCheckpoint:
+    """
+    Crawl progress saved after every page, so an interrupted crawl can pick up where it stopped.
+
+    The state is the search term, the sources file and run folder, the page size
+    the results were paged at, the last page up to which every page was crawled,
+    the exported files, and the number of sources (and bytes) in the sources file
+    at that point. It is rewritten
+    atomically after each page, so a crash leaves either the old or the new
+    state on disk, never a partial file.
+
+    Args:
+        path (str): Checkpoint file
+        search_term (str): Organism searched for
+        output_file (str): Sources file the crawl appends to
+        run_directory (str): Run folder of the crawl's exports
+    """
+
+    def __init__(self, path, search_term, output_file, run_directory):
+        self.path = path
+        self.search_term = search_term
+        self.output_file = os.path.abspath(output_file)
+        self.run_directory = os.path.abspath(run_directory)
+        self.total_pages = None
+        self.page_size = None
+        self.last_page = 0
+        self.source_count = 0
+        self.sources_bytes = 0
+        self.exported_files = {}
+        self.complete = False
+        # Pages of a batch whose export has not run yet
+        self._awaiting_export = []
+
+    @classmethod
+    def for_run(cls, run_directory, search_term, output_file):
+        """Start a new checkpoint in a run folder."""
+        return cls(os.path.join(run_directory, CHECKPOINT_NAME), search_term, output_file, run_directory)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a checkpoint written by an earlier crawl.
+
+        Args:
+            path (str): Checkpoint file, or the run folder containing it
+
+        Returns:
+            CrawlCheckpoint: The saved state
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, CHECKPOINT_NAME)
+        with open(path, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+        checkpoint = cls(path, state['search_term'], state['output_file'], state['run_directory'])
+        checkpoint.total_pages = state.get('total_pages')
+        checkpoint.page_size = state.get('page_size')
+        checkpoint.last_page = state.get('last_page', 0)
+        checkpoint.source_count = state.get('source_count', 0)
+        checkpoint.sources_bytes = state.get('sources_bytes', 0)
+        checkpoint.exported_files = {int(page): export for page, export in state.get('exported_files', {}).items()}
+        checkpoint.complete = state.get('complete', False)
+        return checkpoint
+
+    @property
+    def next_page(self):
+        """First page that still has to be crawled."""
+        return self.last_page + 1
+
+    def save(self):
+        """Write the state to a temporary file and move it over the checkpoint."""
+        state = {
+            'search_term': self.search_term,
+            'output_file': self.output_file,
+            'run_directory': self.run_directory,
+            'total_pages': self.total_pages,
+            'page_size': self.page_size,
+            'last_page': self.last_page,
+            'source_count': self.source_count,
+            'sources_bytes': self.sources_bytes,
+            'exported_files': {str(page): export for page, export in sorted(self.exported_files.items())},
+            'complete': self.complete,
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def begin(self, sources_sink):
+        """Remember where the sources file stood before the first page, and save."""
+        if self.last_page == 0:
+            sources_sink.flush()
+            self.source_count = sources_sink.count
+            self.sources_bytes = os.path.getsize(sources_sink.output_file)
+        self.save()
+
+    def record_page(self, page_number, sources_sink, export_path=None, exported=True):
+        """
+        Mark a page as crawled and save.
+
+        Only a page directly after the last completed one moves ``last_page``
+        forward, so a page that failed in between is crawled again on resume.
+        A page that was only selected for a batch export is marked complete
+        together with the page whose export covers it; if a page of the batch
+        goes missing first, the whole batch is crawled again on resume.
+
+        Args:
+            page_number (int): Page whose sources were just written
+            sources_sink (SourcesSink): Sink the page's sources were added to
+            export_path (str, optional): Where the page's export was saved
+            exported (bool): False if the page waits for a later page's batch export
+        """
+        if export_path:
+            self.exported_files[page_number] = export_path
+        if self._awaiting_export and page_number != self._awaiting_export[-1] + 1:
+            # A page in between was not crawled, so the batch was never exported
+            self._awaiting_export = []
+        self._awaiting_export.append(page_number)
+        if not exported:
+            return
+        pages, self._awaiting_export = self._awaiting_export, []
+        if pages[0] == self.last_page + 1:
+            # Everything up to this page must be on disk before it is marked complete
+            sources_sink.flush()
+            self.last_page = page_number
+            self.source_count = sources_sink.count
+            self.sources_bytes = os.path.getsize(sources_sink.output_file)
+        self.save()
+
+    def known_source_count(self, output_file):
+        """
+        Return the number of sources in a sources file, if it is the checkpoint's and still ends where it was left.
+
+        A resumed crawl appends to the file after ``restore_sources_file``, so it
+        can number the next sources on without counting the file again.
+
+        Returns:
+            int or None: The saved count, or None if the file is another one or was changed since
+        """
+        if os.path.abspath(output_file) != self.output_file:
+            return None
+        size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+        return self.source_count if size == self.sources_bytes else None
+
+    def finish(self, missing_pages):
+        """Record the end of the crawl; a crawl with missing pages can still be resumed."""
+        self.complete = not missing_pages
+        self.save()
+
+    def restore_sources_file(self):
+        """
+        Cut the sources file back to the last completed page.
+
+        Sources written for pages after that point (a page in progress during a
+        crash, or pages after a failed one) are dropped, so they are not added
+        twice when those pages are crawled again.
+
+        Returns:
+            int: Number of sources left in the file
+        """
+        if os.path.exists(self.output_file) and os.path.getsize(self.output_file) > self.sources_bytes:
+            with open(self.output_file, 'r+b') as file:
+                file.truncate(self.sources_bytes)
+        return self.source_count
+
+
+def find_resumable_run(export_root):
+    """
+    Return the checkpoint of the most recent unfinished crawl under an exports folder.
+
+    Returns:
+        str or None: Path of the checkpoint file
+    """
+    checkpoints = sorted(glob.glob(os.path.join(export_root, 'run_*', CHECKPOINT_NAME)),
+                         key=os.path.getmtime, reverse=True)
+    for path in checkpoints:
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                if not json.load(file).get('complete'):
+                    return path
+        except (OSError, ValueError):
+            continue
+    return None
@@ -0,0 +1,68 @@
+"""
+Options shared by every page and query of a browser crawl.
+
+One CrawlOptions is built from the command line (or a daemon job) and handed
+to login_to_combase, batch_search_combase and serve_browser_daemon, instead of
+passing each setting to them one by one.
+"""
+
+import copy
+
+from artifact_store import DEFAULT_CAPTURE
+from lean_browsing import DEFAULT_BROWSING
+from results_paging import DEFAULT_EXPORT_BATCH, DEFAULT_PAGE_SIZE
+
+
+class CrawlOptions:
+    """
+    How to crawl and where to write what is found.
+
+    Args:
+        output_file (str): Path to the output file for sources; a batch suffixes it with each query's name
+        headless (bool): Whether to run the browsers in headless mode
+        browsing (str): Browsing mode of the browsers started: full or lean
+        base_url (str, optional): Site to crawl (default: the live ComBase Browser)
+        session_cache (SessionCache, optional): Cache of login cookies to reuse and refresh
+        waits (CrawlWaits, optional): Wait conditions and timeouts (default: CrawlWaits for ``browsing``)
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        dedupe (str, optional): Deduplication mode (none, exact or normalized)
+        store (str, optional): Path to a SQLite sources database to record every page in
+        workers (int): Number of browsers crawling page ranges in parallel, or queries in a batch
+        rate_limit (float, optional): Minimum seconds between page requests across all browsers
+        capture (str): Artifacts to archive in each batch query's folder: none, errors or full
+        page_size (str or int): Rows per results page: max, site or a number (see results_paging.py)
+        export_batch (int): Pages selected before each export, where the site keeps selections across pages
+        export (bool): Export every page to Excel
+        records (list, optional): Output formats to combine the summary records of every page into
+            (see record_extractor.py); None leaves the records out
+    """
+
+    def __init__(self, output_file='combase_sources.txt', headless=False, browsing=DEFAULT_BROWSING,
+                 base_url=None, session_cache=None, waits=None, parser_backend=None, dedupe=None, store=None,
+                 workers=1, rate_limit=None, capture=DEFAULT_CAPTURE, page_size=DEFAULT_PAGE_SIZE,
+                 export_batch=DEFAULT_EXPORT_BATCH, export=True, records=None):
+        self.output_file = output_file
+        self.headless = headless
+        self.browsing = browsing
+        self.base_url = base_url
+        self.session_cache = session_cache
+        self.waits = waits
+        self.parser_backend = parser_backend
+        self.dedupe = dedupe
+        self.store = store
+        self.workers = workers
+        self.rate_limit = rate_limit
+        self.capture = capture
+        self.page_size = page_size
+        self.export_batch = export_batch
+        self.export = export
+        self.records = records
+
+    def replace(self, **changes):
+        """Return a copy with the given options changed."""
+        unknown = sorted(name for name in changes if name not in vars(self))
+        if unknown:
+            raise TypeError(f"unknown crawl options: {', '.join(unknown)}")
+        options = copy.copy(self)
+        vars(options).update(changes)
+        return options
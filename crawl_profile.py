@@ -0,0 +1,155 @@
+import cProfile
+import csv
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Written into the run folder unless --profile names another file
+PROFILE_NAME = 'crawl_profile.json'
+
+_COLUMNS = ['stage', 'count', 'total_s', 'mean_s', 'max_s', 'items', 'bytes']
+
+
+class CrawlProfile:
+    """
+    Time spent per crawl stage (login, navigation, page_source, parsing, exports, combining...).
+
+    Each stage is timed with the ``span`` context manager, which also counts the
+    items (sources, records, rows) and bytes the stage handled. Spans can be
+    opened from several crawl threads at once; a stage's totals add up the time
+    of all of them, so stages running in parallel can add up to more than the
+    run's wall time.
+
+    Args:
+        parse_profile (str, optional): File to write cProfile statistics of the
+            parsing spans to; parsing runs one page at a time while it is profiled
+    """
+
+    def __init__(self, parse_profile=None):
+        self.stages = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._stop = None
+        self._lock = threading.Lock()
+        self.parse_profile = parse_profile
+        self._profiler = cProfile.Profile() if parse_profile else None
+        self._profiler_lock = threading.Lock()
+
+    def record(self, stage, elapsed, items=0, nbytes=0):
+        """Add one timed occurrence of a stage."""
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'items': 0, 'bytes': 0})
+            entry['count'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry['items'] += items or 0
+            entry['bytes'] += nbytes or 0
+
+    @contextmanager
+    def span(self, stage, items=0, nbytes=0):
+        """
+        Time a block as one occurrence of a stage.
+
+        Yields a dict whose ``items`` and ``bytes`` can be filled in inside the
+        block, once the counts are known::
+
+            with profile.span('parse', nbytes=len(html)) as span:
+                sources = parse(html)
+                span['items'] = len(sources)
+        """
+        counts = {'items': items, 'bytes': nbytes}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(stage, time.perf_counter() - start, counts['items'], counts['bytes'])
+
+    @contextmanager
+    def parsing(self, nbytes=0):
+        """A ``parse`` span, run under cProfile when a parse profile was requested."""
+        with self.span('parse', nbytes=nbytes) as counts:
+            if self._profiler is None:
+                yield counts
+                return
+            # cProfile only follows the thread that enabled it, so parse one page at a time
+            with self._profiler_lock:
+                self._profiler.enable()
+                try:
+                    yield counts
+                finally:
+                    self._profiler.disable()
+
+    def stop(self):
+        """Freeze the wall time, e.g. before the profile is reported later on."""
+        self._stop = time.perf_counter()
+
+    def elapsed(self):
+        return (self._stop or time.perf_counter()) - self._start
+
+    def rows(self):
+        """Return one row per stage, in the order the stages first ran."""
+        rows = []
+        for stage, entry in list(self.stages.items()):
+            rows.append({
+                'stage': stage,
+                'count': entry['count'],
+                'total_s': round(entry['total'], 4),
+                'mean_s': round(entry['total'] / entry['count'], 4) if entry['count'] else 0.0,
+                'max_s': round(entry['max'], 4),
+                'items': entry['items'],
+                'bytes': entry['bytes'],
+            })
+        return rows
+
+    def summary(self):
+        """Return the stage timings as printable lines."""
+        lines = [f"{'stage':<18} {'count':>6} {'total s':>9} {'mean s':>8} {'max s':>7} {'items':>8} {'MB':>8}"]
+        for row in self.rows():
+            lines.append(f"{row['stage']:<18} {row['count']:>6} {row['total_s']:>9.2f} {row['mean_s']:>8.3f} "
+                         f"{row['max_s']:>7.2f} {row['items']:>8} {row['bytes'] / 1e6:>8.2f}")
+        lines.append(f"{'wall time':<18} {'':>6} {self.elapsed():>9.2f}")
+        return lines
+
+    def save(self, path, waits=None):
+        """
+        Write the profile as CSV (for a ``.csv`` path) or JSON.
+
+        Args:
+            path (str): Output file
+            waits (CrawlWaits, optional): Its per-step wait timings are included in the JSON profile
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=_COLUMNS)
+                writer.writeheader()
+                writer.writerows(self.rows())
+            return
+        profile = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_time_s': round(self.elapsed(), 4),
+            'stages': self.rows(),
+        }
+        if waits is not None:
+            profile['waits'] = waits.timings
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(profile, file, indent=2)
+
+    def save_parse_profile(self):
+        """
+        Write the cProfile statistics of parsing, if requested, and print the top functions.
+
+        Returns:
+            str or None: The statistics file, readable with ``python -m pstats``
+        """
+        if self._profiler is None or not self.stages.get('parse'):
+            return None
+        self._profiler.dump_stats(self.parse_profile)
+        print(f"\nParsing profile saved to {self.parse_profile}; top functions by cumulative time:")
+        pstats.Stats(self.parse_profile).sort_stats('cumulative').print_stats(10)
+        return self.parse_profile
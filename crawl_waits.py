@@ -0,0 +1,223 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from selenium.common.exceptions import (JavascriptException, NoSuchElementException,
+                                        StaleElementReferenceException, TimeoutException)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+DEFAULT_TIMEOUT = 10
+
+# document.readyState values that count as loaded, per pageLoadStrategy; an eager
+# browser has the results as soon as the HTML is parsed, before images and fonts
+READY_STATES = {
+    'normal': ('complete',),
+    'eager': ('interactive', 'complete'),
+}
+
+# Errors that are expected while a page is being replaced; the condition is simply polled again
+_TRANSIENT_ERRORS = (JavascriptException, NoSuchElementException, StaleElementReferenceException)
+
+# Per-step timeouts in seconds; anything not listed uses the global timeout
+DEFAULT_STEP_TIMEOUTS = {
+    'login': 15,
+    'home_page': 10,
+    'search_page': 15,
+    'search_input': 20,
+    'dropdown': 5,
+    'dropdown_select': 3,
+    'search_results': 30,
+    'export_download': 30,
+    'next_page': 20,
+}
+
+# One round trip that captures everything identifying the current results page
+_PAGE_MARKER_SCRIPT = """
+var current = document.getElementById('HiddenCurrentPage');
+var indicator = document.querySelector('.page-indicator');
+var firstSource = document.querySelector("span[id^='lblSource']");
+return [current ? current.value : '', indicator ? indicator.textContent : '',
+        firstSource ? firstSource.textContent : ''].join('|');
+"""
+
+
+def page_marker(driver):
+    """Return a string that changes whenever a different results page is shown."""
+    return driver.execute_script(_PAGE_MARKER_SCRIPT)
+
+
+def document_ready(driver, ready_states=READY_STATES['normal']):
+    return driver.execute_script("return document.readyState") in ready_states
+
+
+def login_finished(driver):
+    """The login postback either left Login.aspx or displayed a failure message."""
+    if "Login.aspx" not in driver.current_url:
+        return True
+    failures = driver.find_elements(By.ID, "Login1_FailureText")
+    return bool(failures and failures[0].text.strip())
+
+
+def page_changed(old_marker, ready_states=READY_STATES['normal']):
+    """Condition: the page marker differs from ``old_marker`` and the document has loaded."""
+    def condition(driver):
+        return page_marker(driver) != old_marker and document_ready(driver, ready_states)
+    return condition
+
+
+def dropdown_item_visible(text):
+    """Condition: a visible ms-res-item containing ``text`` (case-insensitive)."""
+    text = text.lower()
+
+    def condition(driver):
+        for item in driver.find_elements(By.CSS_SELECTOR, "div.ms-res-item"):
+            if item.is_displayed() and text in item.text.lower():
+                return item
+        return False
+    return condition
+
+
+def download_finished(directory, pattern, existing):
+    """Condition: a new file matching ``pattern`` exists and Chrome is no longer writing it."""
+    def condition(_driver):
+        if glob.glob(os.path.join(directory, '*.crdownload')):
+            return False
+        new_files = set(glob.glob(os.path.join(directory, pattern))) - existing
+        return sorted(new_files, key=os.path.getmtime)[-1] if new_files else False
+    return condition
+
+
+class CrawlWaits:
+    """
+    Explicit WebDriverWait conditions with global and per-step timeouts.
+
+    Every wait records how long it actually took (and whether it timed out) under
+    its step name, so the timeouts can be tuned against the site's real latency.
+
+    Args:
+        timeout (float): Default timeout in seconds
+        step_timeouts (dict, optional): Overrides by step name
+        poll_frequency (float): Seconds between condition checks
+        page_load (str): pageLoadStrategy of the browsers (normal or eager); with eager,
+            a page counts as loaded once its HTML is parsed
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, step_timeouts=None, poll_frequency=0.1, page_load='normal'):
+        self.timeout = timeout
+        self.step_timeouts = dict(DEFAULT_STEP_TIMEOUTS)
+        self.step_timeouts.update(step_timeouts or {})
+        self.poll_frequency = poll_frequency
+        self.ready_states = READY_STATES[page_load]
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, step):
+        return self.step_timeouts.get(step, self.timeout)
+
+    def _record(self, step, elapsed, timed_out):
+        with self._lock:
+            entry = self.timings.setdefault(step, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry['timeouts'] += int(timed_out)
+
+    def until(self, driver, step, condition, timeout=None, required=True):
+        """
+        Wait for a condition and record the time spent.
+
+        Args:
+            driver (webdriver.Chrome): The browser instance
+            step (str): Step name used for the timeout and the timings
+            condition (callable): WebDriverWait condition
+            timeout (float, optional): Overrides the configured timeout
+            required (bool): Raise TimeoutException on timeout instead of returning None
+
+        Returns:
+            The condition's truthy result, or None after a timeout when not required
+        """
+        timeout = timeout if timeout is not None else self.timeout_for(step)
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency,
+                                   ignored_exceptions=_TRANSIENT_ERRORS).until(condition)
+        except TimeoutException:
+            self._record(step, time.perf_counter() - start, True)
+            if required:
+                raise
+            print(f"Timed out after {timeout}s waiting for {step}")
+            return None
+        self._record(step, time.perf_counter() - start, False)
+        return result
+
+    def for_login(self, driver):
+        return self.until(driver, 'login', login_finished, required=False)
+
+    def for_url_change(self, driver, step, old_url):
+        return self.until(driver, step, lambda d: d.current_url != old_url and document_ready(d, self.ready_states), required=False)
+
+    def for_url_contains(self, driver, step, text):
+        return self.until(driver, step, lambda d: text in d.current_url and document_ready(d, self.ready_states), required=False)
+
+    def for_presence(self, driver, step, locator):
+        return self.until(driver, step, EC.presence_of_element_located(locator), required=False)
+
+    def for_dropdown_item(self, driver, text):
+        return self.until(driver, 'dropdown', dropdown_item_visible(text), required=False)
+
+    def for_next_page(self, driver, old_element, old_marker):
+        """Wait until the old results are gone (stale) or the page marker has changed."""
+        conditions = [page_changed(old_marker, self.ready_states)]
+        if old_element is not None:
+            conditions.append(lambda d: EC.staleness_of(old_element)(d) and document_ready(d, self.ready_states))
+        return self.until(driver, 'next_page', EC.any_of(*conditions), required=False)
+
+    def for_download(self, driver, directory, pattern, existing):
+        """
+        Wait for a new completed download.
+
+        Args:
+            directory (str): Download directory
+            pattern (str): Glob for the expected file name
+            existing (set): Paths matching the pattern before the download started
+
+        Returns:
+            str or None: Path of the downloaded file
+        """
+        return self.until(driver, 'export_download', download_finished(directory, pattern, existing),
+                          required=False)
+
+    def summary(self):
+        """Return the recorded timings as printable lines."""
+        lines = [f"{'step':<16} {'waits':>5} {'total s':>8} {'mean s':>7} {'max s':>6} {'timeouts':>8}"]
+        for step, entry in sorted(self.timings.items()):
+            mean = entry['total'] / entry['count'] if entry['count'] else 0.0
+            lines.append(f"{step:<16} {entry['count']:>5} {entry['total']:>8.2f} {mean:>7.2f} "
+                         f"{entry['max']:>6.2f} {entry['timeouts']:>8}")
+        return lines
+
+    def save(self, path):
+        """Write the recorded timings and the timeouts in effect to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'timeout': self.timeout, 'step_timeouts': self.step_timeouts, 'timings': self.timings},
+                      file, indent=2)
+
+
+def parse_step_timeouts(values):
+    """
+    Parse ``STEP=SECONDS`` command line values.
+
+    Returns:
+        dict: Step name to timeout in seconds
+    """
+    step_timeouts = {}
+    for value in values or []:
+        step, separator, seconds = value.partition('=')
+        if not separator:
+            raise ValueError(f"Expected STEP=SECONDS, got '{value}'")
+        step_timeouts[step.strip()] = float(seconds)
+    return step_timeouts
@@ -0,0 +1,144 @@
+import glob
+import os
+import re
+import threading
+from datetime import datetime
+
+DEFAULT_DOWNLOADS_DIR = os.path.join(os.path.expanduser('~'), 'Downloads')
+
+# Each crawl gets its own folder under here, so exports from earlier runs are never mixed in
+DEFAULT_EXPORTS_ROOT = os.path.join(DEFAULT_DOWNLOADS_DIR, 'ComBaseExports')
+
+# File name pattern of the workbooks downloaded by the export button
+EXPORT_PATTERN = 'ComBaseExport*.xlsx'
+
+_PAGE_EXPORT = re.compile(r'ComBaseExport_page_(\d+)\.xlsx$')
+
+
+def export_file_name(page_number):
+    """Return the stable name an exported page is saved under."""
+    return f"ComBaseExport_page_{page_number:04d}.xlsx"
+
+
+def new_run_directory(root=DEFAULT_EXPORTS_ROOT):
+    """Create and return a timestamped export folder for one crawl."""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(root, f"run_{stamp}")
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(root, f"run_{stamp}_{suffix}")
+        suffix += 1
+    os.makedirs(path)
+    return path
+
+
+def list_run_exports(run_directory):
+    """
+    Return the page exports saved in a run folder, in page order.
+
+    Returns:
+        list: Paths of ComBaseExport_page_N.xlsx files
+    """
+    exports = []
+    for path in glob.glob(os.path.join(run_directory, 'ComBaseExport_page_*.xlsx')):
+        match = _PAGE_EXPORT.search(os.path.basename(path))
+        if match:
+            exports.append((int(match.group(1)), path))
+    return [path for _, path in sorted(exports)]
+
+
+class DownloadManager:
+    """
+    Per-run download folder that hands each exported workbook back under a stable, per-page name.
+
+    Every browser downloads into its own staging folder inside the run folder, so a
+    finished file can be matched to the page that browser just exported. Once Chrome
+    has finished writing it (no ``.crdownload`` left), the file is moved to
+    ``ComBaseExport_page_NNNN.xlsx`` in the run folder.
+
+    Args:
+        run_directory (str): Folder for this run's exports (created if missing)
+        pattern (str): Glob matching the files the export button downloads
+        staging_root (str, optional): Folder holding the per-browser staging folders (default:
+            ``.incoming`` in the run folder); browsers set up for one manager can then keep
+            downloading for another, as a batch search does for each query's folder
+    """
+
+    def __init__(self, run_directory, pattern=EXPORT_PATTERN, staging_root=None):
+        self.run_directory = run_directory
+        self.pattern = pattern
+        self.staging_root = staging_root or os.path.join(run_directory, '.incoming')
+        self.files = {}
+        self._lock = threading.Lock()
+        os.makedirs(run_directory, exist_ok=True)
+
+    def staging_directory(self, browser_index=0):
+        """Return (and create) the folder one browser downloads into."""
+        path = os.path.abspath(os.path.join(self.staging_root, str(browser_index)))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def chrome_preferences(self, browser_index=0):
+        """Chrome preferences that send downloads to the browser's staging folder without prompting."""
+        return {
+            'download.default_directory': self.staging_directory(browser_index),
+            'download.prompt_for_download': False,
+            'download.directory_upgrade': True,
+            'safebrowsing.enabled': True,
+        }
+
+    def configure_driver(self, driver, browser_index=0):
+        """
+        Allow downloads into the staging folder through CDP.
+
+        Headless Chrome ignores the download preferences, so the download behaviour
+        is also set on the running browser.
+        """
+        try:
+            driver.execute_cdp_cmd('Page.setDownloadBehavior',
+                                   {'behavior': 'allow', 'downloadPath': self.staging_directory(browser_index)})
+        except Exception as e:
+            print(f"Could not set the download folder through CDP: {e}")
+
+    def snapshot(self, browser_index=0):
+        """Return the files already in a browser's staging folder, to call before clicking export."""
+        return set(glob.glob(os.path.join(self.staging_directory(browser_index), self.pattern)))
+
+    def collect(self, driver, page_number, existing, waits, browser_index=0):
+        """
+        Wait for the export of a page to finish and move it to its stable name.
+
+        Args:
+            driver (webdriver.Chrome): Browser that started the download
+            page_number (int): Results page that was exported
+            existing (set): Result of ``snapshot`` taken before the export was clicked
+            waits (CrawlWaits): Wait conditions and timeouts to use
+            browser_index (int): Browser whose staging folder to watch
+
+        Returns:
+            str or None: Path of the saved export, or None if the download did not finish in time
+        """
+        downloaded = waits.for_download(driver, self.staging_directory(browser_index), self.pattern, existing)
+        if not downloaded:
+            print(f"Export of page {page_number} did not finish downloading")
+            return None
+        return self.register(page_number, downloaded)
+
+    def register(self, page_number, path):
+        """Move a finished export into the run folder under its page's stable name."""
+        target = os.path.join(self.run_directory, export_file_name(page_number))
+        if os.path.abspath(path) != os.path.abspath(target):
+            os.replace(path, target)
+        with self._lock:
+            self.files[page_number] = target
+        return target
+
+    def export_path(self, page_number):
+        """Return where a page's export was saved, or None if it has not been saved."""
+        with self._lock:
+            return self.files.get(page_number)
+
+    def exported_files(self):
+        """Return this run's exports in page order."""
+        with self._lock:
+            return [self.files[page_number] for page_number in sorted(self.files)]
@@ -0,0 +1,213 @@
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import load_workbook
+
+from combined_output import DEFAULT_OUTPUT_FORMAT, check_formats, column_dtypes, open_outputs, value_kinds
+
+# Sheets combined from every export, in workbook order
+SHEET_NAMES = ('Data Records', 'Logs')
+
+
+def header_names(row):
+    """
+    Turn a header row into column names the way pandas does.
+
+    Blank headers become ``Unnamed: N`` and repeated names get ``.1``, ``.2``
+    suffixes, so the combined columns match what ``pd.read_excel`` produced.
+    """
+    names = []
+    seen = {}
+    for position, value in enumerate(row):
+        name = f"Unnamed: {position}" if value is None or value == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def merge_columns(header_lists):
+    """Union of column names in first-seen order, like ``pd.concat`` of frames with different columns."""
+    columns = []
+    known = set()
+    for headers in header_lists:
+        for name in headers:
+            if name not in known:
+                known.add(name)
+                columns.append(name)
+    return columns
+
+
+def _read_tables(paths):
+    """
+    Stream both combined sheets of each workbook.
+
+    Returns:
+        list: (path, [(headers, rows) per sheet], [value kinds per column per sheet], error)
+        tuples; blank rows are left out
+    """
+    results = []
+    for path in paths:
+        try:
+            workbook = load_workbook(path, read_only=True, data_only=True)
+            sheets = workbook.worksheets[:len(SHEET_NAMES)]
+            if len(sheets) < len(SHEET_NAMES):
+                workbook.close()
+                results.append((path, None, None, f"does not have at least {len(SHEET_NAMES)} sheets"))
+                continue
+            tables = []
+            for sheet in sheets:
+                rows = sheet.iter_rows(values_only=True)
+                headers = header_names(next(rows, ()))
+                tables.append((headers, [row for row in rows if any(value is not None for value in row)]))
+            workbook.close()
+            kinds = [value_kinds(headers, rows) for headers, rows in tables]
+            results.append((path, tables, kinds, None))
+        except Exception as e:
+            results.append((path, None, None, str(e)))
+    return results
+
+
+def _aligned_rows(headers, rows, columns):
+    """Lay rows out in the merged column order, filling columns the file lacks with None."""
+    if headers == columns:
+        return rows
+    position = {name: index for index, name in enumerate(columns)}
+    layout = [position[name] for name in headers]
+    aligned = []
+    for row in rows:
+        values = [None] * len(columns)
+        for target, value in zip(layout, row):
+            values[target] = value
+        aligned.append(values)
+    return aligned
+
+
+def _iter_in_order(function, paths, workers, chunk_size, *args):
+    """Run ``function`` over chunks of paths on a process pool, yielding results in path order."""
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from function(chunk, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A bounded number of chunks in flight keeps memory flat however many files there are
+        max_in_flight = workers * 2
+        pending = {}
+        next_to_submit = 0
+        for index in range(len(chunks)):
+            while next_to_submit < len(chunks) and next_to_submit < index + max_in_flight:
+                pending[next_to_submit] = executor.submit(function, chunks[next_to_submit], *args)
+                next_to_submit += 1
+            yield from pending.pop(index).result()
+
+
+def combine_exports(excel_files, output_path, workers=None, chunk_size=4, verbose=True, cache=None,
+                    formats=(DEFAULT_OUTPUT_FORMAT,)):
+    """
+    Combine the Data Records and Logs sheets of many ComBaseExport workbooks.
+
+    Files are parsed once, with openpyxl's streaming ``read_only`` mode, on a process
+    pool. Their rows are spooled to a temporary file until every header has been
+    seen, so the columns can be reconciled across files (the union in first-seen
+    order, as ``pd.concat`` does; missing values are left blank). The rows are
+    then streamed in file order into every requested output format at once. Only
+    the chunks in flight are held in memory.
+
+    While parsing, the kinds of value in each column are noted, so the column
+    dtypes of the Parquet, Feather and CSV outputs are decided once for the whole
+    combine.
+
+    With a cache, the parsed sheets are kept in it instead of the temporary spool,
+    and only exports that are new or have changed since the last combine are
+    parsed; the rest come straight from the cache.
+
+    Args:
+        excel_files (list): Workbooks in the order their rows should appear
+        output_path (str): Output file; its extension is replaced for each format
+        workers (int, optional): Number of worker processes (default: CPU count)
+        chunk_size (int): Number of workbooks handed to a worker per task
+        verbose (bool): Print each file as it is processed
+        cache (ExportCache, optional): Parsed-sheet cache to reuse and update
+        formats (list): Output formats from ``combined_output.OUTPUT_FORMATS``
+
+    Returns:
+        dict: 'files' combined, 'parsed' and 'cached' file counts, 'skipped' (path, reason)
+        pairs, 'rows' per sheet name and the 'outputs' written
+    """
+    check_formats(formats)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+    excel_files = list(excel_files)
+    stats = {'files': 0, 'parsed': 0, 'cached': 0, 'skipped': [], 'rows': dict.fromkeys(SHEET_NAMES, 0),
+             'outputs': []}
+    header_lists = [[] for _ in SHEET_NAMES]
+    column_kinds = [{} for _ in SHEET_NAMES]
+    combined = []
+
+    cached_info = {}
+    if cache is not None:
+        for path in excel_files:
+            try:
+                info = cache.lookup(path)
+            except OSError:
+                info = None
+            if info is not None:
+                cached_info[path] = info
+    parsed = _iter_in_order(_read_tables, [path for path in excel_files if path not in cached_info],
+                            workers, chunk_size)
+
+    with tempfile.TemporaryFile() as spool:
+        for path in excel_files:
+            if path in cached_info:
+                file_headers, file_kinds = cached_info[path]
+                stats['cached'] += 1
+            else:
+                _, tables, file_kinds, error = next(parsed)
+                if error:
+                    print(f"Error processing {path}: {error}")
+                    stats['skipped'].append((path, error))
+                    continue
+                file_headers = [headers for headers, _ in tables]
+                stats['parsed'] += 1
+                if cache is not None:
+                    cache.store(path, tables, file_kinds)
+                else:
+                    pickle.dump(tables, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            if verbose:
+                print(f"Processing {path}...")
+            stats['files'] += 1
+            combined.append(path)
+            for headers, kinds, header_list, kinds_by_column in zip(file_headers, file_kinds,
+                                                                    header_lists, column_kinds):
+                header_list.append(headers)
+                for name, kinds_seen in zip(headers, kinds):
+                    kinds_by_column.setdefault(name, set()).update(kinds_seen)
+
+        if cache is not None:
+            cache.save()
+        if not stats['files']:
+            return stats
+        schemas = [merge_columns(headers) for headers in header_lists]
+        dtypes = [column_dtypes(columns, kinds) for columns, kinds in zip(schemas, column_kinds)]
+        outputs = open_outputs(formats, output_path, SHEET_NAMES, schemas, dtypes)
+
+        spool.seek(0)
+        for path in combined:
+            tables = cache.load(path) if cache is not None else pickle.load(spool)
+            for index, (name, columns, (headers, rows)) in enumerate(zip(SHEET_NAMES, schemas, tables)):
+                aligned = _aligned_rows(headers, rows, columns)
+                for output in outputs:
+                    output.write(index, aligned)
+                stats['rows'][name] += len(rows)
+
+    for output in outputs:
+        output.close()
+        stats['outputs'].extend(output.paths)
+    return stats
@@ -0,0 +1,157 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+
+import pandas as pd
+
+# pandas imports pyarrow itself when it reads or writes Feather; only check that it is there
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+DEFAULT_COMBINE_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'combase', 'exports')
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_hash(path, block_size=1 << 20):
+    """Return the SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _frame_rows(frame):
+    """Rows of a DataFrame as tuples of plain values, with missing values as None."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+class ExportCache:
+    """
+    Sidecar cache of the parsed Data Records and Logs sheets of each export.
+
+    A JSON manifest maps every export path to its size, mtime, content hash,
+    header rows and the kinds of value in each column. The parsed rows are
+    stored once per content hash, as Feather files when pyarrow is installed and
+    as pickles otherwise. A file whose size and mtime are unchanged is trusted
+    without reading it; otherwise it is hashed and only re-parsed if the contents
+    really changed. Exports that were renamed or moved (for example into a run
+    folder) are found again by their hash.
+
+    Args:
+        cache_dir (str): Directory for the manifest and the sidecar files
+    """
+
+    def __init__(self, cache_dir=DEFAULT_COMBINE_CACHE):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable combine cache manifest {self.manifest_path}: {e}")
+        # Content hash -> entry, so moved exports are found without scanning the manifest
+        self._by_hash = {entry['sha1']: entry for entry in self.entries.values()}
+        self.hits = 0
+        self.misses = 0
+
+    def _sidecar_paths(self, entry):
+        base = os.path.join(self.cache_dir, entry['sha1'])
+        if entry['format'] == 'feather':
+            return [f"{base}-{index}.feather" for index in range(len(entry['headers']))]
+        return [f"{base}.pkl"]
+
+    def _entry_by_hash(self, sha1):
+        return self._by_hash.get(sha1)
+
+    def _add_entry(self, path, entry):
+        self.entries[os.path.abspath(path)] = entry
+        self._by_hash[entry['sha1']] = entry
+
+    def _usable(self, entry):
+        return ('kinds' in entry
+                and all(os.path.exists(sidecar) for sidecar in self._sidecar_paths(entry)))
+
+    def lookup(self, path):
+        """
+        Return the cached headers and value kinds of an export if its parsed sheets are still valid.
+
+        Returns:
+            tuple or None: (column names per sheet, value kinds per column per sheet),
+            or None if the file must be parsed
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.entries.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            if self._usable(entry):
+                self.hits += 1
+                return entry['headers'], entry['kinds']
+
+        # Changed size or mtime, or a path we have not seen: fall back to the content hash
+        sha1 = file_hash(path)
+        known = entry if entry and entry['sha1'] == sha1 else self._entry_by_hash(sha1)
+        if known and self._usable(known):
+            self._add_entry(key, dict(known, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+            self.hits += 1
+            return known['headers'], known['kinds']
+        self.misses += 1
+        return None
+
+    def store(self, path, tables, kinds):
+        """Cache the parsed sheets of an export, as (headers, rows) pairs, with their value kinds."""
+        stat = os.stat(path)
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': file_hash(path),
+            'headers': [headers for headers, _ in tables],
+            'kinds': kinds,
+            'format': 'pickle',
+        }
+        if HAS_PYARROW:
+            try:
+                for sidecar, (headers, rows) in zip(self._sidecar_paths(dict(entry, format='feather')), tables):
+                    width = len(headers)
+                    rows = [tuple(row[:width]) + (None,) * (width - len(row)) for row in rows]
+                    pd.DataFrame.from_records(rows, columns=headers).to_feather(sidecar)
+                entry['format'] = 'feather'
+            except Exception as e:
+                # Columns mixing text and numbers cannot be stored as Arrow columns
+                print(f"Caching {path} as a pickle instead of Feather: {e}")
+        if entry['format'] == 'pickle':
+            with open(self._sidecar_paths(entry)[0], 'wb') as file:
+                pickle.dump(tables, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._add_entry(path, entry)
+
+    def load(self, path):
+        """Return the cached (headers, rows) pairs of an export."""
+        entry = self.entries[os.path.abspath(path)]
+        sidecars = self._sidecar_paths(entry)
+        if entry['format'] == 'feather':
+            return [(headers, _frame_rows(pd.read_feather(sidecar)))
+                    for headers, sidecar in zip(entry['headers'], sidecars)]
+        with open(sidecars[0], 'rb') as file:
+            return pickle.load(file)
+
+    def save(self):
+        """Write the manifest, forgetting exports that no longer exist and deleting unused sidecars."""
+        self.entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        self._by_hash = {entry['sha1']: entry for entry in self.entries.values()}
+        in_use = set()
+        for entry in self.entries.values():
+            in_use.update(os.path.basename(sidecar) for sidecar in self._sidecar_paths(entry))
+        for name in os.listdir(self.cache_dir):
+            if name != MANIFEST_NAME and name not in in_use and name.endswith(('.feather', '.pkl')):
+                os.remove(os.path.join(self.cache_dir, name))
+
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
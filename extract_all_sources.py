@@ -1,5 +1,11 @@
 from bs4 import BeautifulSoup
+import argparse
 import os
+from artifact_store import find_archived_run, is_archived_run, stored_pages
+from batch_extract import collect_html_files, iter_extracted_files
+from download_manager import DEFAULT_EXPORTS_ROOT
+from source_extractor import extract_page
+from source_dedup import dedupe_sources
 
 def extract_sources_from_html_file(html_file):
     """
@@ -31,8 +37,47 @@ def save_sources_to_file(sources, output_file):
         for i, source in enumerate(sources, 1):
             file.write(f"{i}. {source}\n\n")
 
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Extract unique sources from saved ComBase HTML files')
+    
+    parser.add_argument('paths', nargs='*',
+                        help='Crawl run folders, or directories or glob patterns of saved HTML files (default: the files saved by older crawls in the current directory, or else the pages archived by the latest run in --export-dir)')
+    
+    parser.add_argument('-o', '--output', default='all_combase_sources.txt',
+                        help='Output file for unique sources')
+    
+    parser.add_argument('--normalize', action='store_true',
+                        help='Also treat case, whitespace, punctuation and citation-style variants of a source as duplicates')
+    
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes when paths are given (default: number of CPUs)')
+    
+    parser.add_argument('--export-dir', default=DEFAULT_EXPORTS_ROOT,
+                        help=f'Folder of crawl run folders to take the latest run from (default: {DEFAULT_EXPORTS_ROOT})')
+    
+    return parser.parse_args()
+
+def extract_sources_from_run(run_directory):
+    """
+    Extract the sources of every results page a crawl archived in its run folder.
+    """
+    sources = []
+    pages = stored_pages(run_directory)
+    if not pages:
+        print(f"No archived results pages found in {run_directory}")
+    for name, html_content in pages:
+        page_sources = extract_page(html_content).sources
+        print(f"Found {len(page_sources)} sources in {name} of {run_directory}")
+        sources.extend(page_sources)
+    return sources
+
 def main():
-    # Define the HTML files to process
+    args = parse_arguments()
+    
+    all_sources = []
+    
+    # Defined here so the default can tell whether an older crawl left its pages in the current directory
     html_files = [
         'combase_search_results.html',
         'combase_page_1.html',
@@ -40,27 +85,45 @@ def main():
         'combase_page_3.html',
         'combase_page_4.html'
     ]
+    latest_run = None
+    if not args.paths and not any(os.path.exists(html_file) for html_file in html_files):
+        latest_run = find_archived_run(args.export_dir)
+        if latest_run:
+            print(f"No saved pages in the current directory, reading the pages archived in {latest_run}")
     
-    all_sources = []
-    
-    # Process each HTML file
-    for html_file in html_files:
-        if os.path.exists(html_file):
-            print(f"Processing {html_file}...")
-            sources = extract_sources_from_html_file(html_file)
+    if latest_run:
+        all_sources.extend(extract_sources_from_run(latest_run))
+    elif args.paths:
+        # Run folders are read from their archive; other paths are parsed across a process pool
+        run_directories = [path for path in args.paths if is_archived_run(path)]
+        for run_directory in run_directories:
+            all_sources.extend(extract_sources_from_run(run_directory))
+        html_files = collect_html_files([path for path in args.paths if path not in run_directories])
+        if html_files:
+            print(f"Processing {len(html_files)} HTML files...")
+        for html_file, sources, error in iter_extracted_files(html_files, workers=args.workers):
+            if error:
+                print(f"Error reading file {html_file}: {error}")
+                continue
             print(f"Found {len(sources)} sources in {html_file}")
             all_sources.extend(sources)
-        else:
-            print(f"File {html_file} not found.")
+    else:
+        # Process each HTML file
+        for html_file in html_files:
+            if os.path.exists(html_file):
+                print(f"Processing {html_file}...")
+                sources = extract_sources_from_html_file(html_file)
+                print(f"Found {len(sources)} sources in {html_file}")
+                all_sources.extend(sources)
+            else:
+                print(f"File {html_file} not found.")
     
     # Remove duplicates while preserving order
-    unique_sources = []
-    for source in all_sources:
-        if source not in unique_sources:
-            unique_sources.append(source)
+    unique_sources, deduplicator = dedupe_sources(all_sources, 'normalized' if args.normalize else 'exact')
+    print(deduplicator.summary())
     
     # Save all sources to a file
-    output_file = 'all_combase_sources.txt'
+    output_file = args.output
     save_sources_to_file(unique_sources, output_file)
     print(f"Extracted {len(unique_sources)} unique sources and saved to {output_file}")
     
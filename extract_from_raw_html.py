@@ -1,11 +1,53 @@
 from bs4 import BeautifulSoup
+import argparse
+import os
 import re
+from artifact_store import find_archived_run, is_archived_run, stored_pages
+from download_manager import DEFAULT_EXPORTS_ROOT
+from source_dedup import dedupe_sources
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Extract the sources of one saved ComBase results page')
+    
+    parser.add_argument('path', nargs='?',
+                        help='HTML file, or crawl run folder whose first archived results page to read (default: combase_search_results.html or combase_page_1.html in the current directory, or else the latest run in --export-dir)')
+    
+    parser.add_argument('--export-dir', default=DEFAULT_EXPORTS_ROOT,
+                        help=f'Folder of crawl run folders to take the latest run from (default: {DEFAULT_EXPORTS_ROOT})')
+    
+    return parser.parse_args()
+
+def read_first_page(path=None, export_root=DEFAULT_EXPORTS_ROOT):
+    """
+    Return the HTML of the page to extract from and where it came from.
+    
+    Crawls archive their pages in the run folder, so without a path the files
+    older crawls left in the current directory are read if they are there, and
+    the first page of the latest archived run otherwise.
+    """
+    if path is None:
+        # Older crawls saved the first results page as combase_search_results.html, later ones as combase_page_1.html
+        path = next((name for name in ('combase_search_results.html', 'combase_page_1.html')
+                     if os.path.exists(name)), None)
+    if path is None:
+        path = find_archived_run(export_root)
+        if path is None:
+            raise FileNotFoundError(f"No saved results page in the current directory or in {export_root}")
+    if is_archived_run(path):
+        pages = stored_pages(path)
+        if not pages:
+            raise FileNotFoundError(f"No archived results pages found in {path}")
+        name, html_content = pages[0]
+        return html_content, f"{name} of {path}"
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read(), path
 
 def main():
-    # Read the raw HTML content from the file
+    args = parse_arguments()
     try:
-        with open('combase_search_results.html', 'r', encoding='utf-8') as file:
-            html_content = file.read()
+        html_content, html_file = read_first_page(args.path, args.export_dir)
+        print(f"Reading {html_file}")
         
         # Parse the HTML content
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -43,6 +85,10 @@ def main():
         
         print(f"Found {len(sources)} sources in the HTML content")
         
+        # Remove duplicates while preserving order
+        sources, deduplicator = dedupe_sources(sources)
+        print(deduplicator.summary())
+        
         # Save sources to a file
         output_file = 'sources_from_raw_html.txt'
         with open(output_file, 'w', encoding='utf-8') as file:
@@ -0,0 +1,817 @@
+import os
+import re
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from combase_site import LOGIN_PATH, site_url
+from artifact_store import ARTIFACTS_DIR, DEFAULT_CAPTURE, ArtifactStore
+from batch_search import run_batch
+from crawl_profile import CrawlProfile
+from download_manager import DEFAULT_DOWNLOADS_DIR, DownloadManager, export_file_name, new_run_directory
+from page_snapshot import PageSnapshot
+from parallel_crawl import RateLimiter, crawl_pages_in_parallel, split_page_range
+from record_extractor import combine_run_records, save_page_records
+from results_paging import (DEFAULT_EXPORT_BATCH, DEFAULT_PAGE_SIZE, PAGE_SIZE_NAME, batch_last_page,
+                            choose_page_size, is_batch_end)
+from session_cache import SESSION_STATE_COOKIES, cookies_from_http_session, restore_http_session
+from source_dedup import make_deduplicator
+from source_store import SourceStore
+from sources_sink import SourcesSink
+
+_POSTBACK = re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)")
+_NON_VALUE_INPUTS = ('submit', 'button', 'image', 'reset', 'file')
+
+
+def parse_form(html_content, form_id=None):
+    """
+    Collect the fields an ASP.NET form would post, including __VIEWSTATE and __EVENTVALIDATION.
+
+    Submit buttons and unchecked checkboxes/radios are left out, as a browser would.
+
+    Args:
+        html_content (str): Page HTML
+        form_id (str, optional): id of the form (default: the first form)
+
+    Returns:
+        tuple: (action, fields, soup) where fields is a list of (name, value) pairs,
+        or (None, [], soup) if the page has no form
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    form = soup.find('form', id=form_id) if form_id else soup.find('form')
+    if form is None:
+        return None, [], soup
+
+    fields = []
+    for element in form.find_all(['input', 'select', 'textarea']):
+        name = element.get('name')
+        if not name or element.has_attr('disabled'):
+            continue
+        if element.name == 'input':
+            input_type = (element.get('type') or 'text').lower()
+            if input_type in _NON_VALUE_INPUTS:
+                continue
+            if input_type in ('checkbox', 'radio') and not element.has_attr('checked'):
+                continue
+            fields.append((name, element.get('value', 'on' if input_type == 'checkbox' else '')))
+        elif element.name == 'select':
+            selected = element.find('option', selected=True) or element.find('option')
+            if selected is not None:
+                fields.append((name, selected.get('value', selected.text)))
+        else:
+            fields.append((name, element.text))
+    return form.get('action', ''), fields, soup
+
+
+def _set_field(fields, name, value):
+    """Replace (or add) a single-valued form field."""
+    fields = [(key, current) for key, current in fields if key != name]
+    fields.append((name, value))
+    return fields
+
+
+def _find_by_ids(soup, ids):
+    for element_id in ids:
+        element = soup.find(id=element_id)
+        if element is not None:
+            return element
+    return None
+
+
+class HttpCrawler:
+    """
+    Browserless ComBase crawler that replays the ASP.NET form posts with a pooled requests.Session.
+
+    Args:
+        base_url (str, optional): Site to crawl (default: the live ComBase Browser)
+        parser_backend (str, optional): Parser backend for extracting sources
+        pool_size (int): Number of keep-alive connections to keep open
+        timeout (int): Seconds to wait for each response
+    """
+
+    def __init__(self, base_url=None, parser_backend=None, pool_size=4, timeout=30):
+        self.base_url = base_url
+        self.parser_backend = parser_backend
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                                              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.current_url = None
+        self.page_source = None
+        # Whether the next postback ticks every exportchk box, as a browser posts its ticked boxes
+        self.selected = False
+
+    def _load(self, response):
+        response.raise_for_status()
+        self.current_url = response.url
+        self.page_source = response.text
+        return response
+
+    def get(self, url):
+        return self._load(self.session.get(url, timeout=self.timeout))
+
+    def post_form(self, fields, action=None):
+        """Post form fields back to the current page (or to ``action`` relative to it)."""
+        url = urljoin(self.current_url, action or '')
+        return self.session.post(url, data=fields, timeout=self.timeout)
+
+    def login(self, username, password):
+        """
+        Replay the Login1_* login postback.
+
+        Returns:
+            bool: True if the server redirected away from Login.aspx
+        """
+        print("Loading ComBase Browser login page...")
+        self.get(site_url(LOGIN_PATH, self.base_url))
+        action, fields, soup = parse_form(self.page_source)
+
+        username_input = soup.find(id='Login1_UserName')
+        password_input = soup.find(id='Login1_Password')
+        login_button = soup.find(id='Login1_Button1')
+        if username_input is None or password_input is None:
+            print("Login form fields not found")
+            return False
+
+        fields = _set_field(fields, username_input['name'], username)
+        fields = _set_field(fields, password_input['name'], password)
+        if login_button is not None and login_button.get('name'):
+            fields.append((login_button['name'], login_button.get('value', '')))
+
+        print("Posting login form...")
+        self._load(self.post_form(fields, action))
+        if "Login.aspx" in self.current_url:
+            failure = BeautifulSoup(self.page_source, 'html.parser').find(id='Login1_FailureText')
+            print(f"Login failed. Error message: {failure.text.strip() if failure else 'unknown'}")
+            return False
+        print("Login successful! Redirected to:", self.current_url)
+        return True
+
+    def restore_session(self, session_cache, username):
+        """
+        Load cached login cookies and open the cached search page.
+
+        Returns:
+            bool: True if the cached session is still accepted
+        """
+        entry = restore_http_session(self.session, session_cache, username, self.base_url)
+        if not entry or not entry.get('search_url'):
+            return False
+        print("Restoring cached ComBase session...")
+        self.get(entry['search_url'])
+        if "Login.aspx" in self.current_url:
+            print("Cached session was rejected by the server, logging in again")
+            session_cache.invalidate(username, self.base_url)
+            self.session.cookies.clear()
+            return False
+        session_cache.touch(username, self.base_url)
+        return True
+
+    def share_session(self, other):
+        """Copy another crawler's login cookies, leaving out its server-side session state."""
+        for cookie in other.session.cookies:
+            if cookie.name not in SESSION_STATE_COOKIES:
+                self.session.cookies.set_cookie(cookie)
+
+    def save_session(self, session_cache, username):
+        """Cache the current cookies and search page URL."""
+        session_cache.save(cookies_from_http_session(self.session), username, search_url=self.current_url)
+
+    def open_search_page(self):
+        """
+        Follow the Browser link from the home page.
+
+        Returns:
+            bool: True if the search page was loaded
+        """
+        soup = BeautifulSoup(self.page_source, 'html.parser')
+        link = None
+        for anchor in soup.find_all('a', href=True):
+            if 'Browser' in anchor.text or 'Search.aspx' in anchor['href']:
+                link = anchor
+                break
+        if link is None:
+            print("ERROR: Could not find Browser link")
+            return False
+        self.get(urljoin(self.current_url, link['href']))
+        print("Current URL after following Browser link:", self.current_url)
+        return True
+
+    def search(self, search_term, filters=()):
+        """
+        Post the organism search form.
+
+        Args:
+            search_term (str): Organism to search for
+            filters (tuple): (field, value) pairs for other search-page inputs, by id or name
+
+        Returns:
+            bool: True if the server returned SearchResults.aspx
+        """
+        action, fields, soup = parse_form(self.page_source)
+        organism_input = (_find_by_ids(soup, ['ContentPlaceHolder1_txtOrganism'])
+                          or soup.find('input', attrs={'name': re.compile(r'txtOrganism$')}))
+        if organism_input is None or not organism_input.get('name'):
+            print("Organism input field not found on search page")
+            return False
+        fields = _set_field(fields, organism_input['name'], search_term)
+        for field, value in filters:
+            element = soup.find(id=field) or soup.find(attrs={'name': field})
+            if element is None or not element.get('name'):
+                print(f"Search filter field '{field}' not found, ignoring it")
+                continue
+            fields = _set_field(fields, element['name'], value)
+
+        button = (_find_by_ids(soup, ['btnDoSearch', 'ContentPlaceHolder1_btnDoSearch'])
+                  or soup.find('input', attrs={'type': 'submit', 'value': 'Search'}))
+        if button is not None and button.get('name'):
+            fields.append((button['name'], button.get('value', '')))
+
+        print(f"Posting search for '{search_term}'...")
+        self._load(self.post_form(fields, action))
+        print("Current URL after search:", self.current_url)
+        return "SearchResults.aspx" in self.current_url
+
+    def current_page(self):
+        """Return the page number in the HiddenCurrentPage field, or None if it is missing."""
+        current = BeautifulSoup(self.page_source, 'html.parser').find('input', id='HiddenCurrentPage')
+        value = current.get('value', '') if current is not None else ''
+        return int(value) if value.isdigit() else None
+
+    def _pager_postback(self, soup):
+        next_link = soup.select_one("a.next[data-action='next']")
+        return _POSTBACK.search(next_link.get('href', '') if next_link else '')
+
+    def _with_selection(self, fields, soup, selected=None):
+        """Post the exportchk boxes ticked when the page is selected, and none otherwise."""
+        checkboxes = soup.select('input.exportchk')
+        names = {checkbox.get('name') for checkbox in checkboxes}
+        fields = [(name, value) for name, value in fields if name not in names]
+        if selected is None:
+            selected = self.selected
+        if selected:
+            fields += [(checkbox['name'], checkbox.get('value', 'on')) for checkbox in checkboxes
+                       if checkbox.get('name')]
+        self.selected = False
+        return fields
+
+    def select_page(self):
+        """
+        Tick every exportchk box on the current page; they are posted with the next postback.
+
+        Returns:
+            int: Number of boxes ticked
+        """
+        self.selected = True
+        return len(BeautifulSoup(self.page_source, 'html.parser').select('input.exportchk'))
+
+    def set_page_size(self, page_size=DEFAULT_PAGE_SIZE, selected=False):
+        """
+        Pick an option of the results grid's rows-per-page dropdown and post it back.
+
+        Args:
+            page_size (str or int): max, site or a number of rows (see results_paging.choose_page_size)
+            selected (bool): Post the page's exportchk boxes ticked
+
+        Returns:
+            int or None: Rows per page now shown, or None if the page has no rows-per-page dropdown
+        """
+        action, fields, soup = parse_form(self.page_source)
+        dropdown = next((select for select in soup.find_all('select')
+                         if PAGE_SIZE_NAME.search(f"{select.get('id', '')} {select.get('name', '')}")), None)
+        if dropdown is None or not dropdown.get('name'):
+            print("No rows-per-page dropdown found, keeping the site's page size")
+            return None
+        options = [option.get('value', option.text) for option in dropdown.find_all('option')]
+        current = dict(fields).get(dropdown['name'], '')
+        target = choose_page_size(options, page_size)
+        if (target is None or target == current) and not selected:
+            return int(current) if current.isdigit() else None
+        target = target or current
+        if target != current:
+            print(f"Showing {target} rows per page...")
+        fields = _set_field(fields, dropdown['name'], target)
+        fields = _set_field(fields, '__EVENTTARGET', dropdown['name'])
+        fields = _set_field(fields, '__EVENTARGUMENT', '')
+        self._load(self.post_form(self._with_selection(fields, soup, selected), action))
+        return int(target) if target.isdigit() else None
+
+    def selection_persists(self):
+        """
+        Tell whether the site keeps ticked records selected across postbacks.
+
+        The page's boxes are posted ticked with the rows-per-page dropdown, which
+        reloads the first page; they are left unticked by the next postback.
+
+        Returns:
+            bool: True if the reloaded page shows the boxes still ticked
+        """
+        print("Checking whether the site keeps selections across pages...")
+        if self.set_page_size('site', selected=True) is None:
+            print("Cannot check whether the site keeps selections across pages")
+            return False
+        checkboxes = BeautifulSoup(self.page_source, 'html.parser').select('input.exportchk')
+        kept = any(checkbox.has_attr('checked') for checkbox in checkboxes)
+        if not kept:
+            print("The site does not keep selections across pages")
+        return kept
+
+    def jump_to_page(self, page_number):
+        """
+        Go straight to a results page by replaying the pager's next postback as if from the page before it.
+
+        Returns:
+            int or None: Page now shown; check it, since a server that ignores
+            HiddenCurrentPage just moves one page on
+        """
+        action, fields, soup = parse_form(self.page_source)
+        current = soup.find('input', id='HiddenCurrentPage')
+        postback = self._pager_postback(soup)
+        if current is None or not postback:
+            return self.current_page()
+        print(f"Jumping to page {page_number}...")
+        fields = _set_field(fields, current.get('name', 'HiddenCurrentPage'), str(page_number - 1))
+        fields = _set_field(fields, '__EVENTTARGET', postback.group(1))
+        fields = _set_field(fields, '__EVENTARGUMENT', postback.group(2))
+        self._load(self.post_form(self._with_selection(fields, soup), action))
+        return self.current_page()
+
+    def clear_batch_selection(self, first_page, last_page):
+        """
+        Check that a batch's export unticked the records of the batch's earlier pages, and untick them if not.
+
+        A site may only untick the records of the page an export was made from, so
+        the batch's other pages would be exported again with the next batch. The
+        batch's first page is shown to see whether its boxes are still ticked; if
+        they are, each page of the batch is posted back unticked on the way to its
+        last page. Either way the crawler ends on the batch's last page.
+
+        Args:
+            first_page (int): First page of the batch
+            last_page (int): Page the batch was exported from, which is shown now
+
+        Returns:
+            bool: True if the export left the batch's earlier pages selected
+        """
+        print(f"Checking that the export unticked pages {first_page}-{last_page - 1}...")
+        if self.jump_to_page(first_page) != first_page:
+            print(f"Could not go back to page {first_page} to check its selection")
+            self.jump_to_page(last_page)
+            return True
+        checkboxes = BeautifulSoup(self.page_source, 'html.parser').select('input.exportchk')
+        if not any(checkbox.has_attr('checked') for checkbox in checkboxes):
+            self.jump_to_page(last_page)
+            return False
+        print(f"The export left pages {first_page}-{last_page - 1} selected, unticking them...")
+        page = first_page
+        while page < last_page and self.next_page():
+            page += 1
+        return True
+
+    def next_page(self):
+        """
+        Replay the pager postback for the next results page.
+
+        Returns:
+            bool: True if a new page was loaded
+        """
+        action, fields, soup = parse_form(self.page_source)
+        postback = self._pager_postback(soup)
+        if postback:
+            fields = _set_field(fields, '__EVENTTARGET', postback.group(1))
+            fields = _set_field(fields, '__EVENTARGUMENT', postback.group(2))
+        else:
+            current = soup.find('input', id='HiddenCurrentPage')
+            if current is None or not current.get('value', '').isdigit():
+                print("Next page link not found")
+                return False
+            fields = _set_field(fields, current.get('name', 'HiddenCurrentPage'), str(int(current['value']) + 1))
+        self._load(self.post_form(self._with_selection(fields, soup), action))
+        return True
+
+    def export_page(self, page_number, downloads_dir=DEFAULT_DOWNLOADS_DIR, filename=None, first_page=None):
+        """
+        Select every exportchk box on the current page and post the cbBtnExportToExcel button.
+
+        Where the site keeps selections across pages, the export also covers the
+        records selected on the pages before it (see ``select_page``).
+
+        Args:
+            page_number (int): Page number, used to name the file if the server does not
+            downloads_dir (str): Directory to save the workbook in
+            filename (str, optional): Name to save it under, replacing any file of that name;
+                by default the server's name is used without overwriting existing files
+            first_page (int, optional): First page of the batch the export covers, for messages
+
+        Returns:
+            str or None: Path of the saved workbook
+        """
+        action, fields, soup = parse_form(self.page_source)
+        checkboxes = soup.select('input.exportchk')
+        if not checkboxes:
+            print("No checkboxes found for export")
+            return None
+        fields = self._with_selection(fields, soup, True)
+
+        button = _find_by_ids(soup, ['cbBtnExportToExcel', 'ContentPlaceHolder1_cbBtnExportToExcel'])
+        if button is None:
+            print("Export button not found with any known ID")
+            return None
+        fields.append((button.get('name', button['id']), button.get('value', '')))
+
+        if first_page and first_page < page_number:
+            print(f"Exporting the records selected on pages {first_page}-{page_number}...")
+        else:
+            print(f"Exporting {len(checkboxes)} records from page {page_number}...")
+        response = self.post_form(fields, action)
+        response.raise_for_status()
+        disposition = response.headers.get('Content-Disposition', '')
+        if 'attachment' not in disposition and 'html' in response.headers.get('Content-Type', ''):
+            print("Export did not return a file")
+            return None
+
+        os.makedirs(downloads_dir, exist_ok=True)
+        if filename:
+            path = os.path.join(downloads_dir, filename)
+        else:
+            match = re.search(r'filename="?([^";]+)"?', disposition)
+            filename = os.path.basename(match.group(1)) if match else export_file_name(page_number)
+            path = os.path.join(downloads_dir, filename)
+            stem, extension = os.path.splitext(path)
+            suffix = 1
+            while os.path.exists(path):
+                path = f"{stem} ({suffix}){extension}"
+                suffix += 1
+        with open(path, 'wb') as file:
+            file.write(response.content)
+        print(f"Export saved to {path}")
+        return path
+
+    def close(self):
+        self.session.close()
+
+
+class HttpPageWorker:
+    """
+    Archives and exports results pages for one crawler, as driven by crawl_pages_in_parallel.
+
+    The pages are parsed off the crawler's thread (see ``parse_snapshot``), so the
+    crawler requests the next page while the last one is parsed.
+
+    Args:
+        crawler (HttpCrawler): Crawler showing a results page
+        downloads (DownloadManager): Run folder the exported workbooks are saved in
+        export (bool): Export every page to Excel
+        owns_crawler (bool): Close the crawler when the worker is closed
+        profile (CrawlProfile, optional): Records the time spent in each stage of a page
+        artifacts (ArtifactStore, optional): Archive the results pages are saved in
+        export_batch (int): Pages selected before each export (see results_paging.py); after
+            the first export of a batch of pages, drops to 1 if the export left the batch selected
+        total_pages (int, optional): Number of results pages, whose last page ends the last batch
+        records (bool): Also read the summary records when parsing a page
+    """
+
+    def __init__(self, crawler, downloads, export=True, owns_crawler=True, profile=None, artifacts=None,
+                 export_batch=1, total_pages=None, records=False):
+        self.crawler = crawler
+        self.downloads = downloads
+        self.export = export
+        self.owns_crawler = owns_crawler
+        self.profile = profile or CrawlProfile()
+        self.artifacts = artifacts or ArtifactStore(None)
+        self.export_batch = export_batch
+        self.total_pages = total_pages or 1
+        self.batch_first = None
+        self.batch_checked = False
+        self.records = records
+
+    def process_page(self, page_number, snapshot=None):
+        """
+        Archive and export the current page, or select it for its batch's export.
+
+        Returns:
+            PageSnapshot: The page's HTML, to parse with ``parse_snapshot``
+        """
+        snapshot = snapshot or PageSnapshot(self.crawler.page_source, self.profile)
+        self.artifacts.save_html(f"combase_page_{page_number}.html", snapshot.html)
+        if not self.export:
+            return snapshot
+        if self.batch_first is None:
+            self.batch_first = page_number
+        if not is_batch_end(page_number, self.export_batch, self.total_pages):
+            selected = self.crawler.select_page()
+            print(f"Selected {selected} records on page {page_number} for the export of pages "
+                  f"{self.batch_first}-{batch_last_page(page_number, self.export_batch, self.total_pages)}")
+            return snapshot
+        with self.profile.span('export') as span:
+            path = self.crawler.export_page(page_number, self.downloads.run_directory,
+                                            export_file_name(page_number), first_page=self.batch_first)
+            span['bytes'] = os.path.getsize(path) if path else 0
+        if path:
+            self.downloads.register(page_number, path)
+        if self.batch_first < page_number and not self.batch_checked:
+            self.batch_checked = True
+            if self.crawler.clear_batch_selection(self.batch_first, page_number):
+                print("Exporting the remaining pages one by one")
+                self.export_batch = 1
+        self.batch_first = None
+        return snapshot
+
+    def parse_snapshot(self, snapshot):
+        """Return the PageData of a captured page; safe to call from another thread."""
+        return snapshot.page_data(self.crawler.parser_backend, self.records)
+
+    def next_page(self, page_number):
+        with self.profile.span('next_page') as span:
+            reached = self.crawler.next_page()
+            span['bytes'] = len(self.crawler.page_source or '')
+        return reached
+
+    def jump_to_page(self, page_number):
+        with self.profile.span('jump_to_page') as span:
+            reached = self.crawler.jump_to_page(page_number)
+            span['bytes'] = len(self.crawler.page_source or '')
+        return reached
+
+    def close(self):
+        if self.owns_crawler:
+            self.crawler.close()
+
+
+def crawl_with_http(username, password, output_file='combase_sources.txt', search_term='salmonella spp',
+                    parser_backend=None, dedupe=None, store=None, session_cache=None, base_url=None,
+                    downloads=None, export=True, workers=1, rate_limit=None, checkpoint=None, filters=(),
+                    crawler=None, search_url=None, label=None, profile=None, artifacts=None,
+                    page_size=DEFAULT_PAGE_SIZE, export_batch=DEFAULT_EXPORT_BATCH, records=None):
+    """
+    Log in, search and walk every results page over plain HTTP, without a browser.
+
+    Args:
+        username (str): The username for login
+        password (str): The password for login
+        output_file (str): Path to the output file for sources
+        search_term (str): Organism to search for
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        dedupe (str, optional): Deduplication mode (none, exact or normalized)
+        store (str, optional): Path to a SQLite sources database to record every page in
+        session_cache (SessionCache, optional): Cache of login cookies to reuse and refresh
+        base_url (str, optional): Site to crawl (default: the live ComBase Browser)
+        downloads (DownloadManager, optional): Run folder for the exported workbooks (default: a new
+            timestamped folder under ~/Downloads/ComBaseExports)
+        export (bool): Export every page to Excel
+        workers (int): Number of sessions crawling page ranges in parallel
+        rate_limit (float, optional): Minimum seconds between page requests across all workers
+        checkpoint (CrawlCheckpoint, optional): Progress saved after every page; when it already
+            records completed pages, the crawl continues after the last of them
+        filters (tuple): (field, value) search-page filters to apply with the search term
+        crawler (HttpCrawler, optional): Logged-in crawler to search in instead of logging in;
+            it is left open
+        search_url (str, optional): Search page to open in ``crawler`` before searching
+        label (str, optional): Query name the sources are recorded under in the store (default: search_term)
+        profile (CrawlProfile, optional): Records the time spent in each crawl stage
+        artifacts (ArtifactStore, optional): Archive for the results pages and the search failure page
+        page_size (str or int): Rows per results page: max, site or a number (see results_paging.py)
+        export_batch (int): Pages selected before each export, where the site keeps selections across pages
+        records (list, optional): Output formats to combine the summary records of every page into
+            (see record_extractor.py); None leaves the records out
+
+    Returns:
+        bool: True if every results page was crawled
+    """
+    profile = profile or CrawlProfile()
+    artifacts = artifacts or ArtifactStore(None)
+    if not export:
+        export_batch = 1
+    owns_crawler = crawler is None
+    if owns_crawler:
+        crawler = HttpCrawler(base_url, parser_backend)
+    if downloads is None and (export or records):
+        downloads = DownloadManager(new_run_directory())
+    deduplicator = make_deduplicator(dedupe)
+    # A resumed crawl takes the file's source count from the checkpoint instead of counting it again
+    start_count = checkpoint.known_source_count(output_file) if checkpoint else None
+    sources_sink = SourcesSink(output_file, start_count=start_count, deduplicator=deduplicator)
+    source_store = SourceStore(store) if store else None
+    start_page = checkpoint.next_page if checkpoint else 1
+    if checkpoint:
+        checkpoint.begin(sources_sink)
+
+    def save_page(page_number, page_data):
+        if page_data is None:
+            print(f"Page {page_number} was not crawled")
+            return
+        print(f"\nProcessing page {page_number} of {total_pages}...")
+        with profile.span('write_sources') as span:
+            added = sources_sink.extend(page_data.sources)
+            span['items'] = added
+        print(f"Found {len(page_data.sources)} sources in page {page_number}, added {added} to {output_file}")
+        if source_store:
+            source_store.add_sources(page_data.sources, page_number=page_number, search_term=label or search_term,
+                                     record_ids=page_data.checkbox_ids)
+        if records:
+            with profile.span('write_records') as span:
+                save_page_records(page_data.records, downloads.run_directory, page_number)
+                span['items'] = len(page_data.records)
+        if checkpoint:
+            checkpoint.record_page(page_number, sources_sink, downloads.export_path(page_number) if downloads else None,
+                                   exported=is_batch_end(page_number, export_batch, total_pages))
+
+    def open_worker(index):
+        if index == 0:
+            return lead_worker
+        worker_crawler = HttpCrawler(base_url, parser_backend)
+        try:
+            with profile.span('login'):
+                worker_crawler.share_session(crawler)
+                worker_crawler.get(search_url)
+                if "Login.aspx" in worker_crawler.current_url:
+                    if not (worker_crawler.login(username, password) and worker_crawler.open_search_page()):
+                        raise RuntimeError("worker could not log in")
+            with profile.span('search'):
+                if not worker_crawler.search(search_term, filters):
+                    raise RuntimeError("worker search did not return results")
+            with profile.span('page_size'):
+                worker_crawler.set_page_size(rows_per_page or 'site')
+        except Exception:
+            worker_crawler.close()
+            raise
+        return HttpPageWorker(worker_crawler, downloads, export, profile=profile, artifacts=artifacts,
+                              export_batch=export_batch, total_pages=total_pages, records=bool(records))
+
+    try:
+        if not owns_crawler:
+            if search_url:
+                with profile.span('search_page'):
+                    crawler.get(search_url)
+        elif not (session_cache and crawler.restore_session(session_cache, username)):
+            print(f"Attempting to log in as {username}...")
+            with profile.span('login'):
+                logged_in = crawler.login(username, password)
+            if not logged_in:
+                return False
+            with profile.span('search_page'):
+                opened = crawler.open_search_page()
+            if not opened:
+                return False
+            if session_cache:
+                crawler.save_session(session_cache, username)
+        else:
+            print("Reusing cached session, skipped login. Now on:", crawler.current_url)
+
+        search_url = crawler.current_url
+        with profile.span('search') as span:
+            found = crawler.search(search_term, filters)
+            span['bytes'] = len(crawler.page_source or '')
+        if not found:
+            print("Not redirected to search results page")
+            artifacts.save_html("combase_search_failure.html", crawler.page_source, error=True)
+            return False
+
+        # Fewer, longer pages mean fewer requests and exports; a resumed crawl keeps its page size
+        # so its page numbers cover the same records
+        if checkpoint and checkpoint.page_size:
+            page_size = checkpoint.page_size
+        with profile.span('page_size'):
+            rows_per_page = crawler.set_page_size(page_size)
+            if export_batch > 1 and not crawler.selection_persists():
+                print("Exporting every page on its own")
+                export_batch = 1
+        if checkpoint:
+            checkpoint.page_size = rows_per_page
+
+        # The first page tells how many pages there are; the rest are split between the workers
+        total_pages = 1
+        first_page = PageSnapshot(crawler.page_source, profile)
+        page_data = first_page.page_data(parser_backend, bool(records))
+        if page_data.total_pages is not None:
+            total_pages = page_data.total_pages
+            print(f"Total pages of results: {total_pages}")
+        if export_batch > 1:
+            print(f"Exporting the results in batches of {export_batch} pages")
+        if checkpoint:
+            checkpoint.total_pages = total_pages
+        lead_worker = HttpPageWorker(crawler, downloads, export, owns_crawler=False, profile=profile,
+                                     artifacts=artifacts, export_batch=export_batch, total_pages=total_pages,
+                                     records=bool(records))
+        if start_page == 1:
+            lead_worker.process_page(1, first_page)
+            save_page(1, page_data)
+            start_page = 2
+        else:
+            print(f"Resuming after page {start_page - 1}")
+
+        missing_pages = []
+        if total_pages >= start_page:
+            # Batches are never split between workers
+            page_ranges = split_page_range(total_pages, workers, first_page=start_page, align=export_batch)
+            if len(page_ranges) > 1:
+                print(f"Crawling pages {start_page}-{total_pages} with {len(page_ranges)} parallel sessions...")
+            limiter = RateLimiter(rate_limit) if rate_limit and len(page_ranges) > 1 else None
+            # Sessions only request, archive and export pages; the pages are parsed on parse threads
+            missing_pages = crawl_pages_in_parallel(page_ranges, open_worker, save_page, limiter,
+                                                    parse=lead_worker.parse_snapshot)
+        if checkpoint:
+            checkpoint.finish(missing_pages)
+        if records:
+            with profile.span('combine_records'):
+                combine_run_records(downloads.run_directory, records)
+
+        if missing_pages:
+            print(f"\nCould not crawl pages: {', '.join(map(str, missing_pages))}")
+        else:
+            print("\nAll pages processed successfully!")
+        print(f"Total sources extracted: {sources_sink.count}")
+        if deduplicator:
+            print(deduplicator.summary())
+        return not missing_pages
+    except requests.RequestException as e:
+        print(f"HTTP error: {e}")
+        return False
+    finally:
+        sources_sink.close()
+        if source_store:
+            source_store.close()
+        if owns_crawler:
+            crawler.close()
+
+
+def batch_crawl_with_http(username, password, queries, run_directory, output_file='combase_sources.txt',
+                          parser_backend=None, dedupe=None, store=None, session_cache=None, base_url=None,
+                          export=True, workers=1, profile=None, capture=DEFAULT_CAPTURE,
+                          page_size=DEFAULT_PAGE_SIZE, export_batch=DEFAULT_EXPORT_BATCH, records=None):
+    """
+    Crawl many queries over plain HTTP with a single login.
+
+    The first session logs in (or reuses the cached session); further sessions
+    copy its login cookies. Each session takes queries from a shared queue and
+    crawls all of a query's pages before taking the next one.
+
+    Args:
+        username (str): The username for login
+        password (str): The password for login
+        queries (list): SearchQuery tuples (see batch_search.py)
+        run_directory (str): Batch run folder; each query's exports and checkpoint go in a sub-folder
+        output_file (str): Sources file name, suffixed with each query's name
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        dedupe (str, optional): Deduplication mode (none, exact or normalized)
+        store (str, optional): Path to a SQLite sources database; sources are recorded under each query's label
+        session_cache (SessionCache, optional): Cache of login cookies to reuse and refresh
+        base_url (str, optional): Site to crawl (default: the live ComBase Browser)
+        export (bool): Export every page to Excel
+        workers (int): Number of sessions crawling queries in parallel
+        profile (CrawlProfile, optional): Records the time spent in each crawl stage, over all queries
+        capture (str): Artifacts to archive in each query's folder: none, errors or full
+        page_size (str or int): Rows per results page: max, site or a number (see results_paging.py)
+        export_batch (int): Pages selected before each export, where the site keeps selections across pages
+        records (list, optional): Output formats to combine each query's summary records into, in its folder
+
+    Returns:
+        bool: True if every query was crawled completely
+    """
+    profile = profile or CrawlProfile()
+    lead = HttpCrawler(base_url, parser_backend)
+    try:
+        if not (session_cache and lead.restore_session(session_cache, username)):
+            print(f"Attempting to log in as {username}...")
+            with profile.span('login'):
+                logged_in = lead.login(username, password) and lead.open_search_page()
+            if not logged_in:
+                return False
+            if session_cache:
+                lead.save_session(session_cache, username)
+        else:
+            print("Reusing cached session, skipped login. Now on:", lead.current_url)
+    except requests.RequestException as e:
+        print(f"HTTP error: {e}")
+        lead.close()
+        return False
+    search_url = lead.current_url
+
+    def open_session(index):
+        if index == 0:
+            return lead
+        crawler = HttpCrawler(base_url, parser_backend)
+        crawler.share_session(lead)
+        return crawler
+
+    def crawl_query(crawler, query, downloads, query_output_file, checkpoint):
+        artifacts = ArtifactStore(os.path.join(downloads.run_directory, ARTIFACTS_DIR), capture)
+        try:
+            return crawl_with_http(username, password, output_file=query_output_file, search_term=query.organism,
+                                   parser_backend=parser_backend, dedupe=dedupe, store=store, base_url=base_url,
+                                   downloads=downloads, export=export, checkpoint=checkpoint,
+                                   filters=query.filters, crawler=crawler, search_url=search_url,
+                                   label=checkpoint.search_term, profile=profile, artifacts=artifacts,
+                                   page_size=page_size, export_batch=export_batch, records=records)
+        finally:
+            artifacts.close()
+
+    results = run_batch(queries, run_directory, output_file, open_session, crawl_query, HttpCrawler.close, workers)
+    return all(results.values())
@@ -0,0 +1,60 @@
+"""
+Browsing modes for the crawl's Chrome browsers.
+
+``full`` loads every page the way a user's browser does. ``lean`` skips what the
+crawl never looks at:
+
+- images are turned off through Chrome's content settings, and images, fonts,
+  media and third-party analytics are blocked through CDP ``Network.setBlockedURLs``
+- pages are loaded with ``pageLoadStrategy=eager``, so navigation returns once
+  the HTML is parsed instead of after every resource has loaded
+
+The site's own scripts and stylesheets are still loaded: the ASP.NET postbacks
+behind the pager, the organism dropdown and the export button need them.
+"""
+
+BROWSING_MODES = ['full', 'lean']
+DEFAULT_BROWSING = 'full'
+
+# URL patterns blocked in lean mode; '*' matches any text, including query strings
+LEAN_BLOCKED_URLS = [
+    # Images
+    '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*', '*.bmp*',
+    # Fonts
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+    # Media
+    '*.mp4*', '*.webm*', '*.mp3*',
+    # Analytics and tag managers
+    '*google-analytics.com*', '*googletagmanager.com*', '*/gtag/js*', '*doubleclick.net*',
+    '*hotjar.com*', '*connect.facebook.net*',
+]
+
+
+def page_load_strategy(browsing=DEFAULT_BROWSING):
+    """Return the WebDriver pageLoadStrategy (``normal`` or ``eager``) of a browsing mode."""
+    return 'eager' if browsing == 'lean' else 'normal'
+
+
+def browsing_preferences(browsing=DEFAULT_BROWSING):
+    """Return the Chrome preferences of a browsing mode, to merge with the download preferences."""
+    if browsing == 'lean':
+        return {'profile.managed_default_content_settings.images': 2}
+    return {}
+
+
+def block_resources(driver, browsing=DEFAULT_BROWSING):
+    """
+    Block the resource URLs a browsing mode skips, on a running browser.
+
+    Returns:
+        bool: False if the browser refused the CDP commands (the crawl still works, only slower)
+    """
+    if browsing != 'lean':
+        return True
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+    except Exception as e:
+        print(f"Could not block resources through CDP: {e}")
+        return False
+    return True
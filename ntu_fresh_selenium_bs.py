@@ -1,43 +1,78 @@
-from bs4 import BeautifulSoup
 import os
 import re
-import time
 import argparse
 import sys
+import json
 import glob
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, SessionNotCreatedException
+from chromedriver_cache import chromedriver_path
+from sources_sink import SourcesSink, read_sources_file
+from source_extractor import BACKENDS, DEFAULT_BACKEND, extract_page
+from batch_extract import batch_extract_records, batch_extract_sources
+from combined_output import OUTPUT_FORMATS, check_formats, format_from_path
+from excel_combiner import combine_exports
+from export_cache import DEFAULT_COMBINE_CACHE, ExportCache
+from source_dedup import DEDUPE_MODES, make_deduplicator
+from source_store import SourceStore
+from combase_site import BASE_URL, LOGIN_PATH, site_url
+from http_crawler import batch_crawl_with_http, crawl_with_http
+from batch_search import SUMMARY_NAME, SearchQuery, parse_query, read_query_file, run_batch
+from browser_daemon import DEFAULT_SOCKET, BrowserDaemon, BrowserPool, daemon_status, send_request
+from download_manager import (DEFAULT_DOWNLOADS_DIR, DEFAULT_EXPORTS_ROOT, EXPORT_PATTERN, DownloadManager,
+                              list_run_exports, new_run_directory)
+from crawl_checkpoint import CrawlCheckpoint, find_resumable_run
+from crawl_profile import PROFILE_NAME, CrawlProfile
+from page_snapshot import PageSnapshot
+from record_extractor import RECORDS_OUTPUT, combine_run_records, save_page_records
+from artifact_store import (ARTIFACTS_DIR, CAPTURE_LEVELS, DEFAULT_CAPTURE, ArtifactStore, find_archived_run,
+                            stored_pages)
+from lean_browsing import (BROWSING_MODES, DEFAULT_BROWSING, block_resources, browsing_preferences,
+                           page_load_strategy)
+from crawl_options import CrawlOptions
+from crawl_waits import CrawlWaits, DEFAULT_TIMEOUT, page_marker, parse_step_timeouts
+from session_cache import (DEFAULT_MAX_AGE, DEFAULT_SESSION_CACHE, SessionCache, apply_driver_cookies,
+                           restore_driver_session, shareable_cookies)
+from parallel_crawl import DEFAULT_RATE_LIMIT, RateLimiter, crawl_pages_in_parallel, split_page_range
+from results_paging import (DEFAULT_EXPORT_BATCH, DEFAULT_PAGE_SIZE, PAGE_SIZE_NAME, batch_last_page,
+                            choose_page_size, is_batch_end, parse_page_size)
 
 # Default credentials (will be overridden by environment variables or command-line arguments)
 DEFAULT_USERNAME = "" #ADD EMAIL HERE
 DEFAULT_PASSWORD = "" #ADD PASSWORD HERE
 
-def extract_sources_from_html_content(html_content):
+# Organism searched for in ComBase Browser
+DEFAULT_SEARCH_TERM = "salmonella spp"
+
+def extract_sources_from_html_content(html_content, parser_backend=None, profile=None):
     """
     Extract source information from HTML content and return a list of sources.
-    """
-    soup = BeautifulSoup(html_content, 'html.parser')
     
-    # Find all source spans
-    source_spans = soup.find_all('span', id=lambda x: x and x.startswith('lblSource'))
-    
-    sources = []
-    for span in source_spans:
-        sources.append(span.text.strip())
+    Args:
+        html_content (str): HTML of a ComBase search results page
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        profile (CrawlProfile, optional): Records the parse time, size and number of sources
     
+    Returns:
+        list: Source strings in page order
+    """
+    profile = profile or CrawlProfile()
+    with profile.parsing(len(html_content)) as span:
+        sources = extract_page(html_content, parser_backend).sources
+        span['items'] = len(sources)
     return sources
 
 def append_sources_to_file(sources, output_file, existing_sources=None):
     """
     Append sources to a text file, including duplicates.
     
+    For repeated appends to the same file prefer a SourcesSink, which keeps the
+    file open and does not rescan it on every call.
+    
     Args:
         sources (list): List of source strings to append
         output_file (str): Path to the output file
@@ -48,116 +83,241 @@ def append_sources_to_file(sources, output_file, existing_sources=None):
     """
     # Initialize existing_sources if not provided
     if existing_sources is None:
-        existing_sources = []
-        # If the file exists, read existing sources
-        if os.path.exists(output_file):
-            try:
-                with open(output_file, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    # Extract sources from the numbered list format
-                    for line in content.split('\n\n'):
-                        if line.strip() and '. ' in line:
-                            source = line.split('. ', 1)[1].strip()
-                            existing_sources.append(source)
-            except Exception as e:
-                print(f"Error reading existing sources: {e}")
+        try:
+            existing_sources = read_sources_file(output_file)
+        except Exception as e:
+            print(f"Error reading existing sources: {e}")
+            existing_sources = []
     
     # Add all sources, including duplicates
-    with open(output_file, 'a', encoding='utf-8') as file:
-        for source in sources:
-            # If the file is not empty and doesn't end with a newline, add one
-            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                file_content = open(output_file, 'r', encoding='utf-8').read()
-                if not file_content.endswith('\n\n'):
-                    file.write('\n\n')
-            
-            # Write the source with its number
-            file.write(f"{len(existing_sources) + 1}. {source}\n\n")
-            existing_sources.append(source)
+    with SourcesSink(output_file, start_count=len(existing_sources)) as sink:
+        sink.extend(sources)
+    existing_sources.extend(sources)
     
     print(f"Added {len(sources)} sources to {output_file}")
     return existing_sources
 
-def extract_sources_from_html_file(html_file, output_file, existing_sources=None):
+def extract_sources_from_html_file(html_file, output_file, existing_sources=None, parser_backend=None):
     """
     Extract source information from an HTML file and append to the output file.
     
     Args:
         html_file (str): Path to the HTML file
-        output_file (str): Path to the output file
+        output_file (str or SourcesSink): Path to the output file, or an open sink
         existing_sources (list, optional): List of existing sources to avoid duplicates
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
     
     Returns:
-        list: Updated list of all sources (including existing ones)
+        list: Updated list of all sources (including existing ones). When writing
+        to a sink, this is the sink's ``sources`` list (None unless it keeps them).
     """
     try:
         with open(html_file, 'r', encoding='utf-8') as file:
             html_content = file.read()
         
-        sources = extract_sources_from_html_content(html_content)
+        sources = extract_sources_from_html_content(html_content, parser_backend)
         print(f"Found {len(sources)} sources in {html_file}")
         
+        if isinstance(output_file, SourcesSink):
+            added = output_file.extend(sources)
+            print(f"Added {added} sources to {output_file.output_file}")
+            return output_file.sources
+        
         return append_sources_to_file(sources, output_file, existing_sources)
     except Exception as e:
         print(f"Error extracting sources from {html_file}: {e}")
+        if isinstance(output_file, SourcesSink):
+            return output_file.sources
         return existing_sources if existing_sources is not None else []
 
-def extract_and_save_sources(output_file='combase_sources.txt'):
+def extract_and_save_sources(output_file='combase_sources.txt', parser_backend=None, dedupe=None,
+                             run_directory=None, export_root=DEFAULT_EXPORTS_ROOT):
     """
     Extract sources from all saved HTML files and save them to a file.
     
     Args:
         output_file (str): Path to the output file
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        dedupe (str, optional): Deduplication mode (none, exact or normalized)
+        run_directory (str, optional): Run folder whose archived results pages to read,
+            instead of combase_page_N.html files in the current directory
+        export_root (str): Folder of run folders; without run_directory or saved pages in
+            the current directory, the latest run that archived its pages is read
     
     Returns:
-        list: List of all sources (including duplicates)
+        list: List of all sources (including duplicates unless dedupe is set)
     """
+    deduplicator = make_deduplicator(dedupe)
+    
+    # Crawls archive their pages in the run folder rather than the current directory
+    legacy_files = ['combase_search_results.html', 'combase_page_1.html']
+    if not run_directory and not any(os.path.exists(name) for name in legacy_files):
+        run_directory = find_archived_run(export_root)
+        if run_directory:
+            print(f"No saved pages in the current directory, reading the pages archived in {run_directory}")
+    
+    if run_directory:
+        pages = stored_pages(run_directory)
+        if not pages:
+            print(f"No archived results pages found in {run_directory}")
+        with SourcesSink(output_file, truncate=True, keep_sources=True, deduplicator=deduplicator) as sink:
+            for name, html_content in pages:
+                sources = extract_sources_from_html_content(html_content, parser_backend)
+                added = sink.extend(sources)
+                print(f"Found {len(sources)} sources in {name}, added {added}")
+        print(f"Extracted {sink.count} total sources and saved to {output_file}")
+        if deduplicator:
+            print(deduplicator.summary())
+        return sink.sources
+    
     # Define the HTML files to process
     html_files = [
         'combase_page_1.html',
         'combase_page_2.html',
         'combase_page_3.html',
         'combase_page_4.html',
-        'combase_search_results.html'  # Also check the search results page
     ]
+    # Older crawls saved the first results page twice; only use that copy when page 1 is missing
+    if not os.path.exists('combase_page_1.html'):
+        html_files.insert(0, 'combase_search_results.html')
     
-    # Create or clear the output file
-    with open(output_file, 'w', encoding='utf-8') as file:
-        pass
-    
-    all_sources = []
-    total_sources = 0
-    
-    # Process each HTML file
-    for html_file in html_files:
-        if os.path.exists(html_file):
-            print(f"Processing {html_file}...")
-            sources_before = len(all_sources)
-            all_sources = extract_sources_from_html_file(html_file, output_file, all_sources)
-            sources_added = len(all_sources) - sources_before
-            total_sources += sources_added
-        else:
-            print(f"File {html_file} not found.")
+    # Create or clear the output file and keep it open for all pages
+    with SourcesSink(output_file, truncate=True, keep_sources=True, deduplicator=deduplicator) as sink:
+        # Process each HTML file
+        for html_file in html_files:
+            if os.path.exists(html_file):
+                print(f"Processing {html_file}...")
+                extract_sources_from_html_file(html_file, sink, parser_backend=parser_backend)
+            else:
+                print(f"File {html_file} not found.")
     
-    print(f"Extracted {total_sources} total sources and saved to {output_file}")
-    return all_sources
+    print(f"Extracted {sink.count} total sources and saved to {output_file}")
+    if deduplicator:
+        print(deduplicator.summary())
+    return sink.sources
 
-def login_to_combase(username, password, wait_time=5, headless=False, output_file='combase_sources.txt'):
+def submit_login(driver, username, password, base_url=None, waits=None):
     """
-    Logs into the ComBase Browser website using Selenium and BeautifulSoup.
+    Fill in and submit the ComBase login form.
     
     Args:
+        driver (webdriver.Chrome): The browser instance
         username (str): The username for login
         password (str): The password for login
-        wait_time (int): How long to wait between requests (in seconds)
-        headless (bool): Whether to run the browser in headless mode
-        output_file (str): Path to the output file for sources
+        base_url (str, optional): Site to log in to (default: the live ComBase Browser)
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+    """
+    waits = waits or CrawlWaits()
+    
+    # Navigate to the login page
+    print("Navigating to ComBase Browser login page...")
+    driver.get(site_url(LOGIN_PATH, base_url))
+    
+    # Wait for the login form to load
+    waits.until(driver, 'login_form', EC.presence_of_element_located((By.ID, "Login1_UserName")))
+    
+    # Enter login credentials
+    print("Entering login credentials...")
+    driver.find_element(By.ID, "Login1_UserName").send_keys(username)
+    driver.find_element(By.ID, "Login1_Password").send_keys(password)
+    
+    # Click the login button
+    print("Clicking login button...")
+    driver.find_element(By.ID, "Login1_Button1").click()
+    
+    # Wait for redirection (or a failure message) after login
+    waits.for_login(driver)
+
+def open_search_page(driver, waits=None, artifacts=None):
+    """
+    Open the search page from the home page by clicking the Browser link in the sidebar.
+    
+    Args:
+        driver (webdriver.Chrome): A logged-in browser instance
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+        artifacts (ArtifactStore, optional): Where to save the home and search pages
     
     Returns:
-        webdriver.Chrome: The browser instance if successful, None otherwise
+        bool: True if the Browser link was found and clicked
+    """
+    waits = waits or CrawlWaits()
+    artifacts = artifacts or ArtifactStore(None)
+    
+    # Try to find and click on the Browser link in the sidebar
+    print("Looking for Browser link in the sidebar...")
+    
+    # Wait for the sidebar links to be present
+    waits.for_presence(driver, 'home_page',
+                       (By.XPATH, "//a[contains(text(), 'Browser')] | //a[contains(@href, 'Search.aspx')]"))
+    
+    # Save the home page HTML for debugging
+    artifacts.save_page(driver, "combase_home_page.html")
+    
+    # Try multiple approaches to find the Browser link
+    browser_link = None
+    
+    # Try by text content
+    try:
+        browser_link = driver.find_element(By.XPATH, "//a[contains(text(), 'Browser')]")
+        print("Found Browser link by text content")
+    except NoSuchElementException:
+        print("Browser link not found by text content, trying other methods...")
+        
+        # Try by partial link text
+        try:
+            browser_link = driver.find_element(By.PARTIAL_LINK_TEXT, "Browser")
+            print("Found Browser link by partial link text")
+        except NoSuchElementException:
+            print("Browser link not found by partial link text, trying other methods...")
+            
+            # Try by href attribute
+            try:
+                browser_link = driver.find_element(By.XPATH, "//a[contains(@href, 'Search.aspx')]")
+                print("Found Browser link by href attribute")
+            except NoSuchElementException:
+                print("Browser link not found by href attribute")
+    
+    if browser_link:
+        # Click the Browser link
+        print("Clicking Browser link...")
+        home_url = driver.current_url
+        try:
+            browser_link.click()
+        except Exception as click_error:
+            print(f"Regular click failed: {click_error}")
+            print("Trying JavaScript click...")
+            driver.execute_script("arguments[0].click();", browser_link)
+        
+        # Wait for the search page to load
+        print("Waiting for search page to load...")
+        waits.for_url_change(driver, 'search_page', home_url)
+        
+        # Save the search page HTML for debugging
+        artifacts.save_page(driver, "combase_search_page.html")
+        
+        # Print the current URL
+        print("Current URL after clicking Browser link:", driver.current_url)
+    else:
+        print("ERROR: Could not find Browser link using any method")
+        artifacts.save_page(driver, "combase_home_page.html", error=True)
+        print("Please check the website structure or try again later")
+        return False
+    
+    return True
+
+def create_driver(headless=False, downloads=None, browser_index=0, browsing=DEFAULT_BROWSING):
     """
-    print(f"Attempting to log in as {username}...")
+    Start a Chrome browser for crawling.
     
+    Args:
+        headless (bool): Whether to run the browser in headless mode
+        downloads (DownloadManager, optional): Run folder to send Excel exports to
+        browser_index (int): Which of the run's browsers this is, for its download folder
+        browsing (str): Browsing mode: full, or lean to skip images, fonts and analytics
+    
+    Returns:
+        webdriver.Chrome: The browser instance
+    """
     # Set up Chrome options
     chrome_options = Options()
     if headless:
@@ -166,484 +326,935 @@ def login_to_combase(username, password, wait_time=5, headless=False, output_fil
         chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.page_load_strategy = page_load_strategy(browsing)
+    preferences = browsing_preferences(browsing)
+    if downloads:
+        preferences.update(downloads.chrome_preferences(browser_index))
+    if preferences:
+        chrome_options.add_experimental_option('prefs', preferences)
     
-    # Set up Chrome service with automatic ChromeDriver management
-    service = Service(ChromeDriverManager().install())
+    # Set up Chrome service with the ChromeDriver resolved once and cached
+    service = Service(chromedriver_path())
 
     # Initialize the Chrome driver
     print("Starting Chrome browser...")
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except SessionNotCreatedException:
+        # Chrome was updated since the cached driver was resolved
+        service = Service(chromedriver_path(refresh=True))
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    if downloads:
+        downloads.configure_driver(driver, browser_index)
+    block_resources(driver, browsing)
+    return driver
+
+# Sets a search-page input found by id or name, firing the events a user's edit would
+_SET_FILTER_SCRIPT = """
+var field = document.getElementById(arguments[0]) || document.getElementsByName(arguments[0])[0];
+if (!field) { return false; }
+if (field.type === 'checkbox' || field.type === 'radio') {
+    field.checked = ['1', 'true', 'on', 'yes'].indexOf(String(arguments[1]).toLowerCase()) >= 0;
+} else {
+    field.value = arguments[1];
+}
+field.dispatchEvent(new Event('input', {bubbles: true}));
+field.dispatchEvent(new Event('change', {bubbles: true}));
+return true;
+"""
+
+def apply_search_filters(driver, filters):
+    """
+    Fill in other search-page inputs, such as temperature or pH ranges.
     
-    # Initialize the list of existing sources
-    existing_sources = []
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as file:
-                content = file.read()
-                # Extract sources from the numbered list format
-                for line in content.split('\n\n'):
-                    if line.strip() and '. ' in line:
-                        source = line.split('. ', 1)[1].strip()
-                        existing_sources.append(source)
-        except Exception as e:
-            print(f"Error reading existing sources: {e}")
+    Args:
+        driver (webdriver.Chrome): A browser on the search page
+        filters (tuple): (field, value) pairs, where field is an input's id or name
+    """
+    for field, value in filters:
+        if driver.execute_script(_SET_FILTER_SCRIPT, field, value):
+            print(f"Set search filter {field} = {value}")
+        else:
+            print(f"Search filter field '{field}' not found, ignoring it")
+
+def search_for_organism(driver, search_term=DEFAULT_SEARCH_TERM, waits=None, filters=()):
+    """
+    Enter an organism in the search page's MagicSuggest box and run the search.
     
+    Args:
+        driver (webdriver.Chrome): A browser on the search page
+        search_term (str): Organism to search for
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+        filters (tuple): (field, value) pairs for other search-page inputs, by id or name
+    
+    Returns:
+        bool: True if the browser is now on the search results page
+    """
+    waits = waits or CrawlWaits()
+    
+    # Enter the search term
+    print("Entering search term...")
     try:
-        # Navigate to the login page
-        print("Navigating to ComBase Browser login page...")
-        driver.get("https://combasebrowser.errc.ars.usda.gov/membership/Login.aspx?ReturnUrl=%2f")
-        
-        # Wait for the login form to load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "Login1_UserName"))
-        )
+        # Try to find the search input field with a more specific selector
+        search_input = waits.until(driver, 'search_input',
+                                   EC.element_to_be_clickable((By.CSS_SELECTOR, "div.ms-sel-ctn input")))
         
-        # Enter login credentials
-        print("Entering login credentials...")
-        driver.find_element(By.ID, "Login1_UserName").send_keys(username)
-        driver.find_element(By.ID, "Login1_Password").send_keys(password)
+        print("Found search input field, clicking on it...")
+        # Click on the search input field to activate it
+        search_input.click()
         
-        # Click the login button
-        print("Clicking login button...")
-        driver.find_element(By.ID, "Login1_Button1").click()
+        print(f"Typing '{search_term}'...")
+        # Type the search term
+        search_input.send_keys(search_term)
         
-        # Wait for redirection after login
-        time.sleep(3)
+        # Wait for the dropdown to appear
+        print("Waiting for dropdown to appear...")
+        waits.for_dropdown_item(driver, search_term)
         
-        # Check if login was successful
-        if "Login.aspx" not in driver.current_url:
-            print("Login successful! Redirected to:", driver.current_url)
-            
-            # Save the login page HTML for debugging
-            if driver.page_source is not None:
-                with open("combase_login_success.html", "w", encoding="utf-8") as f:
-                    f.write(driver.page_source)
-                print("Login page HTML saved to combase_login_success.html")
-            else:
-                print("Warning: Page source is None, cannot save login success HTML")
-            
-            # Now search for "salmonella spp"
-            print("Searching for 'salmonella spp'...")
-            
-            # Try to find and click on the Browser link in the sidebar
-            print("Looking for Browser link in the sidebar...")
-            
-            # Wait for the page to fully load
-            time.sleep(2)
-            
-            # Save the home page HTML for debugging
-            if driver.page_source is not None:
-                with open("combase_home_page.html", "w", encoding="utf-8") as f:
-                    f.write(driver.page_source)
-                print("Home page HTML saved to combase_home_page.html")
-            else:
-                print("Warning: Page source is None, cannot save home page HTML")
+        try:
+            print(f"Looking for {search_term} in dropdown...")
             
-            # Try multiple approaches to find the Browser link
-            browser_link = None
+            # Try multiple selector strategies
+            selectors = [
+                # Simple class-based selector
+                "div.ms-res-item",
+                # More specific selector
+                "div.ms-res-item.ms-res-item-active",
+                # First item in dropdown
+                ".ms-res-ctn .ms-res-item:first-child"
+            ]
             
-            # Try by text content
-            try:
-                browser_link = driver.find_element(By.XPATH, "//a[contains(text(), 'Browser')]")
-                print("Found Browser link by text content")
-            except NoSuchElementException:
-                print("Browser link not found by text content, trying other methods...")
-                
-                # Try by partial link text
+            dropdown_item = None
+            for selector in selectors:
                 try:
-                    browser_link = driver.find_element(By.PARTIAL_LINK_TEXT, "Browser")
-                    print("Found Browser link by partial link text")
-                except NoSuchElementException:
-                    print("Browser link not found by partial link text, trying other methods...")
+                    print(f"Trying selector: {selector}")
+                    items = driver.find_elements(By.CSS_SELECTOR, selector)
+                    print(f"Found {len(items)} items with selector {selector}")
                     
-                    # Try by href attribute
-                    try:
-                        browser_link = driver.find_element(By.XPATH, "//a[contains(@href, 'Search.aspx')]")
-                        print("Found Browser link by href attribute")
-                    except NoSuchElementException:
-                        print("Browser link not found by href attribute")
+                    for item in items:
+                        item_text = item.text.lower()
+                        print(f"Item text: {item_text}")
+                        if search_term.lower() in item_text:
+                            dropdown_item = item
+                            print(f"Found matching item: {item_text}")
+                            break
+                    
+                    if dropdown_item:
+                        break
+                except Exception as e:
+                    print(f"Error with selector {selector}: {e}")
             
-            if browser_link:
-                # Click the Browser link
-                print("Clicking Browser link...")
+            if dropdown_item:
+                print(f"Clicking on {search_term} option...")
+                # Try regular click first
                 try:
-                    browser_link.click()
+                    dropdown_item.click()
                 except Exception as click_error:
                     print(f"Regular click failed: {click_error}")
                     print("Trying JavaScript click...")
-                    driver.execute_script("arguments[0].click();", browser_link)
-                
-                # Wait for the search page to load
-                print("Waiting for search page to load...")
-                time.sleep(3)
+                    driver.execute_script("arguments[0].click();", dropdown_item)
                 
-                # Save the search page HTML for debugging
-                if driver.page_source is not None:
-                    with open("combase_search_page.html", "w", encoding="utf-8") as f:
-                        f.write(driver.page_source)
-                    print("Search page HTML saved to combase_search_page.html")
-                else:
-                    print("Warning: Page source is None, cannot save search page HTML")
-                
-                # Print the current URL
-                print("Current URL after clicking Browser link:", driver.current_url)
+                # Wait for the dropdown to close after selection
+                waits.until(driver, 'dropdown_select', EC.invisibility_of_element(dropdown_item),
+                            required=False)
+                print("Option selected successfully")
             else:
-                print("ERROR: Could not find Browser link using any method")
-                print("Please check the website structure or try again later")
-                driver.quit()
-                return None
+                print(f"Could not find {search_term} in dropdown")
+                print("Continuing with search anyway...")
+        except Exception as dropdown_error:
+            print(f"Error selecting from dropdown: {dropdown_error}")
+            print("Continuing with search anyway...")
+    except Exception as e:
+        print(f"Error finding search input field: {e}")
+        # Try alternative methods if the specific selector fails
+        try:
+            # Try by ID
+            organism_input = driver.find_element(By.ID, "ContentPlaceHolder1_txtOrganism")
+            print("Found organism input field with ID: ContentPlaceHolder1_txtOrganism")
+            organism_input.clear()
+            organism_input.send_keys(search_term)
+        except NoSuchElementException:
+            print("Organism input field with ID 'ContentPlaceHolder1_txtOrganism' not found, trying other methods...")
             
-            # Save the search page HTML for debugging
-            if driver.page_source is not None:
-                with open("combase_search_page.html", "w", encoding="utf-8") as f:
-                    f.write(driver.page_source)
-                print("Search page HTML saved to combase_search_page.html")
+            # Try by name attribute
+            try:
+                organism_inputs = driver.find_elements(By.XPATH, "//input[@name='ctl00$ContentPlaceHolder1$txtOrganism']")
+                if organism_inputs:
+                    print(f"Found organism input field by name")
+                    organism_inputs[0].clear()
+                    organism_inputs[0].send_keys(search_term)
+                else:
+                    print("No input field found by name")
+            except Exception as input_error:
+                print(f"Error finding input field by name: {input_error}")
+    
+    if filters:
+        apply_search_filters(driver, filters)
+    
+    # Click the search button
+    print("Clicking search button...")
+    try:
+        # Find the search button with ID
+        search_button = waits.until(driver, 'search_button',
+                                    EC.element_to_be_clickable((By.ID, "btnDoSearch")))
+        print("Found search button with ID: btnDoSearch")
+        search_button.click()
+    except Exception as search_error:
+        print(f"Error finding search button with ID 'btnDoSearch': {search_error}")
+        
+        # Try alternative methods
+        try:
+            # Try with ContentPlaceHolder prefix
+            search_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnDoSearch")
+            print("Found search button with ID: ContentPlaceHolder1_btnDoSearch")
+            search_button.click()
+        except NoSuchElementException:
+            print("Search button with ID 'ContentPlaceHolder1_btnDoSearch' not found, trying other methods...")
+            
+            # Try by value
+            try:
+                search_buttons = driver.find_elements(By.XPATH, "//input[@type='submit' and @value='Search']")
+                if search_buttons:
+                    print(f"Found {len(search_buttons)} search buttons with value 'Search'")
+                    search_buttons[0].click()
+                    print("Clicked the first search button found")
+                else:
+                    print("No search buttons found with value 'Search'")
+            except Exception as e:
+                print(f"Error finding search buttons by value: {e}")
+    
+    # Wait for the search results to load
+    print("Waiting for search results to load...")
+    waits.for_url_contains(driver, 'search_results', "SearchResults.aspx")
+    
+    # Check if we were redirected to the search results page
+    print("Current URL after search:", driver.current_url)
+    
+    return "SearchResults.aspx" in driver.current_url
+
+# Clicks every export checkbox that is not in the wanted state, so the page's own
+# click/change handlers run as they would for a user. Returns the checked IDs and
+# the positions of boxes that ignored the click.
+_SET_CHECKBOXES_SCRIPT = """
+var checked = arguments[0];
+var selected = [];
+var unchanged = [];
+document.querySelectorAll('input.exportchk').forEach(function (box, index) {
+    if (box.checked !== checked && !box.disabled) {
+        box.click();
+        if (box.checked !== checked) {
+            unchanged.push(index);
+        }
+    }
+    if (box.checked) {
+        selected.push(box.id || box.value);
+    }
+});
+return [selected, unchanged];
+"""
+
+_SELECTED_CHECKBOXES_SCRIPT = """
+return Array.prototype.map.call(document.querySelectorAll('input.exportchk:checked'),
+                                function (box) { return box.id || box.value; });
+"""
+
+def set_export_checkboxes(driver, checked=True):
+    """
+    Select or deselect every export checkbox on the page with a single script call.
+    
+    Boxes whose state the page did not accept from the scripted click are clicked
+    one by one through WebDriver instead.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on a search results page
+        checked (bool): Select (True) or deselect (False) the boxes
+    
+    Returns:
+        list: IDs of the checkboxes that are selected afterwards
+    """
+    try:
+        selected, unchanged = driver.execute_script(_SET_CHECKBOXES_SCRIPT, checked)
+    except Exception as script_error:
+        print(f"Scripted checkbox update failed: {script_error}")
+        selected, unchanged = None, None
+    
+    if unchanged is None or unchanged:
+        checkboxes = driver.find_elements(By.CSS_SELECTOR, "input.exportchk")
+        positions = range(len(checkboxes)) if unchanged is None else unchanged
+        print(f"Clicking {len(positions)} checkboxes one by one...")
+        for position in positions:
+            checkbox = checkboxes[position]
+            if checkbox.is_selected() != checked:
+                checkbox.click()
+        selected = driver.execute_script(_SELECTED_CHECKBOXES_SCRIPT)
+    
+    return selected
+
+# Finds the results grid's rows-per-page dropdown by the pattern in arguments[0];
+# returns the element, its option values and its current value
+_PAGE_SIZE_DROPDOWN_SCRIPT = """
+var pattern = new RegExp(arguments[0], 'i');
+var selects = document.querySelectorAll('select');
+for (var i = 0; i < selects.length; i++) {
+    if (pattern.test(selects[i].id + ' ' + selects[i].name)) {
+        var values = Array.prototype.map.call(selects[i].options, function (option) { return option.value; });
+        return [selects[i], values, selects[i].value];
+    }
+}
+return null;
+"""
+
+# Picks an option and fires the change event the dropdown's postback handler listens to
+_SELECT_OPTION_SCRIPT = """
+arguments[0].value = arguments[1];
+arguments[0].dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+def set_page_size(driver, page_size=DEFAULT_PAGE_SIZE, waits=None, reload=False):
+    """
+    Pick an option of the results grid's rows-per-page dropdown and wait for the results to be paged again.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on a search results page
+        page_size (str or int): max, site or a number of rows (see results_paging.choose_page_size)
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+        reload (bool): Post the dropdown back even when its option stays the same
+    
+    Returns:
+        int or None: Rows per page now shown, or None if the page has no rows-per-page dropdown
+    """
+    waits = waits or CrawlWaits()
+    found = driver.execute_script(_PAGE_SIZE_DROPDOWN_SCRIPT, PAGE_SIZE_NAME.pattern)
+    if not found:
+        print("No rows-per-page dropdown found, keeping the site's page size")
+        return None
+    dropdown, options, current = found
+    target = choose_page_size(options, page_size) or current
+    if target == current and not reload:
+        return int(current) if current.isdigit() else None
+    
+    if target != current:
+        print(f"Showing {target} rows per page...")
+    old_marker = page_marker(driver)
+    old_results = driver.find_elements(By.CSS_SELECTOR, "span[id^='lblSource']")
+    driver.execute_script(_SELECT_OPTION_SCRIPT, dropdown, target)
+    waits.for_next_page(driver, old_results[0] if old_results else None, old_marker)
+    return int(target) if target.isdigit() else None
+
+def selection_persists(driver, waits=None):
+    """
+    Tell whether the site keeps ticked records selected across postbacks.
+    
+    The page's boxes are ticked and the rows-per-page dropdown is posted back,
+    which reloads the first page; the boxes are unticked again afterwards.
+    
+    Returns:
+        bool: True if the reloaded page shows the boxes still ticked
+    """
+    print("Checking whether the site keeps selections across pages...")
+    if not set_export_checkboxes(driver, True):
+        return False
+    if set_page_size(driver, 'site', waits, reload=True) is None:
+        print("Cannot check whether the site keeps selections across pages")
+        set_export_checkboxes(driver, False)
+        return False
+    kept = bool(driver.execute_script(_SELECTED_CHECKBOXES_SCRIPT))
+    if not kept:
+        print("The site does not keep selections across pages")
+    set_export_checkboxes(driver, False)
+    return kept
+
+def click_export_button(driver, export_button, current_page, waits, downloads=None, browser_index=0):
+    """
+    Click the export button and wait until the workbook has finished downloading.
+    
+    Returns:
+        str or None: Path of the export when a DownloadManager is used
+    """
+    if downloads:
+        existing_exports = downloads.snapshot(browser_index)
+    else:
+        existing_exports = set(glob.glob(os.path.join(DEFAULT_DOWNLOADS_DIR, EXPORT_PATTERN)))
+    driver.execute_script("arguments[0].click();", export_button)
+    
+    # Wait for the export to complete
+    print("Waiting for export to complete...")
+    if downloads:
+        return downloads.collect(driver, current_page, existing_exports, waits, browser_index)
+    waits.for_download(driver, DEFAULT_DOWNLOADS_DIR, EXPORT_PATTERN, existing_exports)
+    return None
+
+def export_current_page(driver, current_page, waits=None, downloads=None, browser_index=0, profile=None,
+                        artifacts=None, first_page=None):
+    """
+    Select every record on the current results page, export them to Excel and deselect them again.
+    
+    Where the site keeps selections across pages, the export also covers the
+    records selected on the pages before it (see select_for_batch_export).
+    
+    Args:
+        driver (webdriver.Chrome): A browser on a search results page
+        current_page (int): Page number, used for screenshots and messages
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+        downloads (DownloadManager, optional): Run folder to collect the export in
+        browser_index (int): Which of the run's browsers this is, for its download folder
+        profile (CrawlProfile, optional): Records the time spent on checkboxes and on the export
+        artifacts (ArtifactStore, optional): Where to save screenshots of the export
+        first_page (int, optional): First page of the batch the export covers, for messages
+    
+    Returns:
+        list: IDs of the records that were selected for export on this page
+    """
+    waits = waits or CrawlWaits()
+    profile = profile or CrawlProfile()
+    artifacts = artifacts or ArtifactStore(None)
+    pages = f"pages {first_page}-{current_page}" if first_page and first_page < current_page else f"page {current_page}"
+    
+    # Select all export checkboxes in one round trip
+    print("Selecting export checkboxes...")
+    with profile.span('checkboxes') as span:
+        selected_ids = set_export_checkboxes(driver, True)
+        span['items'] = len(selected_ids or [])
+    
+    if selected_ids:
+        print(f"Selected {len(selected_ids)} checkboxes")
+        
+        # Click the export button
+        print("Clicking export button...")
+        try:
+            export_button = waits.until(driver, 'export_button',
+                                        EC.presence_of_element_located((By.ID, "cbBtnExportToExcel")))
+            
+            # Scroll to the export button to make it visible
+            print("Scrolling to export button...")
+            driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
+            
+            # Use JavaScript to click the button
+            print(f"Clicking export button for {pages}...")
+            with profile.span('export', items=len(selected_ids)):
+                export_path = click_export_button(driver, export_button, current_page, waits, downloads,
+                                                  browser_index)
+            
+            # Take a screenshot after export
+            artifacts.save_screenshot(driver, f"combase_export_page_{current_page}.png")
+            
+            # Check if the file was downloaded
+            if export_path:
+                print(f"Export of {pages} saved to {export_path}")
             else:
-                print("Warning: Page source is None, cannot save search page HTML")
+                print("Export completed. Check your downloads folder for the Excel file.")
+            
+            # Deselect all checkboxes before moving to the next page
+            print(f"Deselecting all checkboxes on page {current_page}...")
+            with profile.span('checkboxes'):
+                set_export_checkboxes(driver, False)
             
-            # Enter the search term
-            print("Entering search term...")
+            print(f"Deselected {len(selected_ids)} checkboxes on page {current_page}")
+            
+            # Take a screenshot after deselecting checkboxes
+            artifacts.save_screenshot(driver, f"combase_deselect_page_{current_page}.png")
+        except Exception as export_error:
+            print(f"Error with export button: {export_error}")
+            artifacts.save_screenshot(driver, f"combase_export_error_page_{current_page}.png", error=True)
+            
+            # Try alternative method
             try:
-                # Try to find the search input field with a more specific selector
-                search_input = WebDriverWait(driver, 20).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div.ms-sel-ctn input"))
-                )
+                # Try with ContentPlaceHolder prefix
+                export_button = driver.find_element(By.ID, "ContentPlaceHolder1_cbBtnExportToExcel")
+                print("Found export button with ID: ContentPlaceHolder1_cbBtnExportToExcel")
                 
-                print("Found search input field, clicking on it...")
-                # Click on the search input field to activate it
-                search_input.click()
+                # Scroll to the export button to make it visible
+                driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
                 
-                # Wait a bit after clicking
-                time.sleep(1)
+                # Use JavaScript to click the button
+                with profile.span('export', items=len(selected_ids)):
+                    export_path = click_export_button(driver, export_button, current_page, waits, downloads,
+                                                      browser_index)
                 
-                print("Typing 'salmonella spp'...")
-                # Type "salmonella spp"
-                search_input.send_keys("salmonella spp")
+                if export_path:
+                    print(f"Export of {pages} saved to {export_path}")
+                else:
+                    print("Export completed. Check your downloads folder for the Excel file.")
                 
-                # Wait for the dropdown to appear
-                print("Waiting for dropdown to appear...")
-                time.sleep(1.5)
+                # Deselect all checkboxes before moving to the next page
+                print(f"Deselecting all checkboxes on page {current_page}...")
+                with profile.span('checkboxes'):
+                    set_export_checkboxes(driver, False)
                 
-                try:
-                    print("Looking for Salmonella spp in dropdown...")
-                    
-                    # Try multiple selector strategies
-                    selectors = [
-                        # Simple class-based selector
-                        "div.ms-res-item",
-                        # More specific selector
-                        "div.ms-res-item.ms-res-item-active",
-                        # First item in dropdown
-                        ".ms-res-ctn .ms-res-item:first-child"
-                    ]
-                    
-                    dropdown_item = None
-                    for selector in selectors:
-                        try:
-                            print(f"Trying selector: {selector}")
-                            items = driver.find_elements(By.CSS_SELECTOR, selector)
-                            print(f"Found {len(items)} items with selector {selector}")
-                            
-                            for item in items:
-                                item_text = item.text.lower()
-                                print(f"Item text: {item_text}")
-                                if "salmonella spp" in item_text:
-                                    dropdown_item = item
-                                    print(f"Found matching item: {item_text}")
-                                    break
-                            
-                            if dropdown_item:
-                                break
-                        except Exception as e:
-                            print(f"Error with selector {selector}: {e}")
-                    
-                    if dropdown_item:
-                        print("Clicking on Salmonella spp option...")
-                        # Try regular click first
-                        try:
-                            dropdown_item.click()
-                        except Exception as click_error:
-                            print(f"Regular click failed: {click_error}")
-                            print("Trying JavaScript click...")
-                            driver.execute_script("arguments[0].click();", dropdown_item)
-                        
-                        # Wait a bit after selection
-                        time.sleep(1)
-                        print("Option selected successfully")
-                    else:
-                        print("Could not find Salmonella spp in dropdown")
-                        print("Continuing with search anyway...")
-                except Exception as dropdown_error:
-                    print(f"Error selecting from dropdown: {dropdown_error}")
-                    print("Continuing with search anyway...")
-            except Exception as e:
-                print(f"Error finding search input field: {e}")
-                # Try alternative methods if the specific selector fails
-                try:
-                    # Try by ID
-                    organism_input = driver.find_element(By.ID, "ContentPlaceHolder1_txtOrganism")
-                    print("Found organism input field with ID: ContentPlaceHolder1_txtOrganism")
-                    organism_input.clear()
-                    organism_input.send_keys("salmonella spp")
-                except NoSuchElementException:
-                    print("Organism input field with ID 'ContentPlaceHolder1_txtOrganism' not found, trying other methods...")
-                    
-                    # Try by name attribute
-                    try:
-                        organism_inputs = driver.find_elements(By.XPATH, "//input[@name='ctl00$ContentPlaceHolder1$txtOrganism']")
-                        if organism_inputs:
-                            print(f"Found organism input field by name")
-                            organism_inputs[0].clear()
-                            organism_inputs[0].send_keys("salmonella spp")
-                        else:
-                            print("No input field found by name")
-                    except Exception as input_error:
-                        print(f"Error finding input field by name: {input_error}")
+                print(f"Deselected {len(selected_ids)} checkboxes on page {current_page}")
+                
+                # Take a screenshot after deselecting checkboxes
+                artifacts.save_screenshot(driver, f"combase_deselect_page_{current_page}.png")
+            except NoSuchElementException:
+                print("Export button not found with any known ID")
+                artifacts.save_page(driver, f"combase_export_error_page_{current_page}.html", error=True)
+    else:
+        print("No checkboxes found for export")
+    
+    return selected_ids
+
+def select_for_batch_export(driver, current_page, profile=None):
+    """
+    Tick every record on the current results page, to be exported with a later page of its batch.
+    
+    Returns:
+        list: IDs of the checkboxes that are selected
+    """
+    profile = profile or CrawlProfile()
+    with profile.span('checkboxes') as span:
+        selected_ids = set_export_checkboxes(driver, True)
+        span['items'] = len(selected_ids or [])
+    print(f"Selected {len(selected_ids or [])} checkboxes on page {current_page} for a batch export")
+    return selected_ids
+
+def go_to_next_page(driver, current_page, waits=None):
+    """
+    Click the pager's next link and wait until the results are replaced.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on a search results page
+        current_page (int): Page the browser is on
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+    
+    Returns:
+        bool: False if no way to reach the next page was found
+    """
+    waits = waits or CrawlWaits()
+    
+    print(f"Navigating to page {current_page + 1}...")
+    
+    # Find the next button
+    try:
+        next_button = waits.until(driver, 'next_button',
+                                  EC.presence_of_element_located((By.CSS_SELECTOR, "a.next[data-action='next']")))
+        
+        # Remember the current results so we can tell when they are replaced
+        old_marker = page_marker(driver)
+        old_results = driver.find_elements(By.CSS_SELECTOR, "span[id^='lblSource']")
+        
+        # Scroll to the next button to make it visible
+        print("Scrolling to next button...")
+        driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
+        
+        # Use JavaScript to click the button to avoid interception issues
+        print("Clicking next button using JavaScript...")
+        driver.execute_script("arguments[0].click();", next_button)
+        
+        # Wait for the next page to load
+        print("Waiting for next page to load...")
+        waits.for_next_page(driver, old_results[0] if old_results else None, old_marker)
+    except Exception as next_error:
+        print(f"Error navigating to next page: {next_error}")
+        
+        # Try alternative method
+        try:
+            # Try to find the next page link by page number
+            next_page_link = driver.find_element(By.XPATH, f"//a[contains(text(), '{current_page + 1}')]")
+            print(f"Found next page link for page {current_page + 1}")
+            old_marker = page_marker(driver)
+            next_page_link.click()
             
-            # Click the search button
-            print("Clicking search button...")
-            try:
-                # Find the search button with ID
-                search_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "btnDoSearch"))
-                )
-                print("Found search button with ID: btnDoSearch")
-                search_button.click()
-            except Exception as search_error:
-                print(f"Error finding search button with ID 'btnDoSearch': {search_error}")
+            # Wait for the next page to load
+            print("Waiting for next page to load...")
+            waits.for_next_page(driver, None, old_marker)
+        except NoSuchElementException:
+            print(f"Next page link not found")
+            return False
+    
+    return True
+
+# Sets the pager's current page to the one before the target and follows the next link
+_JUMP_TO_PAGE_SCRIPT = """
+var current = document.getElementById('HiddenCurrentPage');
+var next = document.querySelector("a.next[data-action='next']");
+if (!current || !next) { return false; }
+current.value = String(arguments[0] - 1);
+next.click();
+return true;
+"""
+
+def current_page_number(driver):
+    """Return the page number in the HiddenCurrentPage field, or None if it is missing."""
+    try:
+        value = driver.find_element(By.ID, "HiddenCurrentPage").get_attribute("value") or ''
+    except NoSuchElementException:
+        return None
+    return int(value) if value.isdigit() else None
+
+def jump_to_page(driver, page_number, waits=None):
+    """
+    Go straight to a results page with one pager postback instead of clicking next repeatedly.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on a search results page
+        page_number (int): Page to show
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+    
+    Returns:
+        int or None: Page now shown, which the caller should check in case the site ignored the jump
+    """
+    waits = waits or CrawlWaits()
+    
+    print(f"Jumping to page {page_number}...")
+    try:
+        old_marker = page_marker(driver)
+        old_results = driver.find_elements(By.CSS_SELECTOR, "span[id^='lblSource']")
+        if driver.execute_script(_JUMP_TO_PAGE_SCRIPT, page_number):
+            waits.for_next_page(driver, old_results[0] if old_results else None, old_marker)
+        else:
+            print("Pager not found, cannot jump")
+    except Exception as jump_error:
+        print(f"Error jumping to page {page_number}: {jump_error}")
+    return current_page_number(driver)
+
+def clear_batch_selection(driver, first_page, last_page, waits=None):
+    """
+    Check that a batch's export unticked the records of the batch's earlier pages, and untick them if not.
+    
+    A site may only untick the records of the page an export was made from, so
+    the batch's other pages would be exported again with the next batch. The
+    batch's first page is shown to see whether its boxes are still ticked; if
+    they are, each page of the batch is unticked on the way to its last page.
+    Either way the browser ends on the batch's last page.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on the page the batch was exported from
+        first_page (int): First page of the batch
+        last_page (int): Page the batch was exported from
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+    
+    Returns:
+        bool: True if the export left the batch's earlier pages selected
+    """
+    waits = waits or CrawlWaits()
+    print(f"Checking that the export unticked pages {first_page}-{last_page - 1}...")
+    if jump_to_page(driver, first_page, waits) != first_page:
+        print(f"Could not go back to page {first_page} to check its selection")
+        jump_to_page(driver, last_page, waits)
+        return True
+    if not driver.execute_script(_SELECTED_CHECKBOXES_SCRIPT):
+        jump_to_page(driver, last_page, waits)
+        return False
+    print(f"The export left pages {first_page}-{last_page - 1} selected, unticking them...")
+    page = first_page
+    while page < last_page:
+        set_export_checkboxes(driver, False)
+        if not go_to_next_page(driver, page, waits):
+            break
+        page += 1
+    return True
+
+class BrowserPageWorker:
+    """
+    Captures, archives and exports results pages in one browser, as driven by crawl_pages_in_parallel.
+    
+    The pages are parsed off the browser's thread (see ``parse_snapshot``), so the
+    browser moves on to the next page while the last one is parsed.
+    
+    Args:
+        driver (webdriver.Chrome): A browser on the first search results page
+        waits (CrawlWaits): Wait conditions and timeouts to use
+        parser_backend (str, optional): Parser backend (html.parser, lxml or stream)
+        downloads (DownloadManager, optional): Run folder to collect the exports in
+        browser_index (int): Which of the run's browsers this is, for its download folder
+        owns_driver (bool): Quit the browser when the worker is closed
+        profile (CrawlProfile, optional): Records the time spent in each stage of a page
+        artifacts (ArtifactStore, optional): Where to save each page's HTML and screenshots
+        export_batch (int): Pages selected before each export (see results_paging.py); after
+            the first export of a batch of pages, drops to 1 if the export left the batch selected
+        total_pages (int, optional): Number of results pages, whose last page ends the last batch
+        export (bool): Export every page to Excel
+        records (bool): Also read the summary records when parsing a page
+    """
+    
+    def __init__(self, driver, waits, parser_backend=None, downloads=None, browser_index=0, owns_driver=True,
+                 profile=None, artifacts=None, export_batch=1, total_pages=None, export=True, records=False):
+        self.driver = driver
+        self.waits = waits
+        self.parser_backend = parser_backend
+        self.downloads = downloads
+        self.browser_index = browser_index
+        self.owns_driver = owns_driver
+        self.profile = profile or CrawlProfile()
+        self.artifacts = artifacts or ArtifactStore(None)
+        self.export_batch = export_batch
+        self.total_pages = total_pages or 1
+        self.batch_first = None
+        self.batch_checked = False
+        self.export = export
+        self.records = records
+    
+    def process_page(self, page_number, snapshot=None):
+        """
+        Capture, archive and export the page on screen, or select it for its batch's export.
+        
+        Args:
+            page_number (int): Page the browser is on
+            snapshot (PageSnapshot, optional): The page's already captured HTML
+        
+        Returns:
+            PageSnapshot: The page's HTML, to parse with ``parse_snapshot``
+        """
+        print(f"\nProcessing page {page_number}...")
+        snapshot = snapshot or PageSnapshot.capture(self.driver, self.profile)
+        self.artifacts.save_html(f"combase_page_{page_number}.html", snapshot.html)
+        if not self.export:
+            return snapshot
+        if self.batch_first is None:
+            self.batch_first = page_number
+        if is_batch_end(page_number, self.export_batch, self.total_pages):
+            export_current_page(self.driver, page_number, self.waits, self.downloads, self.browser_index,
+                                self.profile, self.artifacts, first_page=self.batch_first)
+            if self.batch_first < page_number and not self.batch_checked:
+                self.batch_checked = True
+                if clear_batch_selection(self.driver, self.batch_first, page_number, self.waits):
+                    print("Exporting the remaining pages one by one")
+                    self.export_batch = 1
+            self.batch_first = None
+        else:
+            print(f"Page {page_number} is exported with page "
+                  f"{batch_last_page(page_number, self.export_batch, self.total_pages)}")
+            select_for_batch_export(self.driver, page_number, self.profile)
+        return snapshot
+    
+    def parse_snapshot(self, snapshot):
+        """Return the PageData of a captured page; safe to call from another thread."""
+        return snapshot.page_data(self.parser_backend, self.records)
+    
+    def next_page(self, page_number):
+        with self.profile.span('next_page'):
+            return go_to_next_page(self.driver, page_number - 1, self.waits)
+    
+    def jump_to_page(self, page_number):
+        with self.profile.span('jump_to_page'):
+            return jump_to_page(self.driver, page_number, self.waits)
+    
+    def close(self):
+        if self.owns_driver:
+            self.driver.quit()
+
+def login_to_combase(username, password, options=None, downloads=None, checkpoint=None,
+                     search_term=DEFAULT_SEARCH_TERM, filters=(), label=None, driver=None, search_url=None,
+                     browser_index=0, profile=None, artifacts=None):
+    """
+    Logs into the ComBase Browser website using Selenium and BeautifulSoup.
+    
+    Args:
+        username (str): The username for login
+        password (str): The password for login
+        options (CrawlOptions, optional): Browsers, output and paging of the crawl; the timings of
+            its waits are filled in as the crawl runs
+        downloads (DownloadManager, optional): Run folder for the Excel exports (default: ~/Downloads)
+        checkpoint (CrawlCheckpoint, optional): Progress saved after every page; when it already
+            records completed pages, the crawl continues after the last of them
+        search_term (str): Organism to search for
+        filters (tuple): (field, value) search-page filters to apply with the search term
+        label (str, optional): Query name the sources are recorded under in the store (default: search_term)
+        driver (webdriver.Chrome, optional): Logged-in browser to search in instead of starting one;
+            it is left open, also when the crawl fails
+        search_url (str, optional): Search page to open in ``driver`` before searching
+        browser_index (int): Which of the run's browsers ``driver`` is, for its download folder
+        profile (CrawlProfile, optional): Records the time spent in each crawl stage
+        artifacts (ArtifactStore, optional): Where to save debug pages, results pages and screenshots
+    
+    Returns:
+        webdriver.Chrome: The browser instance if successful, None otherwise
+    """
+    # Explicit wait conditions replace fixed sleeps; they also record how long each step took
+    options = options or CrawlOptions()
+    waits = options.waits or CrawlWaits(page_load=page_load_strategy(options.browsing))
+    profile = profile or CrawlProfile()
+    artifacts = artifacts or ArtifactStore(None)
+    output_file, parser_backend, records = options.output_file, options.parser_backend, options.records
+    page_size = options.page_size
+    export_batch = options.export_batch if options.export else 1
+    # Page records are saved where the exports go
+    records_directory = downloads.run_directory if downloads else DEFAULT_DOWNLOADS_DIR
+    
+    own_driver = driver is None
+    if own_driver:
+        print(f"Attempting to log in as {username}...")
+        with profile.span('start_browser'):
+            driver = create_driver(options.headless, downloads, browser_index, options.browsing)
+    
+    # Open the sources file once; the sink tracks the running count in memory, starting
+    # a resumed crawl from the checkpoint's count instead of counting the file again
+    deduplicator = make_deduplicator(options.dedupe)
+    start_count = checkpoint.known_source_count(output_file) if checkpoint else None
+    sources_sink = SourcesSink(output_file, start_count=start_count, deduplicator=deduplicator)
+    source_store = SourceStore(options.store) if options.store else None
+    start_page = checkpoint.next_page if checkpoint else 1
+    if checkpoint:
+        checkpoint.begin(sources_sink)
+    
+    try:
+        # Reuse a cached session when possible, otherwise log in
+        session_restored = False
+        if not own_driver:
+            # A browser handed in is already logged in; go back to the search page
+            session_restored = True
+            if search_url:
+                driver.get(search_url)
+        elif options.session_cache:
+            with profile.span('login'):
+                session_restored = restore_driver_session(driver, options.session_cache, username,
+                                                          options.base_url)
+        if not session_restored:
+            with profile.span('login'):
+                submit_login(driver, username, password, options.base_url, waits)
+        
+        # Check if login was successful
+        if "Login.aspx" not in driver.current_url:
+            if not own_driver:
+                print("Searching in the logged-in browser. Now on:", driver.current_url)
+            elif session_restored:
+                print("Reusing cached session, skipped login. Now on:", driver.current_url)
+            else:
+                print("Login successful! Redirected to:", driver.current_url)
                 
-                # Try alternative methods
-                try:
-                    # Try with ContentPlaceHolder prefix
-                    search_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnDoSearch")
-                    print("Found search button with ID: ContentPlaceHolder1_btnDoSearch")
-                    search_button.click()
-                except NoSuchElementException:
-                    print("Search button with ID 'ContentPlaceHolder1_btnDoSearch' not found, trying other methods...")
-                    
-                    # Try by value
-                    try:
-                        search_buttons = driver.find_elements(By.XPATH, "//input[@type='submit' and @value='Search']")
-                        if search_buttons:
-                            print(f"Found {len(search_buttons)} search buttons with value 'Search'")
-                            search_buttons[0].click()
-                            print("Clicked the first search button found")
-                        else:
-                            print("No search buttons found with value 'Search'")
-                    except Exception as e:
-                        print(f"Error finding search buttons by value: {e}")
+                # Save the login page HTML for debugging
+                artifacts.save_page(driver, "combase_login_success.html", profile=profile)
             
-            # Wait for the search results to load
-            print("Waiting for search results to load...")
-            time.sleep(3)
+            print(f"Searching for '{search_term}'...")
             
-            # Check if we were redirected to the search results page
-            print("Current URL after search:", driver.current_url)
+            if not session_restored:
+                with profile.span('search_page'):
+                    opened = open_search_page(driver, waits, artifacts)
+                if not opened:
+                    driver.quit()
+                    return None
+                
+                if options.session_cache:
+                    options.session_cache.save(driver.get_cookies(), username, search_url=driver.current_url)
+            else:
+                # open_search_page saves the search page; save it here when it was skipped
+                artifacts.save_page(driver, "combase_search_page.html", profile=profile)
             
-            if "SearchResults.aspx" in driver.current_url:
+            # Enter the search term and run the search
+            search_url = driver.current_url
+            with profile.span('search'):
+                found = search_for_organism(driver, search_term, waits, filters)
+            if found:
                 print("Successfully redirected to search results page")
                 
-                # Save the search results HTML for debugging
-                if driver.page_source is not None:
-                    with open("combase_search_results.html", "w", encoding="utf-8") as f:
-                        f.write(driver.page_source)
-                    print("Search results HTML saved to combase_search_results.html")
-                    
-                    # Extract sources from the search results page
-                    sources = extract_sources_from_html_content(driver.page_source)
-                    print(f"Found {len(sources)} sources in search results page")
-                    existing_sources = append_sources_to_file(sources, output_file, existing_sources)
+                # Fewer, longer pages mean fewer page loads and exports; a resumed crawl keeps
+                # its page size so its page numbers cover the same records
+                if checkpoint and checkpoint.page_size:
+                    page_size = checkpoint.page_size
+                with profile.span('page_size'):
+                    rows_per_page = set_page_size(driver, page_size, waits)
+                    if export_batch > 1 and not selection_persists(driver, waits):
+                        print("Exporting every page on its own")
+                        export_batch = 1
+                if checkpoint:
+                    checkpoint.page_size = rows_per_page
+                
+                # One snapshot of the first results page gives the total number of pages
+                # and, unless resuming, page 1's sources, saved HTML and export
+                first_page = PageSnapshot.capture(driver, profile)
+                total_pages = 1  # Default to 1 if we can't find the total
+                page_data = first_page.page_data(parser_backend, bool(records))
+                if page_data.total_pages is not None:
+                    total_pages = page_data.total_pages
+                    print(f"Total pages of results: {total_pages}")
                 else:
-                    print("Warning: Page source is None, cannot save search results HTML")
+                    print("Could not determine total pages, assuming 1 page")
+                if export_batch > 1:
+                    print(f"Exporting the results in batches of {export_batch} pages")
                 
-                # Parse the search results with BeautifulSoup
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
+                # Further browsers reuse this login without its server-side session state
+                shared_cookies = shareable_cookies(driver.get_cookies())
                 
-                # Try to find the total number of pages
-                total_pages = 1  # Default to 1 if we can't find the total
-                hidden_total_pages = soup.find('input', {'id': 'HiddenTotalPages'})
-                if hidden_total_pages and hidden_total_pages.get('value'):
+                lead_worker = BrowserPageWorker(driver, waits, parser_backend, downloads, browser_index,
+                                                owns_driver=False, profile=profile, artifacts=artifacts,
+                                                export_batch=export_batch, total_pages=total_pages,
+                                                export=options.export, records=bool(records))
+                
+                def open_worker(index):
+                    if index == 0:
+                        return lead_worker
+                    with profile.span('start_browser'):
+                        worker_driver = create_driver(options.headless, downloads, index, options.browsing)
                     try:
-                        total_pages = int(hidden_total_pages['value'])
-                        print(f"Total pages of results: {total_pages}")
-                    except ValueError:
-                        print("Could not determine total pages, assuming 1 page")
+                        with profile.span('login'):
+                            if not apply_driver_cookies(worker_driver, shared_cookies, search_url):
+                                submit_login(worker_driver, username, password, options.base_url, waits)
+                                if ("Login.aspx" in worker_driver.current_url
+                                        or not open_search_page(worker_driver, waits, artifacts)):
+                                    raise RuntimeError("worker browser could not log in")
+                        with profile.span('search'):
+                            if not search_for_organism(worker_driver, search_term, waits, filters):
+                                raise RuntimeError("worker search did not reach the results page")
+                        with profile.span('page_size'):
+                            set_page_size(worker_driver, rows_per_page or 'site', waits)
+                    except Exception:
+                        worker_driver.quit()
+                        raise
+                    return BrowserPageWorker(worker_driver, waits, parser_backend, downloads, index, profile=profile,
+                                             artifacts=artifacts, export_batch=export_batch, total_pages=total_pages,
+                                             export=options.export, records=bool(records))
                 
-                # Process each page of results
-                current_page = 1
+                def save_page(page_number, page_data):
+                    if page_data is None:
+                        print(f"Page {page_number} was not crawled")
+                        return
+                    sources = page_data.sources
+                    print(f"Found {len(sources)} sources in page {page_number} of {total_pages}")
+                    with profile.span('write_sources') as span:
+                        added = sources_sink.extend(sources)
+                        span['items'] = added
+                    print(f"Added {added} sources to {output_file}")
+                    if source_store:
+                        source_store.add_sources(sources, page_number=page_number, search_term=label or search_term,
+                                                 record_ids=page_data.checkbox_ids)
+                    if records:
+                        with profile.span('write_records') as span:
+                            save_page_records(page_data.records, records_directory, page_number)
+                            span['items'] = len(page_data.records)
+                    if checkpoint:
+                        checkpoint.record_page(page_number, sources_sink,
+                                               downloads.export_path(page_number) if downloads else None,
+                                               exported=is_batch_end(page_number, export_batch, total_pages))
                 
-                while current_page <= total_pages:
-                    print(f"\nProcessing page {current_page} of {total_pages}...")
-                    
-                    # Save the current page HTML
-                    if driver.page_source is not None:
-                        with open(f"combase_page_{current_page}.html", "w", encoding="utf-8") as f:
-                            f.write(driver.page_source)
-                        print(f"Page HTML saved to combase_page_{current_page}.html")
-                        
-                        # Extract sources from the current page
-                        sources = extract_sources_from_html_content(driver.page_source)
-                        print(f"Found {len(sources)} sources in page {current_page}")
-                        existing_sources = append_sources_to_file(sources, output_file, existing_sources)
-                    else:
-                        print(f"Warning: Page source is None, cannot save page {current_page} HTML")
-                    
-                    # Find all checkboxes for export
-                    print("Finding export checkboxes...")
-                    checkboxes = driver.find_elements(By.CSS_SELECTOR, "input.exportchk")
-                    
-                    if checkboxes:
-                        print(f"Found {len(checkboxes)} checkboxes")
-                        
-                        # Select all checkboxes
-                        for checkbox in checkboxes:
-                            if not checkbox.is_selected():
-                                print(f"Selecting checkbox {checkbox.get_attribute('id')}...")
-                                checkbox.click()
-                                time.sleep(0.2)  # Small delay between selections
-                        
-                        # Click the export button
-                        print("Clicking export button...")
-                        try:
-                            export_button = WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.ID, "cbBtnExportToExcel"))
-                            )
-                            
-                            # Scroll to the export button to make it visible
-                            print("Scrolling to export button...")
-                            driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
-                            time.sleep(1)  # Give time for scrolling to complete
-                            
-                            # Use JavaScript to click the button
-                            print(f"Clicking export button for page {current_page}...")
-                            driver.execute_script("arguments[0].click();", export_button)
-                            
-                            # Wait for the export to complete
-                            print("Waiting for export to complete...")
-                            time.sleep(3)
-                            
-                            # Take a screenshot after export
-                            export_screenshot = f"combase_export_page_{current_page}.png"
-                            driver.save_screenshot(export_screenshot)
-                            print(f"Export screenshot saved to {export_screenshot}")
-                            
-                            # Check if the file was downloaded
-                            print("Export completed. Check your downloads folder for the Excel file.")
-                            
-                            # Deselect all checkboxes before moving to the next page
-                            print(f"Deselecting all checkboxes on page {current_page}...")
-                            for checkbox in checkboxes:
-                                if checkbox.is_selected():
-                                    print(f"Deselecting checkbox {checkbox.get_attribute('id')}...")
-                                    checkbox.click()
-                                    time.sleep(0.2)  # Small delay between deselections
-                            
-                            print(f"Deselected {len(checkboxes)} checkboxes on page {current_page}")
-                            
-                            # Take a screenshot after deselecting checkboxes
-                            deselect_screenshot = f"combase_deselect_page_{current_page}.png"
-                            driver.save_screenshot(deselect_screenshot)
-                            print(f"Deselect screenshot saved to {deselect_screenshot}")
-                        except Exception as export_error:
-                            print(f"Error with export button: {export_error}")
-                            
-                            # Try alternative method
-                            try:
-                                # Try with ContentPlaceHolder prefix
-                                export_button = driver.find_element(By.ID, "ContentPlaceHolder1_cbBtnExportToExcel")
-                                print("Found export button with ID: ContentPlaceHolder1_cbBtnExportToExcel")
-                                
-                                # Scroll to the export button to make it visible
-                                driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
-                                time.sleep(1)  # Give time for scrolling to complete
-                                
-                                # Use JavaScript to click the button
-                                driver.execute_script("arguments[0].click();", export_button)
-                                
-                                # Wait for the export to complete
-                                print("Waiting for export to complete...")
-                                time.sleep(3)
-                                
-                                print("Export completed. Check your downloads folder for the Excel file.")
-                                
-                                # Deselect all checkboxes before moving to the next page
-                                print(f"Deselecting all checkboxes on page {current_page}...")
-                                for checkbox in checkboxes:
-                                    if checkbox.is_selected():
-                                        print(f"Deselecting checkbox {checkbox.get_attribute('id')}...")
-                                        checkbox.click()
-                                        time.sleep(0.2)  # Small delay between deselections
-                                
-                                print(f"Deselected {len(checkboxes)} checkboxes on page {current_page}")
-                                
-                                # Take a screenshot after deselecting checkboxes
-                                deselect_screenshot = f"combase_deselect_page_{current_page}.png"
-                                driver.save_screenshot(deselect_screenshot)
-                                print(f"Deselect screenshot saved to {deselect_screenshot}")
-                            except NoSuchElementException:
-                                print("Export button not found with any known ID")
-                    else:
-                        print("No checkboxes found for export")
-                    
-                    # If this is not the last page, go to the next page
-                    if current_page < total_pages:
-                        print(f"Navigating to page {current_page + 1}...")
-                        
-                        # Find the next button
-                        try:
-                            next_button = WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, "a.next[data-action='next']"))
-                            )
-                            
-                            # Scroll to the next button to make it visible
-                            print("Scrolling to next button...")
-                            driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
-                            time.sleep(0.5)  # Give time for scrolling to complete
-                            
-                            # Use JavaScript to click the button to avoid interception issues
-                            print("Clicking next button using JavaScript...")
-                            driver.execute_script("arguments[0].click();", next_button)
-                            
-                            # Wait for the next page to load
-                            print("Waiting for next page to load...")
-                            time.sleep(2)
-                            
-                            # Update the soup object with the new page source
-                            soup = BeautifulSoup(driver.page_source, 'html.parser')
-                        except Exception as next_error:
-                            print(f"Error navigating to next page: {next_error}")
-                            
-                            # Try alternative method
-                            try:
-                                # Try to find the next page link by page number
-                                next_page_link = driver.find_element(By.XPATH, f"//a[contains(text(), '{current_page + 1}')]")
-                                print(f"Found next page link for page {current_page + 1}")
-                                next_page_link.click()
-                                
-                                # Wait for the next page to load
-                                print("Waiting for next page to load...")
-                                time.sleep(2)
-                                
-                                # Update the soup object with the new page source
-                                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                            except NoSuchElementException:
-                                print(f"Next page link not found")
-                                break
-                    
-                    current_page += 1
+                # Process each page of results, split into ranges when several browsers are used
+                if checkpoint:
+                    checkpoint.total_pages = total_pages
+                if start_page > 1:
+                    print(f"Resuming after page {start_page - 1} of {total_pages}")
+                else:
+                    # Page 1 is on screen already; process it from the snapshot instead of fetching it again
+                    save_page(1, lead_worker.parse_snapshot(lead_worker.process_page(1, first_page)))
+                    start_page = 2
+                missing_pages = []
+                if total_pages >= start_page:
+                    # Batches are never split between browsers
+                    page_ranges = split_page_range(total_pages, options.workers, first_page=start_page,
+                                                   align=export_batch)
+                    if len(page_ranges) > 1:
+                        print(f"Crawling {total_pages - start_page + 1} pages with {len(page_ranges)} parallel browsers...")
+                    limiter = (RateLimiter(options.rate_limit) if options.rate_limit and len(page_ranges) > 1
+                               else None)
+                    # Browsers only navigate, capture and export; their pages are parsed on parse threads
+                    missing_pages = crawl_pages_in_parallel(page_ranges, open_worker, save_page, limiter,
+                                                            parse=lead_worker.parse_snapshot)
+                if checkpoint:
+                    checkpoint.finish(missing_pages)
+                if records:
+                    with profile.span('combine_records'):
+                        combine_run_records(records_directory, records)
                 
-                print("\nAll pages processed successfully!")
-                print(f"Total sources extracted: {len(existing_sources)}")
+                if missing_pages:
+                    print(f"\nCould not crawl pages: {', '.join(map(str, missing_pages))}")
+                else:
+                    print("\nAll pages processed successfully!")
+                print(f"Total sources extracted: {sources_sink.count}")
+                if deduplicator:
+                    print(deduplicator.summary())
             else:
                 print("Not redirected to search results page")
                 
                 # Save the current page HTML for debugging
-                if driver.page_source is not None:
-                    with open("combase_search_failure.html", "w", encoding="utf-8") as f:
-                        f.write(driver.page_source)
-                    print("Current page HTML saved to combase_search_failure.html")
-                else:
-                    print("Warning: Page source is None, cannot save search failure HTML")
+                artifacts.save_page(driver, "combase_search_failure.html", error=True, profile=profile)
             
             return driver
         else:
@@ -655,89 +1266,316 @@ def login_to_combase(username, password, wait_time=5, headless=False, output_fil
                 print("Login verification failed. Still on login page.")
             
             # Save the login failure page HTML for debugging
-            if driver.page_source is not None:
-                with open("combase_login_failure.html", "w", encoding="utf-8") as f:
-                    f.write(driver.page_source)
-                print("Login failure page HTML saved to combase_login_failure.html")
-            else:
-                print("Warning: Page source is None, cannot save login failure HTML")
+            artifacts.save_page(driver, "combase_login_failure.html", error=True, profile=profile)
             
-            driver.quit()
+            if own_driver:
+                driver.quit()
             return None
     except Exception as e:
         print(f"An error occurred: {e}")
-        driver.quit()
+        if own_driver:
+            driver.quit()
         return None
+    finally:
+        sources_sink.close()
+        if source_store:
+            source_store.close()
+        print("\nTime spent waiting per step:")
+        for line in waits.summary():
+            print(line)
+
+def log_in_browser(driver, username, password, session_cache=None, base_url=None, waits=None):
+    """
+    Log a browser in and open the search page, reusing cached cookies when possible.
+    
+    Args:
+        driver (webdriver.Chrome): The browser instance
+        username (str): The username for login
+        password (str): The password for login
+        session_cache (SessionCache, optional): Cache of login cookies to reuse and refresh
+        base_url (str, optional): Site to log in to (default: the live ComBase Browser)
+        waits (CrawlWaits, optional): Wait conditions and timeouts to use
+    
+    Raises:
+        RuntimeError: If the browser could not log in
+    """
+    if session_cache and restore_driver_session(driver, session_cache, username, base_url):
+        return
+    submit_login(driver, username, password, base_url, waits)
+    if "Login.aspx" in driver.current_url or not open_search_page(driver, waits):
+        raise RuntimeError("browser could not log in")
+    if session_cache:
+        session_cache.save(driver.get_cookies(), username, search_url=driver.current_url)
+
+def batch_search_combase(username, password, queries, run_directory, options=None, profile=None, pool=None,
+                         staging_root=None):
+    """
+    Crawl many queries in one or more browsers with a single login.
+    
+    The first browser logs in (or reuses the cached session); further browsers
+    copy its login cookies. Each browser takes queries from a shared queue and
+    crawls all of a query's pages before taking the next one, so no browser is
+    started or logged in again between queries. With a ``pool`` of warm browsers
+    (as the browser daemon keeps), the queries are crawled in those instead.
+    
+    Args:
+        username (str): The username for login
+        password (str): The password for login
+        queries (list): SearchQuery tuples (see batch_search.py)
+        run_directory (str): Batch run folder; each query's exports and checkpoint go in a sub-folder
+        options (CrawlOptions, optional): Options of every query's crawl; its ``workers`` browsers crawl
+            queries in parallel, each query in one browser, and its sources and records are saved in
+            the query's folder
+        profile (CrawlProfile, optional): Records the time spent in each crawl stage, over all queries
+        pool (BrowserPool, optional): Logged-in browsers to borrow, as ``{'driver', 'index', 'search_url'}``
+            sessions, instead of starting new ones
+        staging_root (str, optional): Download staging folder of the ``pool`` browsers
+    
+    Returns:
+        bool: True if every query was crawled completely
+    """
+    options = options or CrawlOptions()
+    # Every query's crawl shares these waits, so their timings add up over the batch
+    waits = options.waits or CrawlWaits(page_load=page_load_strategy(options.browsing))
+    profile = profile or CrawlProfile()
+    
+    if pool is not None:
+        def open_session(index):
+            with profile.span('acquire_browser'):
+                return pool.acquire()
+        
+        close_session = pool.release
+    else:
+        # Browsers keep their download folders while the exports move between query folders
+        staging = DownloadManager(run_directory)
+        staging_root = staging.staging_root
+        
+        def log_in(index):
+            with profile.span('start_browser'):
+                driver = create_driver(options.headless, staging, index, options.browsing)
+            try:
+                with profile.span('login'):
+                    log_in_browser(driver, username, password, options.session_cache if index == 0 else None,
+                                   options.base_url, waits)
+            except Exception:
+                driver.quit()
+                raise
+            return driver
+        
+        print(f"Attempting to log in as {username}...")
+        try:
+            lead = log_in(0)
+        except Exception as e:
+            print(f"Login failed: {e}")
+            return False
+        search_url = lead.current_url
+        shared_cookies = shareable_cookies(lead.get_cookies())
+        
+        def open_session(index):
+            if index == 0:
+                return {'driver': lead, 'index': 0, 'search_url': search_url}
+            with profile.span('start_browser'):
+                driver = create_driver(options.headless, staging, index, options.browsing)
+            if not apply_driver_cookies(driver, shared_cookies, search_url):
+                driver.quit()
+                driver = log_in(index)
+            return {'driver': driver, 'index': index, 'search_url': search_url}
+        
+        def close_session(session):
+            session['driver'].quit()
+    
+    def crawl_query(session, query, downloads, query_output_file, checkpoint):
+        artifacts = ArtifactStore(os.path.join(downloads.run_directory, ARTIFACTS_DIR), options.capture)
+        # The session's browser is logged in already and crawls all of the query's pages itself
+        query_options = options.replace(output_file=query_output_file, waits=waits, workers=1, session_cache=None)
+        try:
+            result = login_to_combase(username, password, query_options, downloads=downloads,
+                                      checkpoint=checkpoint, search_term=query.organism, filters=query.filters,
+                                      label=checkpoint.search_term, driver=session['driver'],
+                                      search_url=session['search_url'], browser_index=session['index'],
+                                      profile=profile, artifacts=artifacts)
+        finally:
+            artifacts.close()
+        return result is not None and checkpoint.complete
+    
+    results = run_batch(queries, run_directory, options.output_file, open_session, crawl_query, close_session,
+                        options.workers, staging_root=staging_root)
+    return all(results.values())
+
+def serve_browser_daemon(username, password, options=None, socket_path=DEFAULT_SOCKET, browsers=1,
+                         export_dir=DEFAULT_EXPORTS_ROOT):
+    """
+    Keep logged-in browsers open and crawl the jobs sent to the daemon socket until it is stopped.
+    
+    A job is a batch of queries (see batch_search_combase) crawled in the warm
+    browsers; before a browser takes a job it is sent back to the search page,
+    and logged in again if its session has expired.
+    
+    Args:
+        username (str): The username for login
+        password (str): The password for login
+        options (CrawlOptions, optional): Browsers, login and waits of the daemon; each job sets its own
+            output, paging and number of browsers
+        socket_path (str): Unix socket to serve jobs on
+        browsers (int): Number of browsers to keep open
+        export_dir (str): Folder for the jobs' run folders and the browsers' download staging folders
+    """
+    options = options or CrawlOptions()
+    waits = options.waits or CrawlWaits(page_load=page_load_strategy(options.browsing))
+    # Downloads are staged on the same disk as the run folders they are moved into
+    staging = DownloadManager(os.path.join(export_dir, '.daemon'))
+    shared = {}
+    
+    def open_browser(index):
+        driver = create_driver(options.headless, staging, index, options.browsing)
+        try:
+            if not (shared and apply_driver_cookies(driver, shared['cookies'], shared['search_url'])):
+                print(f"Attempting to log in as {username}...")
+                log_in_browser(driver, username, password, options.session_cache, options.base_url, waits)
+                shared.update(cookies=shareable_cookies(driver.get_cookies()), search_url=driver.current_url)
+        except Exception:
+            driver.quit()
+            raise
+        return {'driver': driver, 'index': index, 'search_url': driver.current_url}
+    
+    def check_browser(session):
+        driver = session['driver']
+        driver.get(session['search_url'])
+        if "Login.aspx" not in driver.current_url:
+            return True
+        print(f"Browser {session['index'] + 1} was logged out, logging in again")
+        log_in_browser(driver, username, password, options.session_cache, options.base_url, waits)
+        session['search_url'] = driver.current_url
+        return True
+    
+    def close_browser(session):
+        session['driver'].quit()
+    
+    def run_job(pool, job):
+        queries = [SearchQuery(query['organism'], tuple(tuple(pair) for pair in query.get('filters', ())))
+                   for query in job.get('queries') or [{'organism': DEFAULT_SEARCH_TERM}]]
+        run_directory = job.get('run_directory') or new_run_directory(export_dir)
+        print(f"Crawling {len(queries)} queries in {run_directory}")
+        profile = CrawlProfile()
+        job_options = options.replace(output_file=job.get('output_file', 'combase_sources.txt'),
+                                      parser_backend=job.get('parser'), dedupe=job.get('dedupe'),
+                                      store=job.get('store'), waits=waits, workers=job.get('workers') or pool.size,
+                                      capture=job.get('capture', DEFAULT_CAPTURE),
+                                      page_size=parse_page_size(job.get('page_size', DEFAULT_PAGE_SIZE)),
+                                      export_batch=job.get('export_batch', DEFAULT_EXPORT_BATCH),
+                                      export=job.get('export', True), records=job.get('records'))
+        completed = batch_search_combase(username, password, queries, run_directory, job_options, profile=profile,
+                                         pool=pool, staging_root=staging.staging_root)
+        report_profile(profile, os.path.join(run_directory, PROFILE_NAME))
+        summary_path = os.path.join(run_directory, SUMMARY_NAME)
+        summary = []
+        if os.path.exists(summary_path):
+            with open(summary_path, 'r', encoding='utf-8') as file:
+                summary = json.load(file)
+        return {'completed': completed, 'run_directory': run_directory, 'queries': summary}
+    
+    pool = BrowserPool(open_browser, check_browser, close_browser, size=browsers)
+    BrowserDaemon(socket_path, pool, run_job).serve()
 
-def combine_excel_files(output_file='ComBaseCombined.xlsx'):
+def submit_daemon_job(job, socket_path=DEFAULT_SOCKET):
     """
-    Combines all ComBaseExport.xlsx files in the Downloads directory into a single Excel file with multiple tabs.
+    Run a crawl job in the browser daemon and print what it produced.
     
     Args:
-        output_file (str): Path to the output Excel file
+        job (dict): Queries and crawl options (see serve_browser_daemon)
+        socket_path (str): Socket the daemon listens on
+    
+    Returns:
+        bool: True if every query of the job was crawled completely
+    """
+    print(f"Sending the crawl to the browser daemon on {socket_path}; its progress is shown in the daemon's console")
+    response = send_request({'command': 'crawl', 'job': job}, socket_path)
+    if not response.get('ok'):
+        print(f"The browser daemon could not run the crawl: {response.get('error')}")
+        return False
+    for query in response['queries']:
+        status = "completed" if query['completed'] else "incomplete"
+        print(f"{query['query']}: {query['sources']} sources from {query['pages']} pages in "
+              f"{query['output_file']} ({status})")
+    print(f"Exports saved in {response['run_directory']}")
+    return response['completed']
+
+def combine_excel_files(output_file='ComBaseCombined.xlsx', excel_files=None, output_dir=None, workers=None,
+                        cache_dir=None, formats=None, profile=None):
+    """
+    Combines ComBaseExport.xlsx files into a single Excel file with multiple tabs,
+    and/or Parquet, Feather or CSV files with one file per tab.
+    
+    Args:
+        output_file (str): Path to the output Excel file; for other formats its
+            extension is replaced, e.g. ComBaseCombined_data_records.parquet
+        excel_files (list, optional): Exports to combine, in order (default: every
+            ComBaseExport*.xlsx file in the Downloads directory)
+        output_dir (str, optional): Directory to write the output file in (default: Downloads)
+        workers (int, optional): Number of processes reading the files (default: number of CPUs)
+        cache_dir (str, optional): Cache of parsed exports, so only new or changed files are read again
+        formats (list, optional): Output formats to write in one pass (default: from the
+            extension of output_file, or xlsx)
+        profile (CrawlProfile, optional): Records the combine time, rows written and bytes read
     
     Returns:
         bool: True if successful, False otherwise
     """
     # Get the Downloads directory path
-    downloads_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
+    downloads_dir = DEFAULT_DOWNLOADS_DIR
     
     # Find all ComBaseExport.xlsx files in the Downloads directory
-    excel_files = glob.glob(os.path.join(downloads_dir, 'ComBaseExport*.xlsx'))
+    if excel_files is None:
+        excel_files = sorted(glob.glob(os.path.join(downloads_dir, EXPORT_PATTERN)))
     
     if not excel_files:
-        print("No ComBaseExport Excel files found in Downloads directory.")
+        print("No ComBaseExport Excel files found to combine.")
         return False
     
     print(f"Found {len(excel_files)} Excel files to combine.")
     
-    # Initialize dictionaries to store data from each sheet
-    data_records = []
-    logs = []
+    # Create a new Excel file with multiple sheets
+    output_path = os.path.join(output_dir or downloads_dir, output_file)
     
-    # Read each Excel file and extract data from both sheets
-    for file in excel_files:
-        print(f"Processing {file}...")
-        try:
-            # Read the Excel file
-            xls = pd.ExcelFile(file)
-            
-            # Get the sheet names
-            sheet_names = xls.sheet_names
-            
-            # Check if the file has at least two sheets
-            if len(sheet_names) >= 2:
-                # Read the first sheet (data records)
-                df_data = pd.read_excel(xls, sheet_name=0)
-                data_records.append(df_data)
-                
-                # Read the second sheet (logs)
-                df_logs = pd.read_excel(xls, sheet_name=1)
-                logs.append(df_logs)
-            else:
-                print(f"Warning: {file} does not have at least two sheets. Skipping.")
-        except Exception as e:
-            print(f"Error processing {file}: {e}")
+    # Stream both sheets of every file into each output format, reading files in parallel
+    formats = formats or [format_from_path(output_file)]
+    print(f"Creating combined {', '.join(formats)} output for {output_path}...")
+    cache = ExportCache(cache_dir) if cache_dir else None
+    profile = profile or CrawlProfile()
+    try:
+        with profile.span('combine', nbytes=sum(os.path.getsize(path) for path in excel_files)) as span:
+            stats = combine_exports(excel_files, output_path, workers=workers, cache=cache, formats=formats)
+            span['items'] = sum(stats['rows'].values())
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
     
-    if not data_records or not logs:
+    if not stats['files']:
         print("No valid data found in Excel files.")
         return False
     
-    # Combine all data records and logs
-    combined_data = pd.concat(data_records, ignore_index=True)
-    combined_logs = pd.concat(logs, ignore_index=True)
-    
-    # Create a new Excel file with multiple sheets
-    output_path = os.path.join(downloads_dir, output_file)
-    
-    print(f"Creating combined Excel file at {output_path}...")
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        combined_data.to_excel(writer, sheet_name='Data Records', index=False)
-        combined_logs.to_excel(writer, sheet_name='Logs', index=False)
-    
-    print(f"Successfully combined {len(excel_files)} Excel files into {output_path}")
+    rows = ', '.join(f"{count} {name} rows" for name, count in stats['rows'].items())
+    print(f"Successfully combined {stats['files']} Excel files ({rows}) into {', '.join(stats['outputs'])}")
+    if cache:
+        print(f"Parsed {stats['parsed']} new or changed files, reused {stats['cached']} from {cache_dir}")
     return True
 
+def report_profile(profile, path, waits=None):
+    """
+    Print the time spent per stage and save the profile.
+    
+    Args:
+        profile (CrawlProfile): Stage timings of the run
+        path (str): JSON or CSV file to write the profile to
+        waits (CrawlWaits, optional): Wait timings to include in a JSON profile
+    """
+    print("\nTime spent per stage:")
+    for line in profile.summary():
+        print(line)
+    profile.save(path, waits)
+    print(f"Crawl profile saved to {path}")
+    profile.save_parse_profile()
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Login to ComBase Browser using Selenium and BeautifulSoup')
@@ -748,23 +1586,132 @@ def parse_arguments():
     parser.add_argument('-p', '--password', 
                         help='Password for ComBase login')
     
+    # Kept so existing command lines still parse; the crawl waits for page conditions instead
     parser.add_argument('-w', '--wait', type=int, default=5,
-                        help='How long to wait between requests (in seconds)')
+                        help='Ignored; see --wait-timeout and --step-timeout')
     
     parser.add_argument('--headless', action='store_true',
                         help='Run the browser in headless mode')
     
-    parser.add_argument('--extract-only', action='store_true',
-                        help='Only extract sources from existing HTML files without running Selenium')
+    parser.add_argument('--browsing', choices=BROWSING_MODES, default=DEFAULT_BROWSING,
+                        help='full loads pages like a normal browser; lean blocks images, fonts and analytics and returns once the HTML is parsed (default: full)')
+    
+    parser.add_argument('--extract-only', nargs='?', const=True, metavar='RUN_DIR',
+                        help='Only extract sources from existing HTML files without running Selenium: the pages archived in RUN_DIR, or without RUN_DIR combase_page_N.html in the current directory, or else the pages of the latest run in --export-dir')
     
     parser.add_argument('-o', '--output', default='combase_sources.txt',
                         help='Output file for sources')
     
-    parser.add_argument('--combine-excel', action='store_true',
-                        help='Combine all ComBaseExport Excel files in Downloads directory')
+    parser.add_argument('--combine-excel', nargs='?', const=DEFAULT_DOWNLOADS_DIR, metavar='RUN_DIR',
+                        help='Combine the page exports of a crawl run folder, or without RUN_DIR all ComBaseExport Excel files in Downloads directory')
     
     parser.add_argument('--excel-output', default='ComBaseCombined.xlsx',
-                        help='Output file for combined Excel data')
+                        help='Output file for combined Excel data; other formats replace its extension')
+    
+    parser.add_argument('--output-format', nargs='+', choices=sorted(OUTPUT_FORMATS), metavar='FORMAT',
+                        help=f'Formats to write the combined data in, in one pass: {", ".join(OUTPUT_FORMATS)} (default: from the --excel-output extension, or xlsx)')
+    
+    parser.add_argument('--combine-cache', default=DEFAULT_COMBINE_CACHE, metavar='DIR',
+                        help=f'Folder caching parsed Excel exports so combining again only reads new or changed files (default: {DEFAULT_COMBINE_CACHE})')
+    
+    parser.add_argument('--no-combine-cache', action='store_true',
+                        help='Read every Excel export again when combining')
+    
+    parser.add_argument('--export-dir', default=DEFAULT_EXPORTS_ROOT,
+                        help=f'Folder in which each crawl gets its own run folder for Excel exports (default: {DEFAULT_EXPORTS_ROOT})')
+    
+    parser.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+                        help=f'HTML parser backend for extracting sources (default: {DEFAULT_BACKEND})')
+    
+    parser.add_argument('--dedupe', choices=DEDUPE_MODES, default='none',
+                        help='Skip duplicate sources: exact text matches, or normalized citation variants too (default: none)')
+    
+    parser.add_argument('--store', metavar='DB',
+                        help='Also record sources in this SQLite database (see source_store.py for queries and export)')
+    
+    parser.add_argument('--session-cache', default=DEFAULT_SESSION_CACHE,
+                        help=f'File to cache login cookies in so later runs can skip the login (default: {DEFAULT_SESSION_CACHE})')
+    
+    parser.add_argument('--session-max-age', type=int, default=DEFAULT_MAX_AGE // 60,
+                        help=f'Minutes an idle cached session is trusted for (default: {DEFAULT_MAX_AGE // 60})')
+    
+    parser.add_argument('--no-session-cache', action='store_true',
+                        help='Always log in and do not cache login cookies')
+    
+    parser.add_argument('--engine', choices=['selenium', 'http'], default='selenium',
+                        help='Crawl with a Chrome browser (selenium) or with plain HTTP form posts (http)')
+    
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help=f'ComBase Browser site to crawl, e.g. a local combase_stub_server.py (default: {BASE_URL})')
+    
+    parser.add_argument('--wait-timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Default seconds to wait for a page condition before giving up (default: {DEFAULT_TIMEOUT})')
+    
+    parser.add_argument('--step-timeout', action='append', metavar='STEP=SECONDS',
+                        help='Timeout for one step, e.g. next_page=30 or export_download=60 (can be repeated)')
+    
+    parser.add_argument('--wait-log', metavar='FILE',
+                        help='Write the time each wait step took to this JSON file')
+    
+    parser.add_argument('--batch', nargs='+', metavar='PATH',
+                        help='Extract sources from saved HTML files in these directories or glob patterns without running Selenium')
+    
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes for --batch and for combining Excel files (default: number of CPUs)')
+    
+    parser.add_argument('--crawl-workers', type=int, default=1,
+                        help='Number of browsers (or HTTP sessions) crawling page ranges in parallel, or with --daemon the browsers it keeps open (default: 1)')
+    
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_DIR',
+                        help='Continue an interrupted crawl after its last completed page: the given run folder (or its crawl_state.json), or by default the latest unfinished run in --export-dir')
+    
+    parser.add_argument('--query', action='append', metavar='QUERY',
+                        help='Crawl this query in a batch: "organism; field=value; ..." where field is the id or name of a search-page input (can be repeated)')
+    
+    parser.add_argument('--queries', metavar='FILE',
+                        help='Crawl every query in this file (one "organism; field=value; ..." per line) in one batch with a single login')
+    
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep --crawl-workers logged-in browsers open and crawl the jobs sent with --use-daemon, until stopped')
+    
+    parser.add_argument('--use-daemon', action='store_true',
+                        help='Crawl in the warm browsers of a running --daemon instead of starting a browser (crawls here if none is running)')
+    
+    parser.add_argument('--stop-daemon', action='store_true',
+                        help='Close the browsers of a running --daemon and stop it')
+    
+    parser.add_argument('--daemon-socket', default=DEFAULT_SOCKET, metavar='PATH',
+                        help=f'Unix socket the browser daemon listens on (default: {DEFAULT_SOCKET})')
+    
+    parser.add_argument('--capture', choices=CAPTURE_LEVELS, default=DEFAULT_CAPTURE,
+                        help=f'Pages and screenshots to archive (compressed) in the run folder: every one, only those of failures, or none (default: {DEFAULT_CAPTURE})')
+    
+    parser.add_argument('--page-size', type=parse_page_size, default=DEFAULT_PAGE_SIZE, metavar='ROWS',
+                        help=f'Rows per results page: max for the largest the results grid offers, site to keep its default, or a number (default: {DEFAULT_PAGE_SIZE})')
+    
+    parser.add_argument('--export-batch', type=int, default=DEFAULT_EXPORT_BATCH, metavar='PAGES',
+                        help=f'Pages to select before each Excel export, where the site keeps selections across pages; 1 exports every page on its own (default: {DEFAULT_EXPORT_BATCH}, batching off)')
+    
+    parser.add_argument('--records', action='store_true',
+                        help=f'Also read every record\'s summary fields (record ID, organism, matrix, temperature, pH, aw, source) from the results pages and combine them into {RECORDS_OUTPUT} in the run folder, in the --output-format formats')
+    
+    parser.add_argument('--no-export', action='store_true',
+                        help='Skip the Excel export of every page; with --records, the summary records take its place')
+    
+    parser.add_argument('--extract-records', nargs='+', metavar='PATH',
+                        help='Extract the summary records of saved results pages: run folders (their archived pages), directories, glob patterns or HTML files')
+    
+    parser.add_argument('--records-output', default=f'{RECORDS_OUTPUT}.xlsx',
+                        help='Output file for --extract-records; other formats replace its extension')
+    
+    parser.add_argument('--profile', metavar='FILE',
+                        help=f'Write the time, items and bytes of every crawl stage to this JSON or .csv file (default: {PROFILE_NAME} in the run folder)')
+    
+    parser.add_argument('--profile-parsing', metavar='FILE',
+                        help='Run HTML parsing under cProfile and write its statistics to this file (read with python -m pstats FILE)')
+    
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT, metavar='SECONDS',
+                        help=f'Minimum seconds between page requests across parallel crawl workers (default: {DEFAULT_RATE_LIMIT})')
     
     return parser.parse_args()
 
@@ -772,21 +1719,101 @@ if __name__ == "__main__":
     # Parse command line arguments
     args = parse_arguments()
     
+    combine_cache = None if args.no_combine_cache else args.combine_cache
+    profile = CrawlProfile(args.profile_parsing)
+    
     # Check if we should only combine Excel files
     if args.combine_excel:
         print("Combining Excel files...")
-        if combine_excel_files(args.excel_output):
+        if args.combine_excel == DEFAULT_DOWNLOADS_DIR:
+            combined = combine_excel_files(args.excel_output, workers=args.workers, cache_dir=combine_cache,
+                                           formats=args.output_format, profile=profile)
+        else:
+            combined = combine_excel_files(args.excel_output, list_run_exports(args.combine_excel), args.combine_excel,
+                                           workers=args.workers, cache_dir=combine_cache,
+                                           formats=args.output_format, profile=profile)
+        if combined:
             print("Excel files combined successfully.")
         else:
             print("Failed to combine Excel files.")
+        if args.profile:
+            report_profile(profile, args.profile)
         sys.exit(0)
     
+    # Summary records are written in the same formats as the combined exports
+    records_formats = None
+    if args.records or args.extract_records:
+        records_formats = args.output_format or [format_from_path(args.records_output)]
+        try:
+            check_formats(records_formats)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    
+    # Check if we should extract records from saved results pages
+    if args.extract_records:
+        extracted = batch_extract_records(args.extract_records, args.records_output, records_formats,
+                                          workers=args.workers, parser_backend=args.parser)
+        sys.exit(0 if extracted else 1)
+    if not args.records:
+        # Only --records makes a crawl read the records
+        records_formats = None
+    
+    # Check if we should extract sources from a directory or glob of saved HTML files
+    if args.batch:
+        _, failed = batch_extract_sources(args.batch, args.output, workers=args.workers,
+                                          parser_backend=args.parser, dedupe=args.dedupe, store=args.store)
+        sys.exit(1 if failed else 0)
+    
     # Check if we should only extract sources from existing HTML files
     if args.extract_only:
         print("Extracting sources from existing HTML files...")
-        extract_and_save_sources(args.output)
+        run_directory = args.extract_only if isinstance(args.extract_only, str) else None
+        extract_and_save_sources(args.output, parser_backend=args.parser, dedupe=args.dedupe,
+                                 run_directory=run_directory, export_root=args.export_dir)
         sys.exit(0)
     
+    if args.stop_daemon:
+        try:
+            send_request({'command': 'shutdown'}, args.daemon_socket, timeout=5)
+        except OSError:
+            print(f"No browser daemon is listening on {args.daemon_socket}")
+            sys.exit(1)
+        print("Browser daemon is stopping")
+        sys.exit(0)
+    
+    if args.use_daemon and args.engine == 'selenium':
+        # Hand the crawl to the warm browsers of a running daemon
+        if daemon_status(args.daemon_socket):
+            try:
+                queries = [parse_query(text) for text in args.query or []]
+                if args.queries:
+                    queries += read_query_file(args.queries)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            job = {
+                'queries': [{'organism': query.organism, 'filters': query.filters} for query in queries],
+                'run_directory': os.path.abspath(args.resume) if args.resume and args.resume != 'latest' else None,
+                'output_file': os.path.abspath(args.output),
+                'parser': args.parser,
+                'dedupe': args.dedupe,
+                'store': os.path.abspath(args.store) if args.store else None,
+                'capture': args.capture,
+                'workers': args.crawl_workers,
+                'page_size': args.page_size,
+                'export_batch': args.export_batch,
+                'export': not args.no_export,
+                'records': records_formats,
+            }
+            try:
+                completed = submit_daemon_job(job, args.daemon_socket)
+            except (OSError, ValueError) as e:
+                print(f"Lost the connection to the browser daemon: {e}")
+                sys.exit(1)
+            sys.exit(0 if completed else 1)
+        print(f"No browser daemon is listening on {args.daemon_socket}; crawling in this process")
+    
     # Get credentials from environment variables or command line arguments or use defaults
     username = args.username or os.environ.get('COMBASE_USERNAME') or DEFAULT_USERNAME
     password = args.password or os.environ.get('COMBASE_PASSWORD') or DEFAULT_PASSWORD
@@ -797,20 +1824,143 @@ if __name__ == "__main__":
         print("Provide them via command line arguments (-u, -p) or environment variables (COMBASE_USERNAME, COMBASE_PASSWORD)")
         sys.exit(1)
     
-    # Login to ComBase
-    driver = login_to_combase(username, password, wait_time=args.wait, headless=args.headless, output_file=args.output)
+    # Reuse login cookies from earlier runs unless disabled
+    session_cache = None
+    if not args.no_session_cache:
+        session_cache = SessionCache(args.session_cache, max_age=args.session_max_age * 60)
+    
+    options = CrawlOptions(output_file=args.output, headless=args.headless, browsing=args.browsing,
+                           base_url=args.base_url, session_cache=session_cache, parser_backend=args.parser,
+                           dedupe=args.dedupe, store=args.store, workers=args.crawl_workers,
+                           rate_limit=args.rate_limit, capture=args.capture, page_size=args.page_size,
+                           export_batch=args.export_batch, export=not args.no_export, records=records_formats)
     
-    if driver:
+    if args.daemon:
+        try:
+            waits = CrawlWaits(args.wait_timeout, parse_step_timeouts(args.step_timeout),
+                               page_load=page_load_strategy(args.browsing))
+            serve_browser_daemon(username, password, options.replace(waits=waits), args.daemon_socket,
+                                 browsers=args.crawl_workers, export_dir=args.export_dir)
+        except (RuntimeError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    
+    if args.query or args.queries:
+        # Crawl many queries with one login, each in its own folder of the batch run folder
+        try:
+            queries = [parse_query(text) for text in args.query or []]
+            if args.queries:
+                queries += read_query_file(args.queries)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if args.resume and args.resume != 'latest':
+            run_directory = os.path.abspath(args.resume)
+        else:
+            run_directory = new_run_directory(args.export_dir)
+        print(f"Crawling {len(queries)} queries in {run_directory}; rerun with --resume {run_directory} "
+              "to finish any that are interrupted")
+        if args.engine == 'http':
+            completed = batch_crawl_with_http(username, password, queries, run_directory, output_file=args.output,
+                                              parser_backend=args.parser, dedupe=args.dedupe, store=args.store,
+                                              session_cache=session_cache, base_url=args.base_url,
+                                              workers=args.crawl_workers, profile=profile, capture=args.capture,
+                                              page_size=args.page_size, export_batch=args.export_batch,
+                                              export=not args.no_export, records=records_formats)
+            waits = None
+        else:
+            try:
+                waits = CrawlWaits(args.wait_timeout, parse_step_timeouts(args.step_timeout),
+                                   page_load=page_load_strategy(args.browsing))
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            completed = batch_search_combase(username, password, queries, run_directory,
+                                             options.replace(waits=waits), profile=profile)
+            if args.wait_log:
+                waits.save(args.wait_log)
+                print(f"Wait timings saved to {args.wait_log}")
+        report_profile(profile, args.profile or os.path.join(run_directory, PROFILE_NAME), waits)
+        print("Batch completed successfully" if completed else "Batch finished with incomplete queries")
+        sys.exit(0 if completed else 1)
+    
+    if args.resume:
+        # Continue an interrupted crawl in its own run folder, after its last completed page
+        checkpoint_path = find_resumable_run(args.export_dir) if args.resume == 'latest' else args.resume
+        if not checkpoint_path:
+            print(f"No unfinished crawl to resume in {args.export_dir}")
+            sys.exit(1)
+        try:
+            checkpoint = CrawlCheckpoint.load(checkpoint_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: could not read crawl checkpoint {checkpoint_path}: {e}")
+            sys.exit(1)
+        if checkpoint.complete:
+            print(f"The crawl in {checkpoint.run_directory} already finished; nothing to resume")
+            sys.exit(0)
+        downloads = DownloadManager(checkpoint.run_directory)
+        for page_number, export_path in checkpoint.exported_files.items():
+            if os.path.exists(export_path):
+                downloads.register(page_number, export_path)
+        output_file = checkpoint.output_file
+        kept = checkpoint.restore_sources_file()
+        of_total = f" of {checkpoint.total_pages}" if checkpoint.total_pages else ""
+        print(f"Resuming the crawl for '{checkpoint.search_term}' after page {checkpoint.last_page}{of_total} "
+              f"({kept} sources in {output_file})")
+    else:
+        # Exports of this run go to their own folder under a per-page name
+        downloads = DownloadManager(new_run_directory(args.export_dir))
+        output_file = args.output
+        checkpoint = CrawlCheckpoint.for_run(downloads.run_directory, DEFAULT_SEARCH_TERM, output_file)
+    print(f"{'Page records' if args.no_export else 'Excel exports'} will be saved in {downloads.run_directory}")
+    artifacts = ArtifactStore(os.path.join(downloads.run_directory, ARTIFACTS_DIR), args.capture)
+    print(f"Crawl progress is saved in {checkpoint.path}; continue an interrupted crawl with --resume")
+    
+    if args.engine == 'http':
+        # Crawl with plain HTTP requests instead of a browser
+        completed = crawl_with_http(username, password, output_file=output_file,
+                                    search_term=checkpoint.search_term, parser_backend=args.parser,
+                                    dedupe=args.dedupe, store=args.store, session_cache=session_cache,
+                                    base_url=args.base_url, downloads=downloads, workers=args.crawl_workers,
+                                    rate_limit=args.rate_limit, checkpoint=checkpoint, profile=profile,
+                                    artifacts=artifacts, page_size=args.page_size, export_batch=args.export_batch,
+                                    export=not args.no_export, records=records_formats)
+        waits = None
+    else:
+        try:
+            waits = CrawlWaits(args.wait_timeout, parse_step_timeouts(args.step_timeout),
+                               page_load=page_load_strategy(args.browsing))
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        
+        # Login to ComBase
+        driver = login_to_combase(username, password, options.replace(output_file=output_file, waits=waits),
+                                  downloads=downloads, checkpoint=checkpoint, search_term=checkpoint.search_term,
+                                  profile=profile, artifacts=artifacts)
+        completed = driver is not None
+        if args.wait_log:
+            waits.save(args.wait_log)
+            print(f"Wait timings saved to {args.wait_log}")
+        if driver:
+            driver.quit()
+    artifacts.close()
+    
+    if completed:
         print("Script completed successfully")
-        driver.quit()
         
-        # Ask if the user wants to combine Excel files
-        combine_files = input("Do you want to combine exported Excel files? (y/n): ").strip().lower()
+        # Ask if the user wants to combine Excel files, unless none were exported
+        combine_files = 'n' if args.no_export else input("Do you want to combine exported Excel files? (y/n): ").strip().lower()
         if combine_files == 'y' or combine_files == 'yes':
-            if combine_excel_files(args.excel_output):
+            if combine_excel_files(args.excel_output, downloads.exported_files(), downloads.run_directory,
+                                   workers=args.workers, cache_dir=combine_cache, formats=args.output_format,
+                                   profile=profile):
                 print("Excel files combined successfully.")
             else:
                 print("Failed to combine Excel files.")
-    else:
+    
+    report_profile(profile, args.profile or os.path.join(downloads.run_directory, PROFILE_NAME), waits)
+    if not completed:
         print("Script failed")
         sys.exit(1)
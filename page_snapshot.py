@@ -0,0 +1,52 @@
+from crawl_profile import CrawlProfile
+from record_extractor import page_records
+from source_extractor import extract_page
+
+
+class PageSnapshot:
+    """
+    The HTML of the page a browser is showing, fetched once per navigation.
+
+    ``driver.page_source`` serialises the whole DOM over the WebDriver protocol
+    on every call, so a page is captured once and the same HTML is archived,
+    parsed for its sources and read for the total page count.
+
+    Args:
+        html (str or None): Page source; None if the browser returned none
+        profile (CrawlProfile, optional): Records the time spent parsing
+    """
+
+    def __init__(self, html, profile=None):
+        self.html = html
+        self.profile = profile or CrawlProfile()
+        self._page_data = {}
+        self._records = None
+
+    @classmethod
+    def capture(cls, driver, profile=None):
+        """Fetch the page source of a browser (or any object with ``page_source``) once."""
+        profile = profile or CrawlProfile()
+        with profile.span('page_source') as span:
+            html = driver.page_source
+            span['bytes'] = len(html or '')
+        return cls(html, profile)
+
+    def page_data(self, parser_backend=None, records=False):
+        """
+        Return the page's PageData (sources, total pages, checkbox ids), parsing it only once.
+
+        With ``records``, its ``records`` are also filled in with the DataFrame of
+        the page's summary records (see record_extractor.py).
+        """
+        if parser_backend not in self._page_data:
+            with self.profile.parsing(len(self.html or '')) as span:
+                page_data = extract_page(self.html or '', parser_backend)
+                span['items'] = len(page_data.sources)
+            self._page_data[parser_backend] = page_data
+        if not records:
+            return self._page_data[parser_backend]
+        if self._records is None:
+            with self.profile.span('extract_records', nbytes=len(self.html or '')) as span:
+                self._records = page_records(self.html or '', parser_backend)
+                span['items'] = len(self._records)
+        return self._page_data[parser_backend]._replace(records=self._records)
@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_RATE_LIMIT = 1.0
+
+# Captured pages allowed to wait for a parse thread before the crawl workers wait for them
+DEFAULT_MAX_PENDING = 4
+
+
+class RateLimiter:
+    """
+    Spaces out requests made by all crawl workers.
+
+    Args:
+        min_interval (float): Minimum seconds between two requests (0 disables the limit)
+    """
+
+    def __init__(self, min_interval=DEFAULT_RATE_LIMIT):
+        self.min_interval = min_interval
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next request slot."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def split_page_range(total_pages, workers, first_page=1, align=1):
+    """
+    Split pages ``first_page``..``total_pages`` into contiguous ranges, one per worker.
+
+    With ``align``, every range but the last ends on a multiple of ``align``, so
+    batches of that many pages (counted from page 1) are never split between workers.
+
+    Returns:
+        list: (first, last) page tuples; fewer than ``workers`` if there are not enough pages
+    """
+    align = max(1, align)
+    # Chunks of whole batches; the first and last may be shorter
+    chunks = []
+    start = first_page
+    while start <= total_pages:
+        end = min(total_pages, (start - 1) // align * align + align)
+        chunks.append((start, end))
+        start = end + 1
+    workers = max(1, min(workers, len(chunks)))
+    ranges = []
+    position = 0
+    for index in range(workers):
+        size = len(chunks) // workers + (1 if index < len(chunks) % workers else 0)
+        if size:
+            ranges.append((chunks[position][0], chunks[position + size - 1][1]))
+            position += size
+    return ranges
+
+
+def crawl_pages_in_parallel(page_ranges, open_worker, on_page, rate_limiter=None, parse=None, parse_workers=None,
+                            max_pending=DEFAULT_MAX_PENDING):
+    """
+    Crawl results pages with one worker per page range and hand the results over in page order.
+
+    ``open_worker(index)`` returns a worker that is showing results page 1 and has
+    ``next_page(page_number)`` (navigate to that page, returning False on failure),
+    ``process_page(page_number)`` (return the page's result) and ``close()``. Each
+    worker skips ahead to the start of its range, then processes its pages. A
+    worker with ``jump_to_page(page_number)`` (navigate straight to a page and
+    return the page number now shown, or None) skips ahead in one request,
+    stepping page by page only for whatever the jump fell short of. Results
+    are passed to ``on_page(page_number, result)`` on the calling thread, in page
+    order, as soon as every earlier page is done; pages a worker could not reach
+    are passed with a result of None.
+
+    With ``parse``, the crawl is pipelined: a worker only navigates and captures
+    its pages, and ``parse(captured)`` turns each capture into the page's result on
+    separate parse threads while the worker moves on to the next page, so a page
+    costs the slower of navigating and parsing instead of both. At most
+    ``max_pending`` captured pages wait to be parsed; a worker that gets that far
+    ahead waits for a parse thread to catch up. A page that fails to parse is
+    passed on with a result of None.
+
+    Args:
+        page_ranges (list): (first, last) page tuples from split_page_range
+        open_worker (callable): Creates the worker for a range index
+        on_page (callable): Receives each page's result in page order
+        rate_limiter (RateLimiter, optional): Shared limit on navigation requests
+        parse (callable, optional): Turns what ``process_page`` returned into the page's result
+        parse_workers (int, optional): Number of parse threads (default: one per page range)
+        max_pending (int): Captured pages allowed to wait for a parse thread
+
+    Returns:
+        list: Page numbers that could not be crawled
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+    parse_slots = threading.Semaphore(max(1, max_pending))
+    parser_pool = None
+    if parse is not None:
+        parser_pool = ThreadPoolExecutor(max_workers=parse_workers or max(1, len(page_ranges)),
+                                         thread_name_prefix='parse')
+
+    def parse_page(page_number, captured):
+        try:
+            result = parse(captured)
+        except Exception as e:
+            print(f"Could not parse page {page_number}: {e}")
+            result = None
+        finally:
+            parse_slots.release()
+        results.put((page_number, result))
+
+    def deliver(page_number, captured):
+        """Hand a crawled page over, through the parse threads when pipelined; False once stopping."""
+        if parser_pool is None:
+            results.put((page_number, captured))
+            return True
+        # Back-pressure: wait while too many captured pages are waiting to be parsed
+        while not parse_slots.acquire(timeout=0.1):
+            if stop.is_set():
+                return False
+        try:
+            parser_pool.submit(parse_page, page_number, captured)
+        except RuntimeError:
+            # The parse threads were shut down; the crawl is over
+            parse_slots.release()
+            return False
+        return True
+
+    def throttle():
+        if rate_limiter:
+            rate_limiter.wait()
+
+    def run(index, first_page, last_page):
+        page_number = first_page
+        worker = None
+        try:
+            worker = open_worker(index)
+            current_page = 1
+            if first_page > 2 and hasattr(worker, 'jump_to_page'):
+                throttle()
+                if stop.is_set():
+                    return
+                current_page = worker.jump_to_page(first_page)
+                if current_page is None or current_page > first_page:
+                    print(f"Worker {index + 1} lost its place jumping to page {first_page}")
+                    return
+            for skip_to in range(current_page + 1, first_page + 1):
+                throttle()
+                if stop.is_set():
+                    return
+                if not worker.next_page(skip_to):
+                    print(f"Worker {index + 1} could not skip ahead to page {skip_to}")
+                    return
+            while page_number <= last_page and not stop.is_set():
+                if not deliver(page_number, worker.process_page(page_number)):
+                    return
+                page_number += 1
+                if page_number <= last_page:
+                    throttle()
+                    if not worker.next_page(page_number):
+                        print(f"Worker {index + 1} could not reach page {page_number}")
+                        return
+        except Exception as e:
+            print(f"Worker {index + 1} stopped at page {page_number}: {e}")
+        finally:
+            for missing_page in range(page_number, last_page + 1):
+                results.put((missing_page, None))
+            if worker is not None:
+                try:
+                    worker.close()
+                except Exception as e:
+                    print(f"Error closing worker {index + 1}: {e}")
+
+    expected = sum(last - first + 1 for first, last in page_ranges)
+    next_page = page_ranges[0][0] if page_ranges else 0
+    pending = {}
+    missing = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(page_ranges)), thread_name_prefix='crawl') as executor:
+            for index, (first, last) in enumerate(page_ranges):
+                executor.submit(run, index, first, last)
+            try:
+                for _ in range(expected):
+                    page_number, result = results.get()
+                    pending[page_number] = result
+                    while next_page in pending:
+                        result = pending.pop(next_page)
+                        if result is None:
+                            missing.append(next_page)
+                        on_page(next_page, result)
+                        next_page += 1
+            finally:
+                # Workers finish the page they are on and then stop
+                stop.set()
+    finally:
+        if parser_pool is not None:
+            parser_pool.shutdown(wait=True, cancel_futures=True)
+    return missing
@@ -0,0 +1,236 @@
+"""
+Structured records from the summary rows of ComBase search results pages.
+
+Each record on a results page is a ``div.cbRowSummaryResult`` of label/value
+pairs: a ``span.text-primary`` label (Record ID, Organism, Matrix, Temperature,
+pH, aw, Source) in one div and its value in a span of the next div. Every pair
+is read into a column named like the Data Records sheet of an Excel export, with
+Temperature, pH and aw as numbers; a label this module does not know is kept as
+a text column of its own.
+
+A page's records become one typed DataFrame. With ``--records`` the crawl saves
+each page's records as ``ComBaseRecords_page_NNNN.csv`` in its run folder
+(rewritten when a resumed crawl does the page again) and combines them into
+``ComBaseRecords`` when it finishes. Where only the summary fields are needed,
+``--no-export`` then skips the Excel export, its download and the combine step.
+"""
+
+import glob
+import os
+import re
+
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
+
+from combined_output import open_outputs
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:
+    lxml = None
+
+ROW_CLASS = 'cbRowSummaryResult'
+LABEL_CLASS = 'text-primary'
+
+# (label on the page, column, kind of value), in the column order of the export's Data Records sheet
+RECORD_FIELDS = [
+    ('record id', 'Record ID', 'text'),
+    ('organism', 'Organism', 'text'),
+    ('matrix', 'Matrix', 'text'),
+    ('temperature', 'Temperature (C)', 'number'),
+    ('ph', 'pH', 'number'),
+    ('aw', 'Aw', 'number'),
+    ('source', 'Source', 'text'),
+]
+
+RECORD_COLUMNS = [column for _, column, _ in RECORD_FIELDS]
+RECORD_DTYPES = {column: 'float64' if kind == 'number' else 'string' for _, column, kind in RECORD_FIELDS}
+RECORDS_SHEET = 'Data Records'
+
+# Combined records of a run, next to its exports
+RECORDS_OUTPUT = 'ComBaseRecords'
+
+_FIELDS_BY_LABEL = {label: (column, kind) for label, column, kind in RECORD_FIELDS}
+_PAGE_RECORDS = re.compile(r'ComBaseRecords_page_(\d+)\.csv$')
+# A number, optionally followed by a degree unit: "25", "0.997", "-1.5 °C"
+_NUMBER = re.compile(r'([-+]?(?:\d+\.?\d*|\.\d+))\s*(?:°\s*C|°|C)?')
+
+
+def records_file_name(page_number):
+    """Return the name a page's records are saved under."""
+    return f"ComBaseRecords_page_{page_number:04d}.csv"
+
+
+def list_run_records(run_directory):
+    """
+    Return the per-page records saved in a run folder, in page order.
+
+    Returns:
+        list: Paths of ComBaseRecords_page_N.csv files
+    """
+    pages = []
+    for path in glob.glob(os.path.join(run_directory, 'ComBaseRecords_page_*.csv')):
+        match = _PAGE_RECORDS.search(os.path.basename(path))
+        if match:
+            pages.append((int(match.group(1)), path))
+    return [path for _, path in sorted(pages)]
+
+
+def parse_number(text):
+    """Convert a temperature, pH or aw value to a float, or None if it is empty or not a number."""
+    match = _NUMBER.fullmatch((text or '').strip())
+    return float(match.group(1)) if match else None
+
+
+def _label_key(text):
+    return ' '.join(text.split()).rstrip(':').lower()
+
+
+def _pairs_with_bs4(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser', parse_only=SoupStrainer('div', class_=ROW_CLASS))
+    rows = []
+    for row in soup.find_all('div', class_=ROW_CLASS):
+        pairs = []
+        for label in row.find_all('span', class_=LABEL_CLASS):
+            label_div = label.find_parent('div')
+            value_div = label_div.find_next_sibling('div') if label_div else None
+            value = value_div.find('span') if value_div else None
+            pairs.append((label.get_text(), value.get_text() if value else ''))
+        rows.append(pairs)
+    return rows
+
+
+def _pairs_with_lxml(html_content):
+    if not html_content or not html_content.strip():
+        return []
+    try:
+        tree = lxml.html.fromstring(html_content)
+    except ValueError:
+        # Unicode strings with an encoding declaration must be passed as bytes
+        tree = lxml.html.fromstring(html_content.encode('utf-8'))
+    except ParserError:
+        return []
+    rows = []
+    for row in tree.xpath(f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {ROW_CLASS} ')]"):
+        pairs = []
+        for label in row.xpath(f".//span[contains(concat(' ', normalize-space(@class), ' '), ' {LABEL_CLASS} ')]"):
+            value = label.xpath("ancestor::div[1]/following-sibling::div[1]//span[1]")
+            pairs.append((label.text_content(), value[0].text_content() if value else ''))
+        rows.append(pairs)
+    return rows
+
+
+def extract_records(html_content, parser_backend=None):
+    """
+    Read every summary row of a results page into a record.
+
+    Args:
+        html_content (str): HTML of a results page
+        parser_backend (str, optional): ``lxml`` to parse with lxml.html; any other
+            backend (or lxml not being installed) parses with BeautifulSoup.
+            By default lxml is used when it is installed.
+
+    Returns:
+        list: One dict per row, from column name to value; temperature, pH and aw
+        are floats, and a value the page leaves empty (or not a number) is None
+    """
+    use_lxml = lxml is not None and parser_backend in (None, 'lxml')
+    rows = _pairs_with_lxml(html_content) if use_lxml else _pairs_with_bs4(html_content or '')
+    records = []
+    for pairs in rows:
+        record = {}
+        for label, value in pairs:
+            label = ' '.join(label.split()).rstrip(':')
+            column, kind = _FIELDS_BY_LABEL.get(_label_key(label), (label, 'text'))
+            value = ' '.join(value.split())
+            record[column] = parse_number(value) if kind == 'number' else value or None
+        if record:
+            records.append(record)
+    return records
+
+
+def records_frame(records):
+    """
+    Build a typed DataFrame from records.
+
+    The known columns come first, in the export's order, as pandas ``string``
+    and ``float64`` columns; columns from unknown labels follow as text.
+    """
+    extra = []
+    for record in records:
+        for column in record:
+            if column not in RECORD_DTYPES and column not in extra:
+                extra.append(column)
+    frame = pd.DataFrame.from_records(records, columns=RECORD_COLUMNS + extra)
+    return frame.astype({**RECORD_DTYPES, **{column: 'string' for column in extra}})
+
+
+def page_records(html_content, parser_backend=None):
+    """Return the records of a results page as a typed DataFrame."""
+    return records_frame(extract_records(html_content, parser_backend))
+
+
+def save_page_records(frame, run_directory, page_number):
+    """Save a page's records in a run folder, replacing an earlier copy; returns the path."""
+    path = os.path.join(run_directory, records_file_name(page_number))
+    tmp_path = f"{path}.tmp"
+    frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_page_records(path):
+    """Read a page's saved records back with their column types."""
+    frame = pd.read_csv(path, dtype='string', keep_default_na=False, na_values=[''])
+    numbers = {column: 'float64' for column, dtype in RECORD_DTYPES.items()
+               if dtype == 'float64' and column in frame.columns}
+    return frame.astype(numbers)
+
+
+def write_records(frames, output_path, formats):
+    """
+    Write record DataFrames, one per page, as a single Data Records table.
+
+    Args:
+        frames (list): Typed DataFrames from ``records_frame``, in page order
+        output_path (str): Output file name; its extension (if a known format) is replaced per format
+        formats (list): Names from ``combined_output.OUTPUT_FORMATS``
+
+    Returns:
+        tuple: (number of records written, paths of the files written)
+    """
+    columns = list(RECORD_COLUMNS)
+    for frame in frames:
+        columns += [column for column in frame.columns if column not in columns]
+    dtypes = {column: RECORD_DTYPES.get(column, 'string') for column in columns}
+    writers = open_outputs(formats, output_path, [RECORDS_SHEET], [columns], [dtypes])
+    count = 0
+    try:
+        for frame in frames:
+            frame = frame.reindex(columns=columns).astype(object)
+            rows = frame.where(frame.notna(), None).values.tolist()
+            for writer in writers:
+                writer.write(0, rows)
+            count += len(rows)
+    finally:
+        for writer in writers:
+            writer.close()
+    return count, [path for writer in writers for path in writer.paths]
+
+
+def combine_run_records(run_directory, formats, output_name=RECORDS_OUTPUT):
+    """
+    Combine the per-page records saved in a run folder into ``ComBaseRecords`` outputs there.
+
+    Returns:
+        list: Paths of the files written; empty if the run saved no records
+    """
+    paths = list_run_records(run_directory)
+    if not paths:
+        print(f"No page records found in {run_directory}")
+        return []
+    count, outputs = write_records([read_page_records(path) for path in paths],
+                                   os.path.join(run_directory, output_name), formats)
+    print(f"Combined {count} records from {len(paths)} pages into {', '.join(outputs)}")
+    return outputs
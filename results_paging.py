@@ -0,0 +1,85 @@
+"""
+Page size and export batching for the search results grid.
+
+Every results page used to be exported on its own, so a search of a few
+thousand records meant hundreds of exports, downloads and workbooks to combine.
+Two settings cut that down:
+
+- the page size: the grid's rows-per-page dropdown is set to its largest option
+  (or a chosen size) before paging, so there are fewer pages to walk and export
+- the export batch: where the site keeps the records ticked on one page selected
+  while other pages are shown, the pages of a batch are only ticked, and the last
+  page of the batch exports them all at once
+
+Both are checked at run time. A grid without a rows-per-page dropdown keeps the
+site's page size, and a site that forgets selections when the page changes is
+exported page by page. So is a site whose export leaves the records of a batch's
+earlier pages ticked: after its first batch export, each worker goes back to the
+batch's first page, and if its boxes are still ticked, unticks the batch's pages
+and exports the rest of its pages one by one.
+
+Batching has not been tried against the real site yet, so it is off unless
+``--export-batch`` asks for it.
+
+Batches are counted from the first results page (pages 1-10, 11-20, ... for a
+batch of 10), so a resumed crawl and every parallel worker agree on where a
+batch ends. A batch's workbook is saved under the name of its last page.
+"""
+
+import re
+
+PAGE_SIZE_CHOICES = ['max', 'site']
+DEFAULT_PAGE_SIZE = 'max'
+
+# Pages selected before each export where the site keeps selections across pages; 1 turns batching off
+DEFAULT_EXPORT_BATCH = 1
+
+# id or name of the grid's rows-per-page dropdown
+PAGE_SIZE_NAME = re.compile(r'page_?size', re.IGNORECASE)
+
+
+def parse_page_size(value):
+    """
+    Parse a page size option: ``max``, ``site`` or a number of rows.
+
+    Raises:
+        ValueError: If the value is none of these
+    """
+    value = str(value).strip().lower()
+    if value in PAGE_SIZE_CHOICES:
+        return value
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise ValueError(f"Unknown page size '{value}'. Use max, site or a number of rows")
+
+
+def choose_page_size(options, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Pick the dropdown option for a requested page size.
+
+    Args:
+        options (list): Option values of the rows-per-page dropdown
+        page_size (str or int): ``max`` for the largest option, ``site`` to keep the
+            site's choice, or a number of rows (the largest option not above it)
+
+    Returns:
+        str or None: Option value to select, or None to leave the dropdown as it is
+    """
+    sizes = sorted((int(value), value) for value in options if str(value).strip().isdigit())
+    if page_size == 'site' or not sizes:
+        return None
+    if page_size == 'max':
+        return sizes[-1][1]
+    fitting = [size for size in sizes if size[0] <= page_size]
+    return (fitting[-1] if fitting else sizes[0])[1]
+
+
+def batch_last_page(page_number, export_batch, total_pages):
+    """Return the page whose export covers a page: the last page of its batch, or of the results."""
+    export_batch = max(1, export_batch)
+    return min(total_pages, (page_number - 1) // export_batch * export_batch + export_batch)
+
+
+def is_batch_end(page_number, export_batch, total_pages):
+    """Whether a page is exported, rather than only selected for a later page's export."""
+    return page_number >= batch_last_page(page_number, export_batch, total_pages)
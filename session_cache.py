@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+from combase_site import BASE_URL
+
+DEFAULT_SESSION_CACHE = os.path.join(os.path.expanduser('~'), '.combase_session.json')
+
+# ASP.NET forms authentication times out after a period of inactivity, and the
+# auth cookie is usually a session cookie without its own expiry
+DEFAULT_MAX_AGE = 20 * 60
+
+# Server-side session state; not shared between parallel crawl workers
+SESSION_STATE_COOKIES = ('ASP.NET_SessionId',)
+
+
+def site_key(url=None):
+    """Return the host (and port) a URL belongs to, for the live ComBase site when None."""
+    return urlsplit(url or BASE_URL).netloc.lower()
+
+
+class SessionCache:
+    """
+    File cache of authenticated ComBase cookies, one entry per site and username.
+
+    Entries are keyed by the host of the site as well as the username, so a
+    session saved against the live site is never sent to a local stand-in
+    server (or the other way round).
+
+    Each entry records when it was saved and when it expires: the earliest
+    cookie expiry, capped at ``max_age`` seconds after the session was last
+    used. The file is written with owner-only permissions because the cookies
+    grant access to the account.
+
+    Args:
+        path (str): JSON file to store sessions in
+        max_age (int): Seconds an idle session is trusted for
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_CACHE, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable session cache {self.path}: {e}")
+            return {}
+
+    def _write(self, entries):
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(username, base_url=None):
+        return f"{site_key(base_url)} {username}"
+
+    def save(self, cookies, username, search_url=None):
+        """
+        Store the cookies of a freshly authenticated session.
+
+        Args:
+            cookies (list): Cookie dicts as returned by ``driver.get_cookies()``
+            username (str): Account the cookies belong to
+            search_url (str, optional): URL of the search page, to go straight there next time;
+                its host is the site the entry is saved for (by default the live site)
+        """
+        now = time.time()
+        expires_at = now + self.max_age
+        cookie_expiries = [cookie['expiry'] for cookie in cookies if cookie.get('expiry')]
+        if cookie_expiries:
+            expires_at = min(expires_at, min(cookie_expiries))
+
+        entries = self._read()
+        entries[self._key(username, search_url)] = {
+            'cookies': cookies,
+            'search_url': search_url,
+            'saved_at': now,
+            'expires_at': expires_at,
+        }
+        self._write(entries)
+        print(f"Session cookies cached in {self.path} (valid for {int(expires_at - now)}s)")
+
+    def load(self, username, base_url=None):
+        """
+        Return the cached session for a username on a site if it has not expired.
+
+        Args:
+            username (str): Account to look up
+            base_url (str, optional): Site the session is for (default: the live ComBase Browser)
+
+        Returns:
+            dict or None: Entry with 'cookies' and 'search_url'
+        """
+        entry = self._read().get(self._key(username, base_url))
+        if not entry:
+            return None
+        if entry.get('search_url') and site_key(entry['search_url']) != site_key(base_url):
+            print(f"Ignoring a cached session for {site_key(entry['search_url'])}")
+            return None
+        if entry.get('expires_at', 0) <= time.time():
+            print("Cached ComBase session has expired")
+            self.invalidate(username, base_url)
+            return None
+        return entry
+
+    def touch(self, username, base_url=None):
+        """Extend the expiry after the session was used successfully."""
+        entries = self._read()
+        entry = entries.get(self._key(username, base_url))
+        if not entry:
+            return
+        cookie_expiries = [cookie['expiry'] for cookie in entry['cookies'] if cookie.get('expiry')]
+        expires_at = time.time() + self.max_age
+        if cookie_expiries:
+            expires_at = min(expires_at, min(cookie_expiries))
+        entry['expires_at'] = expires_at
+        self._write(entries)
+
+    def invalidate(self, username, base_url=None):
+        """Forget the cached session for a username on a site."""
+        entries = self._read()
+        if entries.pop(self._key(username, base_url), None) is not None:
+            self._write(entries)
+
+
+def apply_driver_cookies(driver, cookies, search_url):
+    """
+    Add cookies to a driver and open the search page with them.
+
+    Args:
+        driver (webdriver.Chrome): Browser to authenticate
+        cookies (list): Cookie dicts as returned by ``driver.get_cookies()``
+        search_url (str): Page to open once the cookies are set
+
+    Returns:
+        bool: True unless the server redirected to Login.aspx
+    """
+    # Cookies can only be added for the domain the browser is currently on
+    url = urlsplit(search_url)
+    driver.get(f"{url.scheme}://{url.netloc}/robots.txt")
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"Could not restore cookie {cookie.get('name')}: {e}")
+
+    driver.get(search_url)
+    return "Login.aspx" not in driver.current_url
+
+
+def shareable_cookies(cookies):
+    """
+    Drop the ASP.NET session state cookie so another client gets its own server session.
+
+    ASP.NET serialises requests that carry the same session ID, so browsers sharing it
+    would not actually run in parallel; the forms authentication cookie is enough to
+    stay logged in.
+    """
+    return [cookie for cookie in cookies if cookie.get('name') not in SESSION_STATE_COOKIES]
+
+
+def restore_driver_session(driver, session_cache, username, base_url=None):
+    """
+    Inject cached cookies into a fresh driver and open the search page.
+
+    Args:
+        driver (webdriver.Chrome): Browser that has not logged in yet
+        session_cache (SessionCache): Cache to read the session from
+        username (str): Account to restore
+        base_url (str, optional): Site being crawled (default: the live ComBase Browser)
+
+    Returns:
+        bool: True if the driver is now on an authenticated page
+    """
+    entry = session_cache.load(username, base_url)
+    if not entry or not entry.get('search_url'):
+        return False
+
+    print("Restoring cached ComBase session...")
+    if not apply_driver_cookies(driver, entry['cookies'], entry['search_url']):
+        print("Cached session was rejected by the server, logging in again")
+        session_cache.invalidate(username, base_url)
+        driver.delete_all_cookies()
+        return False
+
+    session_cache.touch(username, base_url)
+    return True
+
+
+def restore_http_session(http_session, session_cache, username, base_url=None):
+    """
+    Load cached cookies for a site into a ``requests.Session``.
+
+    Returns:
+        dict or None: The cache entry if cookies were loaded
+    """
+    entry = session_cache.load(username, base_url)
+    if not entry:
+        return None
+    for cookie in entry['cookies']:
+        http_session.cookies.set(cookie['name'], cookie['value'],
+                                 domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return entry
+
+
+def cookies_from_http_session(http_session):
+    """Convert a ``requests`` cookie jar into the cookie dicts stored in the cache."""
+    cookies = []
+    for cookie in http_session.cookies:
+        entry = {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                 'path': cookie.path, 'secure': cookie.secure}
+        if cookie.expires:
+            entry['expiry'] = cookie.expires
+        cookies.append(entry)
+    return cookies
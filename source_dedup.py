@@ -0,0 +1,135 @@
+import re
+import string
+import unicodedata
+
+DEDUPE_MODES = ('none', 'exact', 'normalized')
+
+_DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s,;]+)', re.IGNORECASE)
+_DASHES = str.maketrans({'‐': '-', '‑': '-', '‒': '-', '–': '-', '—': '-', '−': '-'})
+_PUNCTUATION = str.maketrans({char: ' ' for char in string.punctuation})
+# Words that differ between citation styles of the same paper
+_CITATION_NOISE = re.compile(r'\b(et al|and|vol|volume|no|issue|pp|p|pages|doi|https?|dx|org|www)\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_source(source):
+    """
+    Build a comparison key that treats citation variants of the same paper as equal.
+
+    Case, whitespace, punctuation, dash styles, "&"/"and", "et al." and volume/page
+    labels are ignored. When the source contains a DOI, the DOI alone is the key.
+
+    Args:
+        source (str): Source text as extracted from a results page
+
+    Returns:
+        str: Normalized key
+    """
+    text = unicodedata.normalize('NFKC', source).translate(_DASHES).casefold()
+
+    doi = _DOI_PATTERN.search(text)
+    if doi:
+        return 'doi:' + doi.group(1).rstrip('.')
+
+    text = text.replace('&', ' and ').translate(_PUNCTUATION)
+    text = _CITATION_NOISE.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class SourceDeduplicator:
+    """
+    Order-preserving deduplication backed by hash sets.
+
+    Every check is O(1), so deduplicating n sources is O(n). In ``exact`` mode a
+    source is dropped only when the identical text was seen before; in
+    ``normalized`` mode sources with the same ``normalize_source`` key are also
+    dropped and counted as near-duplicates (same key, different text). Only
+    ``normalized`` mode builds the keys, so ``exact`` mode costs one set lookup
+    per source.
+
+    Args:
+        mode (str): 'exact' or 'normalized'
+        keep_unique (bool): Keep the first-seen sources in ``unique``
+    """
+
+    def __init__(self, mode='exact', keep_unique=False):
+        if mode not in ('exact', 'normalized'):
+            raise ValueError(f"Unknown dedupe mode '{mode}'. Choose 'exact' or 'normalized'")
+        self.mode = mode
+        self.unique = [] if keep_unique else None
+        self.seen = 0
+        self.kept = 0
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self._texts = set()
+        self._keys = set()
+
+    def add(self, source):
+        """
+        Record a source.
+
+        Returns:
+            bool: True if the source is new and should be kept
+        """
+        self.seen += 1
+        if source in self._texts:
+            self.duplicates += 1
+            return False
+        self._texts.add(source)
+
+        if self.mode == 'normalized':
+            key = normalize_source(source)
+            if key in self._keys:
+                self.near_duplicates += 1
+                return False
+            self._keys.add(key)
+
+        self.kept += 1
+        if self.unique is not None:
+            self.unique.append(source)
+        return True
+
+    def filter(self, sources):
+        """Yield the sources that are new, in their original order."""
+        for source in sources:
+            if self.add(source):
+                yield source
+
+    def summary(self):
+        """Return a one-line description of the counts."""
+        line = f"{self.seen} sources seen, {self.kept} unique, {self.duplicates} exact duplicates"
+        if self.mode == 'normalized':
+            line += f", {self.near_duplicates} near-duplicates"
+        return line
+
+
+def make_deduplicator(mode, keep_unique=False):
+    """
+    Create a deduplicator for a command-line dedupe mode.
+
+    Args:
+        mode (str): One of DEDUPE_MODES; 'none' or None disables deduplication
+
+    Returns:
+        SourceDeduplicator or None
+    """
+    if not mode or mode == 'none':
+        return None
+    return SourceDeduplicator(mode, keep_unique=keep_unique)
+
+
+def dedupe_sources(sources, mode='exact'):
+    """
+    Remove duplicates from a list of sources while preserving first-seen order.
+
+    Args:
+        sources (iterable): Source strings
+        mode (str): 'exact' or 'normalized'
+
+    Returns:
+        tuple: (unique sources list, SourceDeduplicator with the counts)
+    """
+    deduplicator = SourceDeduplicator(mode, keep_unique=True)
+    for source in sources:
+        deduplicator.add(source)
+    return deduplicator.unique, deduplicator
@@ -0,0 +1,188 @@
+"""
+One-pass extraction of ComBase search results pages.
+
+A results page is parsed once and only the nodes we need are pulled out:
+the ``span[id^=lblSource]`` source texts, the ``HiddenTotalPages`` value and
+the ids of the ``input.exportchk`` export checkboxes.
+
+Three backends are available:
+
+- ``html.parser``: BeautifulSoup with a SoupStrainer, pure Python
+- ``lxml``: lxml.html with XPath lookups (fastest, needs lxml)
+- ``stream``: a streaming tokenizer built on the standard library HTMLParser
+"""
+
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:
+    lxml = None
+
+# Everything pulled out of one results page; the summary records are only read on request (see PageSnapshot)
+PageData = namedtuple('PageData', ['sources', 'total_pages', 'checkbox_ids', 'records'], defaults=(None,))
+
+SOURCE_ID_PREFIX = 'lblSource'
+TOTAL_PAGES_ID = 'HiddenTotalPages'
+EXPORT_CHECKBOX_CLASS = 'exportchk'
+
+
+def _parse_total_pages(value):
+    """Convert the HiddenTotalPages value to an int, or None if it is missing or invalid."""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _has_class(class_attr, class_name):
+    if not class_attr:
+        return False
+    if isinstance(class_attr, str):
+        class_attr = class_attr.split()
+    return class_name in class_attr
+
+
+def _extract_with_html_parser(html_content):
+    # Only keep spans and inputs; everything else is skipped while parsing
+    soup = BeautifulSoup(html_content, 'html.parser', parse_only=SoupStrainer(['span', 'input']))
+
+    sources = [span.text.strip() for span in soup.find_all('span', id=lambda x: x and x.startswith(SOURCE_ID_PREFIX))]
+
+    total_pages = None
+    checkbox_ids = []
+    for element in soup.find_all('input'):
+        if element.get('id') == TOTAL_PAGES_ID and total_pages is None:
+            total_pages = _parse_total_pages(element.get('value'))
+        if _has_class(element.get('class'), EXPORT_CHECKBOX_CLASS) and element.get('id'):
+            checkbox_ids.append(element.get('id'))
+
+    return PageData(sources, total_pages, checkbox_ids)
+
+
+def _extract_with_lxml(html_content):
+    if not html_content or not html_content.strip():
+        return PageData([], None, [])
+    try:
+        tree = lxml.html.fromstring(html_content)
+    except ValueError:
+        # Unicode strings with an encoding declaration must be passed as bytes
+        tree = lxml.html.fromstring(html_content.encode('utf-8'))
+    except ParserError:
+        return PageData([], None, [])
+
+    sources = [span.text_content().strip()
+               for span in tree.xpath(f"//span[starts-with(@id, '{SOURCE_ID_PREFIX}')]")]
+
+    values = tree.xpath(f"//input[@id='{TOTAL_PAGES_ID}']/@value")
+    total_pages = _parse_total_pages(values[0]) if values else None
+
+    checkbox_ids = [str(value) for value in tree.xpath(
+        f"//input[contains(concat(' ', normalize-space(@class), ' '), ' {EXPORT_CHECKBOX_CLASS} ')]/@id")]
+
+    return PageData(sources, total_pages, checkbox_ids)
+
+
+class _StreamingPageParser(HTMLParser):
+    """Tokenizer that collects the needed nodes without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sources = []
+        self.total_pages = None
+        self.checkbox_ids = []
+        # Open source spans: [index into sources, text parts, span depth]
+        self._active = []
+        self._seen_total_pages = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'input':
+            attributes = dict(attrs)
+            element_id = attributes.get('id')
+            if element_id == TOTAL_PAGES_ID and not self._seen_total_pages:
+                self._seen_total_pages = True
+                self.total_pages = _parse_total_pages(attributes.get('value'))
+            if element_id and _has_class(attributes.get('class'), EXPORT_CHECKBOX_CLASS):
+                self.checkbox_ids.append(element_id)
+            return
+
+        if tag != 'span':
+            return
+
+        for capture in self._active:
+            capture[2] += 1
+
+        element_id = dict(attrs).get('id')
+        if element_id and element_id.startswith(SOURCE_ID_PREFIX):
+            # Reserve the slot now so sources stay in document order
+            self.sources.append(None)
+            self._active.append([len(self.sources) - 1, [], 1])
+
+    def handle_endtag(self, tag):
+        if tag != 'span' or not self._active:
+            return
+        still_open = []
+        for capture in self._active:
+            capture[2] -= 1
+            if capture[2] == 0:
+                self.sources[capture[0]] = ''.join(capture[1]).strip()
+            else:
+                still_open.append(capture)
+        self._active = still_open
+
+    def handle_data(self, data):
+        for capture in self._active:
+            capture[1].append(data)
+
+    def close(self):
+        super().close()
+        # Unclosed spans run to the end of the document
+        for capture in self._active:
+            self.sources[capture[0]] = ''.join(capture[1]).strip()
+        self._active = []
+
+
+def _extract_with_stream(html_content):
+    parser = _StreamingPageParser()
+    parser.feed(html_content or '')
+    parser.close()
+    return PageData(parser.sources, parser.total_pages, parser.checkbox_ids)
+
+
+BACKENDS = {
+    'html.parser': _extract_with_html_parser,
+    'lxml': _extract_with_lxml,
+    'stream': _extract_with_stream,
+}
+
+DEFAULT_BACKEND = 'lxml' if lxml is not None else 'html.parser'
+
+
+def available_backends():
+    """Return the names of the backends usable in this environment."""
+    return [name for name in BACKENDS if name != 'lxml' or lxml is not None]
+
+
+def extract_page(html_content, backend=None):
+    """
+    Extract sources, the total page count and export checkbox ids in one pass.
+
+    Args:
+        html_content (str): HTML of a ComBase search results page
+        backend (str, optional): One of ``BACKENDS``; defaults to DEFAULT_BACKEND
+
+    Returns:
+        PageData: sources (list), total_pages (int or None), checkbox_ids (list)
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    if backend == 'lxml' and lxml is None:
+        raise ValueError("The 'lxml' parser backend requires the lxml package (pip install lxml)")
+    return BACKENDS[backend](html_content)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite store for extracted ComBase sources.
+
+Sources are keyed by a hash of their text. Every sighting is recorded with the
+results page number, search term, record ID and crawl timestamp, and an FTS5
+index allows full-text queries. Usage:
+
+    python3 source_store.py stats
+    python3 source_store.py query "chicken AND temperature"
+    python3 source_store.py export -o combase_sources.txt
+    python3 source_store.py import combase_sources.txt --search-term "salmonella spp"
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from sources_sink import SourcesSink, read_sources_file
+
+DEFAULT_STORE = 'combase_sources.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    source_hash TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    first_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sightings (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    page_number INTEGER,
+    search_term TEXT,
+    record_id TEXT,
+    crawled_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sightings_source ON sightings(source_id);
+CREATE INDEX IF NOT EXISTS sightings_search ON sightings(search_term, page_number);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sources_fts USING fts5(source, content='sources', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS sources_fts_insert AFTER INSERT ON sources BEGIN
+    INSERT INTO sources_fts(rowid, source) VALUES (new.id, new.source);
+END;
+"""
+
+
+def source_hash(source):
+    """Return the store key for a source text."""
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class SourceStore:
+    """
+    SQLite-backed store of sources with a full-text index.
+
+    Args:
+        path (str): Database file (created if missing)
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; queries fall back to LIKE
+            self.has_fts = False
+        self.connection.commit()
+
+    def add_sources(self, sources, page_number=None, search_term=None, record_ids=None, crawled_at=None):
+        """
+        Insert the sources of one page in a single transaction.
+
+        Args:
+            sources (list): Source strings in page order
+            page_number (int, optional): Results page the sources came from
+            search_term (str, optional): Search the page belongs to
+            record_ids (list, optional): Record ID for each source, aligned with sources
+            crawled_at (str, optional): ISO timestamp (default: now)
+
+        Returns:
+            int: Number of sources that were not in the store before
+        """
+        crawled_at = crawled_at or _timestamp()
+        if record_ids is None or len(record_ids) != len(sources):
+            record_ids = [None] * len(sources)
+
+        new_sources = 0
+        with self.connection:
+            for source, record_id in zip(sources, record_ids):
+                key = source_hash(source)
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO sources (source_hash, source, first_seen) VALUES (?, ?, ?)',
+                    (key, source, crawled_at))
+                if cursor.rowcount:
+                    source_id = cursor.lastrowid
+                    new_sources += 1
+                else:
+                    source_id = self.connection.execute(
+                        'SELECT id FROM sources WHERE source_hash = ?', (key,)).fetchone()[0]
+                self.connection.execute(
+                    'INSERT INTO sightings (source_id, page_number, search_term, record_id, crawled_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (source_id, page_number, search_term, record_id, crawled_at))
+        return new_sources
+
+    def count(self):
+        """Return (unique sources, total sightings)."""
+        unique = self.connection.execute('SELECT COUNT(*) FROM sources').fetchone()[0]
+        sightings = self.connection.execute('SELECT COUNT(*) FROM sightings').fetchone()[0]
+        return unique, sightings
+
+    def iter_sources(self, search_term=None):
+        """Yield unique sources in first-seen order, optionally limited to one search term."""
+        if search_term is None:
+            cursor = self.connection.execute('SELECT source FROM sources ORDER BY id')
+        else:
+            cursor = self.connection.execute(
+                'SELECT source FROM sources WHERE id IN '
+                '(SELECT source_id FROM sightings WHERE search_term = ?) ORDER BY id', (search_term,))
+        for (source,) in cursor:
+            yield source
+
+    def search(self, query, limit=20):
+        """
+        Full-text search over stored sources.
+
+        Args:
+            query (str): FTS5 query (plain words, AND/OR/NOT, "phrases", prefix*)
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (source, sightings) tuples, best matches first
+        """
+        if self.has_fts:
+            sql = ('SELECT s.source, (SELECT COUNT(*) FROM sightings WHERE source_id = s.id) '
+                   'FROM sources_fts JOIN sources s ON s.id = sources_fts.rowid '
+                   'WHERE sources_fts MATCH ? ORDER BY rank LIMIT ?')
+            params = (query, limit)
+        else:
+            sql = ('SELECT s.source, (SELECT COUNT(*) FROM sightings WHERE source_id = s.id) '
+                   'FROM sources s WHERE s.source LIKE ? ORDER BY s.id LIMIT ?')
+            params = (f'%{query}%', limit)
+        return self.connection.execute(sql, params).fetchall()
+
+    def export(self, output_file, search_term=None):
+        """
+        Write unique sources to a numbered sources text file.
+
+        Returns:
+            int: Number of sources written
+        """
+        with SourcesSink(output_file, truncate=True) as sink:
+            sink.extend(self.iter_sources(search_term))
+        return sink.count
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Query and export the ComBase sources database')
+
+    parser.add_argument('--db', default=DEFAULT_STORE,
+                        help=f'Path to the sources database (default: {DEFAULT_STORE})')
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='Show how many sources are stored')
+
+    query_parser = subparsers.add_parser('query', help='Full-text search over stored sources')
+    query_parser.add_argument('text', help='Search text (FTS5 query syntax)')
+    query_parser.add_argument('-n', '--limit', type=int, default=20,
+                              help='Maximum number of results')
+
+    export_parser = subparsers.add_parser('export', help='Export unique sources to a numbered text file')
+    export_parser.add_argument('-o', '--output', default='combase_sources.txt',
+                               help='Output file for sources')
+    export_parser.add_argument('--search-term',
+                               help='Only export sources found by this search term')
+
+    import_parser = subparsers.add_parser('import', help='Import a numbered sources text file')
+    import_parser.add_argument('input', help='Sources file written by the extraction scripts')
+    import_parser.add_argument('--search-term',
+                               help='Search term to record for the imported sources')
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    with SourceStore(args.db) as store:
+        if args.command == 'stats':
+            unique, sightings = store.count()
+            print(f"{unique} unique sources, {sightings} sightings in {args.db}")
+        elif args.command == 'query':
+            try:
+                results = store.search(args.text, args.limit)
+            except sqlite3.OperationalError as query_error:
+                print(f"Cannot search for '{args.text}': {query_error}")
+                print('Quote words with special characters, e.g. \'"E. coli" AND chicken\'')
+                sys.exit(1)
+            for i, (source, sightings) in enumerate(results, 1):
+                print(f"{i}. {source} (seen {sightings} times)")
+            if not results:
+                print("No matching sources found.")
+        elif args.command == 'export':
+            count = store.export(args.output, args.search_term)
+            print(f"Exported {count} sources to {args.output}")
+        elif args.command == 'import':
+            start = time.perf_counter()
+            sources = read_sources_file(args.input)
+            added = store.add_sources(sources, search_term=args.search_term)
+            print(f"Imported {len(sources)} sources ({added} new) in {time.perf_counter() - start:.1f}s")
+
+    sys.exit(0)
@@ -0,0 +1,167 @@
+import os
+
+# Separator written after every numbered source ("N. text\n\n")
+SOURCE_SEPARATOR = '\n\n'
+
+
+def read_sources_file(output_file):
+    """
+    Read sources back from a numbered-list sources file.
+
+    Args:
+        output_file (str): Path to a file written in the "N. source" format
+
+    Returns:
+        list: Sources in file order (empty if the file does not exist)
+    """
+    sources = []
+    if not os.path.exists(output_file):
+        return sources
+
+    with open(output_file, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    # Extract sources from the numbered list format
+    for line in content.split(SOURCE_SEPARATOR):
+        if line.strip() and '. ' in line:
+            sources.append(line.split('. ', 1)[1].strip())
+
+    return sources
+
+
+def _count_sources_in_file(output_file):
+    """Count numbered sources in an existing file without keeping them in memory."""
+    count = 0
+    pending = ''
+    with open(output_file, 'r', encoding='utf-8') as file:
+        for chunk in iter(lambda: file.read(1 << 20), ''):
+            blocks = (pending + chunk).split(SOURCE_SEPARATOR)
+            pending = blocks.pop()
+            for block in blocks:
+                if block.strip() and '. ' in block:
+                    count += 1
+    if pending.strip() and '. ' in pending:
+        count += 1
+    return count
+
+
+def _file_ends_with_separator(output_file):
+    """Check the last bytes of a file for the source separator."""
+    tail = SOURCE_SEPARATOR.encode('utf-8')
+    with open(output_file, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size < len(tail):
+            return False
+        file.seek(size - len(tail))
+        return file.read() == tail
+
+
+class SourcesSink:
+    """
+    Incremental writer for the numbered sources file.
+
+    The file handle, running source count and trailing-separator state are kept
+    in memory, so appending a source never re-reads the output file. Formatted
+    entries are buffered and written in batches of ``batch_size``.
+
+    Args:
+        output_file (str): Path to the output file
+        truncate (bool): Start a new, empty file instead of appending
+        start_count (int, optional): Number of sources already in the file.
+            When omitted, the existing file is scanned once to count them.
+        batch_size (int): Number of sources to buffer before writing
+        keep_sources (bool): Also keep every written source in ``sources``
+        deduplicator (SourceDeduplicator, optional): Skip sources it has already
+            seen. Sources already in an appended file are fed to it first.
+    """
+
+    def __init__(self, output_file, truncate=False, start_count=None, batch_size=1000, keep_sources=False,
+                 deduplicator=None):
+        self.output_file = output_file
+        self.batch_size = max(1, batch_size)
+        self.sources = [] if keep_sources else None
+        self.deduplicator = deduplicator
+        self._buffer = []
+
+        exists = not truncate and os.path.exists(output_file) and os.path.getsize(output_file) > 0
+        if exists and deduplicator is not None:
+            # Seed the deduplicator so a resumed run does not repeat earlier sources
+            existing = read_sources_file(output_file)
+            for source in existing:
+                deduplicator.add(source)
+            self.count = len(existing)
+        elif exists:
+            self.count = start_count if start_count is not None else _count_sources_in_file(output_file)
+
+        if exists:
+            needs_separator = not _file_ends_with_separator(output_file)
+        else:
+            self.count = 0
+            needs_separator = False
+
+        self._file = open(output_file, 'w' if truncate else 'a', encoding='utf-8')
+        if needs_separator:
+            # Same behaviour as before: keep entries separated by a blank line
+            self._buffer.append(SOURCE_SEPARATOR)
+
+    def append(self, source):
+        """
+        Append a single source to the file.
+
+        Returns:
+            bool: False if the deduplicator rejected the source
+        """
+        if self.deduplicator is not None and not self.deduplicator.add(source):
+            return False
+        self.count += 1
+        self._buffer.append(f"{self.count}. {source}{SOURCE_SEPARATOR}")
+        if self.sources is not None:
+            self.sources.append(source)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def extend(self, sources):
+        """
+        Append several sources to the file.
+
+        Args:
+            sources (iterable): Source strings to append
+
+        Returns:
+            int: Number of sources appended (duplicates skipped by the deduplicator are not counted)
+        """
+        added = 0
+        for source in sources:
+            if self.append(source):
+                added += 1
+        return added
+
+    def flush(self):
+        """Write buffered sources to disk."""
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        """Flush pending sources and close the file."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from artifact_store import ARTIFACTS_DIR, ArtifactStore, find_archived_run, is_archived_run, stored_pages
+from combase_stub_server import make_results_page, make_source
+from ntu_fresh_selenium_bs import extract_and_save_sources
+from sources_sink import read_sources_file
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def archive_run(run_directory, pages=2, rows_per_page=2):
+    store = ArtifactStore(os.path.join(run_directory, ARTIFACTS_DIR))
+    for page_number in range(1, pages + 1):
+        store.save_html(f"combase_page_{page_number}.html",
+                        make_results_page(page_number, total_pages=pages, rows_per_page=rows_per_page))
+    store.save_html('combase_login_page.html', '<html></html>')
+    store.close()
+    return str(run_directory)
+
+
+@pytest.fixture
+def export_root(tmp_path):
+    root = tmp_path / 'ComBaseExports'
+    os.makedirs(root / 'run_20250101_120000' / ARTIFACTS_DIR / 'objects')
+    (root / 'run_20250101_120000' / ARTIFACTS_DIR / 'index.jsonl').write_text('', encoding='utf-8')
+    return root
+
+
+def run_script(script, cwd, *args):
+    return subprocess.run([sys.executable, os.path.join(REPO_ROOT, script), *args], cwd=str(cwd),
+                          capture_output=True, text=True)
+
+
+def test_latest_run_with_archived_pages_is_found(export_root):
+    assert find_archived_run(str(export_root)) is None
+    run = archive_run(export_root / 'run_20250102_090000')
+    query_run = archive_run(export_root / 'run_20250103_090000' / 'listeria', pages=1)
+
+    assert is_archived_run(run) and is_archived_run(os.path.join(run, ARTIFACTS_DIR))
+    assert not is_archived_run(str(export_root))
+    assert find_archived_run(str(export_root)) == query_run
+    assert [name for name, _ in stored_pages(run)] == ['combase_page_1.html', 'combase_page_2.html']
+
+
+def test_extract_only_reads_the_latest_run_without_saved_pages(export_root, tmp_path, monkeypatch):
+    archive_run(export_root / 'run_20250102_090000')
+    monkeypatch.chdir(tmp_path)
+
+    extract_and_save_sources('sources.txt', export_root=str(export_root))
+
+    assert read_sources_file('sources.txt') == [make_source(i) for i in range(1, 5)]
+
+
+def test_extract_all_sources_reads_run_folders(export_root, tmp_path):
+    run = archive_run(export_root / 'run_20250102_090000')
+
+    result = run_script('extract_all_sources.py', tmp_path, '--export-dir', str(export_root))
+    assert result.returncode == 0, result.stderr
+    assert read_sources_file(str(tmp_path / 'all_combase_sources.txt')) == [make_source(i) for i in range(1, 5)]
+
+    result = run_script('extract_all_sources.py', tmp_path, run, '-o', 'given.txt')
+    assert result.returncode == 0, result.stderr
+    assert read_sources_file(str(tmp_path / 'given.txt')) == [make_source(i) for i in range(1, 5)]
+
+
+def test_extract_from_raw_html_reads_the_first_archived_page(export_root, tmp_path):
+    archive_run(export_root / 'run_20250102_090000')
+
+    result = run_script('extract_from_raw_html.py', tmp_path, '--export-dir', str(export_root))
+
+    assert result.returncode == 0, result.stderr
+    assert 'combase_page_1.html of' in result.stdout
+    assert read_sources_file(str(tmp_path / 'sources_from_raw_html.txt')) == [make_source(1), make_source(2)]
+
+
+def test_pages_left_in_the_current_directory_come_first(export_root, tmp_path, monkeypatch):
+    archive_run(export_root / 'run_20250102_090000')
+    (tmp_path / 'combase_page_1.html').write_text(make_results_page(3, total_pages=3, rows_per_page=1),
+                                                  encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+
+    extract_and_save_sources('sources.txt', export_root=str(export_root))
+
+    assert read_sources_file('sources.txt') == [make_source(3)]
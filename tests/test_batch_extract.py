@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import batch_extract
+from batch_extract import batch_extract_sources, collect_html_files, page_order_key
+from combase_stub_server import make_results_page, make_source
+from source_store import SourceStore
+from sources_sink import read_sources_file
+
+
+def write_pages(directory, page_numbers, rows_per_page=2):
+    os.makedirs(directory, exist_ok=True)
+    for page_number in page_numbers:
+        with open(os.path.join(directory, f"combase_page_{page_number}.html"), 'w', encoding='utf-8') as file:
+            file.write(make_results_page(page_number, total_pages=max(page_numbers), rows_per_page=rows_per_page))
+
+
+def test_pages_of_each_run_folder_stay_together(tmp_path):
+    write_pages(str(tmp_path / 'run_10'), [1, 2])
+    write_pages(str(tmp_path / 'run_2'), [1, 2, 10])
+    (tmp_path / 'run_2' / 'notes.html').write_text('<html></html>', encoding='utf-8')
+
+    names = [os.path.relpath(path, str(tmp_path)) for path in collect_html_files([str(tmp_path)])]
+
+    assert names == [os.path.join('run_2', 'combase_page_1.html'), os.path.join('run_2', 'combase_page_2.html'),
+                     os.path.join('run_2', 'combase_page_10.html'), os.path.join('run_2', 'notes.html'),
+                     os.path.join('run_10', 'combase_page_1.html'), os.path.join('run_10', 'combase_page_2.html')]
+
+
+def test_first_page_copy_is_skipped_next_to_page_one(tmp_path):
+    write_pages(str(tmp_path / 'run_1'), [1, 2])
+    (tmp_path / 'run_1' / 'combase_search_results.html').write_text(make_results_page(1, 2, 2), encoding='utf-8')
+    write_pages(str(tmp_path / 'run_2'), [2])
+    (tmp_path / 'run_2' / 'combase_search_results.html').write_text(make_results_page(1, 2, 2), encoding='utf-8')
+
+    names = [os.path.relpath(path, str(tmp_path)) for path in collect_html_files([str(tmp_path)])]
+
+    assert names == [os.path.join('run_1', 'combase_page_1.html'), os.path.join('run_1', 'combase_page_2.html'),
+                     os.path.join('run_2', 'combase_page_2.html'),
+                     os.path.join('run_2', 'combase_search_results.html')]
+
+
+def test_failed_files_are_reported(tmp_path, monkeypatch):
+    write_pages(str(tmp_path / 'pages'), [1, 2])
+    broken = str(tmp_path / 'pages' / 'combase_page_2.html')
+
+    def extract_chunk(paths, parser_backend, records):
+        return [(path, [], 'unreadable') if path == broken else (path, [make_source(1)], None) for path in paths]
+
+    monkeypatch.setattr(batch_extract, '_extract_chunk', extract_chunk)
+    count, failed = batch_extract_sources([str(tmp_path / 'pages')], str(tmp_path / 'sources.txt'), workers=1)
+
+    assert (count, failed) == (1, [broken])
+
+
+def test_page_order_key_sorts_by_page_number_not_name():
+    paths = ['a/page_3.html', 'a/combase_page_10.html', 'a/combase_page_2.html']
+    assert sorted(paths, key=page_order_key) == ['a/combase_page_2.html', 'a/page_3.html', 'a/combase_page_10.html']
+
+
+def test_sources_are_written_and_stored_in_page_order(tmp_path):
+    write_pages(str(tmp_path / 'pages'), [1, 2, 3])
+    output_file = str(tmp_path / 'sources.txt')
+    store = str(tmp_path / 'sources.db')
+
+    assert batch_extract_sources([str(tmp_path / 'pages')], output_file, workers=1, store=store) == (6, [])
+    assert read_sources_file(output_file) == [make_source(i) for i in range(1, 7)]
+    with SourceStore(store) as source_store:
+        assert source_store.count() == (6, 6)
+
+
+def test_store_is_closed_when_extraction_fails(tmp_path, monkeypatch):
+    write_pages(str(tmp_path / 'pages'), [1])
+    closed = []
+
+    class TrackedStore(SourceStore):
+        def add_sources(self, *args, **kwargs):
+            raise OSError('disk full')
+
+        def close(self):
+            closed.append(self.path)
+            super().close()
+
+    monkeypatch.setattr(batch_extract, 'SourceStore', TrackedStore)
+    with pytest.raises(OSError):
+        batch_extract_sources([str(tmp_path / 'pages')], str(tmp_path / 'sources.txt'), workers=1,
+                              store=str(tmp_path / 'sources.db'))
+    assert closed == [str(tmp_path / 'sources.db')]
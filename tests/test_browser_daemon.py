@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+import ntu_fresh_selenium_bs as crawler
+from browser_daemon import BrowserPool, daemon_status, send_request
+
+
+class FakeDriver:
+    def __init__(self, index):
+        self.index = index
+        self.current_url = 'http://combase.test/SearchPage.aspx'
+        self.visited = []
+        self.quit_called = False
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_cookies(self):
+        return [{'name': '.ASPXAUTH', 'value': 'token'}]
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def daemon(monkeypatch, tmp_path):
+    """Start serve_browser_daemon with fake browsers, capturing the daemon instead of serving the socket."""
+    drivers = []
+    crawls = []
+    started = {}
+
+    def create_driver(headless=False, downloads=None, browser_index=0, browsing=None):
+        driver = FakeDriver(browser_index)
+        drivers.append(driver)
+        return driver
+
+    def login_to_combase(username, password, options, **kwargs):
+        crawls.append(dict(kwargs, options=options))
+        kwargs['checkpoint'].total_pages = 2
+        kwargs['checkpoint'].finish([])
+        return kwargs['driver']
+
+    class CapturedDaemon(crawler.BrowserDaemon):
+        def serve(self):
+            self.pool.start()
+            started['daemon'] = self
+
+    monkeypatch.setattr(crawler, 'create_driver', create_driver)
+    monkeypatch.setattr(crawler, 'log_in_browser', lambda *args, **kwargs: None)
+    monkeypatch.setattr(crawler, 'apply_driver_cookies', lambda driver, cookies, search_url: True)
+    monkeypatch.setattr(crawler, 'login_to_combase', login_to_combase)
+    monkeypatch.setattr(crawler, 'BrowserDaemon', CapturedDaemon)
+    crawler.serve_browser_daemon('user@example.com', 'secret', socket_path=str(tmp_path / 'daemon.sock'),
+                                 browsers=2, export_dir=str(tmp_path / 'exports'))
+    return started['daemon'], drivers, crawls
+
+
+def test_crawl_job_runs_in_the_pool_browsers(daemon, tmp_path):
+    browser_daemon, drivers, crawls = daemon
+    run_directory = str(tmp_path / 'exports' / 'job')
+
+    response = browser_daemon.handle_request({'command': 'crawl', 'job': {
+        'queries': [{'organism': 'salmonella spp'}, {'organism': 'listeria', 'filters': [['temp', '4']]}],
+        'run_directory': run_directory,
+        'output_file': str(tmp_path / 'sources.txt'),
+        'page_size': 'site',
+        'export_batch': 1,
+        'export': False,
+        'records': ['csv'],
+    }})
+
+    assert response['ok'], response
+    assert response['completed']
+    assert response['run_directory'] == run_directory
+    assert sorted(query['query'] for query in response['queries']) == ['listeria [temp=4]', 'salmonella spp']
+    assert sorted(crawl['search_term'] for crawl in crawls) == ['listeria', 'salmonella spp']
+    for crawl in crawls:
+        assert crawl['driver'] in drivers
+        assert crawl['options'].page_size == 'site'
+        assert crawl['options'].export is False
+        assert crawl['options'].records == ['csv']
+    # Every browser went back to the search page before its job, and was handed back to the pool
+    assert all(driver.visited for driver in drivers if any(crawl['driver'] is driver for crawl in crawls))
+    assert browser_daemon.pool.idle() == 2
+    assert os.path.exists(os.path.join(run_directory, 'crawl_profile.json'))
+
+
+def test_failing_job_is_reported_and_keeps_the_daemon_running(daemon, monkeypatch):
+    browser_daemon, drivers, crawls = daemon
+
+    def batch_search_combase(*args, **kwargs):
+        raise RuntimeError("search page changed")
+
+    monkeypatch.setattr(crawler, 'batch_search_combase', batch_search_combase)
+    response = browser_daemon.handle_request({'command': 'crawl', 'job': {}})
+
+    assert response == {'ok': False, 'error': 'search page changed'}
+    assert browser_daemon.handle_request({'command': 'ping'})['jobs'] == 1
+
+
+def test_daemon_answers_over_its_socket():
+    opened = []
+    pool = BrowserPool(lambda index: opened.append(index) or f"browser {index}", lambda browser: True,
+                       lambda browser: None, size=1)
+
+    def run_job(pool, job):
+        browser = pool.acquire(timeout=5)
+        try:
+            return {'browser': browser, 'queries': job['queries']}
+        finally:
+            pool.release(browser)
+
+    # Unix socket paths must be short, so not under pytest's tmp_path
+    directory = tempfile.mkdtemp(prefix='cbd')
+    socket_path = os.path.join(directory, 'd.sock')
+    browser_daemon = crawler.BrowserDaemon(socket_path, pool, run_job)
+    thread = threading.Thread(target=browser_daemon.serve, daemon=True)
+    thread.start()
+    try:
+        for _ in range(100):
+            if daemon_status(socket_path):
+                break
+            time.sleep(0.05)
+        assert daemon_status(socket_path)['browsers'] == 1
+        response = send_request({'command': 'crawl', 'job': {'queries': ['listeria']}}, socket_path, timeout=5)
+        assert response == {'ok': True, 'browser': 'browser 0', 'queries': ['listeria']}
+        assert send_request({'command': 'shutdown'}, socket_path, timeout=5) == {'ok': True}
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
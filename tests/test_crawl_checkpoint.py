@@ -0,0 +1,123 @@
+import json
+import os
+
+from crawl_checkpoint import CHECKPOINT_NAME, CrawlCheckpoint, find_resumable_run
+from sources_sink import SourcesSink, read_sources_file
+
+
+def start(tmp_path):
+    output_file = str(tmp_path / 'sources.txt')
+    checkpoint = CrawlCheckpoint.for_run(str(tmp_path), 'salmonella spp', output_file)
+    sink = SourcesSink(output_file, truncate=True)
+    checkpoint.begin(sink)
+    return checkpoint, sink
+
+
+def crawl_page(checkpoint, sink, page_number, exported=True):
+    sink.extend([f"source {page_number}a", f"source {page_number}b"])
+    checkpoint.record_page(page_number, sink, f"export_{page_number}.xlsx" if exported else None, exported)
+
+
+def test_pages_in_order_move_the_last_page(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    for page_number in (1, 2, 3):
+        crawl_page(checkpoint, sink, page_number)
+
+    saved = CrawlCheckpoint.load(str(tmp_path))
+    assert saved.last_page == 3
+    assert saved.next_page == 4
+    assert saved.source_count == 6
+    assert saved.sources_bytes == os.path.getsize(sink.output_file)
+    assert saved.exported_files == {1: 'export_1.xlsx', 2: 'export_2.xlsx', 3: 'export_3.xlsx'}
+    assert not saved.complete
+
+
+def test_a_missing_page_holds_back_the_last_page(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    crawl_page(checkpoint, sink, 1)
+    crawl_page(checkpoint, sink, 3)
+    checkpoint.finish([2])
+
+    saved = CrawlCheckpoint.load(checkpoint.path)
+    assert saved.last_page == 1
+    assert saved.source_count == 2
+    assert 3 in saved.exported_files
+    assert not saved.complete
+
+
+def test_batch_pages_complete_with_the_export_that_covers_them(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    crawl_page(checkpoint, sink, 1, exported=False)
+    crawl_page(checkpoint, sink, 2, exported=False)
+    assert CrawlCheckpoint.load(checkpoint.path).last_page == 0
+
+    crawl_page(checkpoint, sink, 3)
+    saved = CrawlCheckpoint.load(checkpoint.path)
+    assert saved.last_page == 3
+    assert saved.source_count == 6
+
+
+def test_a_gap_in_a_batch_drops_the_whole_batch(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    crawl_page(checkpoint, sink, 1)
+    crawl_page(checkpoint, sink, 2, exported=False)
+    # Page 3 was never crawled, so page 4's export did not cover page 2
+    crawl_page(checkpoint, sink, 4)
+
+    assert CrawlCheckpoint.load(checkpoint.path).last_page == 1
+
+
+def test_restore_cuts_the_sources_file_back_to_the_last_page(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    crawl_page(checkpoint, sink, 1)
+    crawl_page(checkpoint, sink, 2)
+    # Page 3 was written but the crawl stopped before it was recorded
+    sink.extend(['source 3a', 'source 3b'])
+    sink.close()
+
+    saved = CrawlCheckpoint.load(checkpoint.path)
+    assert saved.restore_sources_file() == 4
+    assert read_sources_file(sink.output_file) == ['source 1a', 'source 1b', 'source 2a', 'source 2b']
+
+    # The resumed crawl appends after the kept sources, numbered on from them
+    with SourcesSink(sink.output_file, start_count=saved.source_count) as resumed:
+        resumed.extend(['source 3a'])
+    with open(sink.output_file, 'r', encoding='utf-8') as file:
+        assert file.read().endswith('4. source 2b\n\n5. source 3a\n\n')
+
+
+def test_begin_keeps_sources_from_before_the_crawl(tmp_path):
+    output_file = tmp_path / 'sources.txt'
+    output_file.write_text('1. earlier\n\n', encoding='utf-8')
+    checkpoint = CrawlCheckpoint.for_run(str(tmp_path), 'listeria', str(output_file))
+    sink = SourcesSink(str(output_file))
+    checkpoint.begin(sink)
+    sink.extend(['unrecorded'])
+    sink.close()
+
+    assert CrawlCheckpoint.load(checkpoint.path).restore_sources_file() == 1
+    assert read_sources_file(str(output_file)) == ['earlier']
+
+
+def test_find_resumable_run_skips_finished_runs(tmp_path):
+    for name, complete in (('run_1', False), ('run_2', True)):
+        os.makedirs(tmp_path / name)
+        with open(tmp_path / name / CHECKPOINT_NAME, 'w', encoding='utf-8') as file:
+            json.dump({'complete': complete}, file)
+
+    assert find_resumable_run(str(tmp_path)) == str(tmp_path / 'run_1' / CHECKPOINT_NAME)
+
+
+def test_known_source_count_only_for_the_file_as_the_checkpoint_left_it(tmp_path):
+    checkpoint, sink = start(tmp_path)
+    crawl_page(checkpoint, sink, 1)
+    sink.close()
+    saved = CrawlCheckpoint.load(checkpoint.path)
+
+    assert saved.known_source_count(sink.output_file) == 2
+    assert saved.known_source_count(str(tmp_path / 'other.txt')) is None
+    with open(sink.output_file, 'a', encoding='utf-8') as file:
+        file.write('3. added by hand\n\n')
+    assert saved.known_source_count(sink.output_file) is None
+    assert saved.restore_sources_file() == 2
+    assert saved.known_source_count(sink.output_file) == 2
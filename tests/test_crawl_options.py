@@ -0,0 +1,17 @@
+import pytest
+
+from crawl_options import CrawlOptions
+
+
+def test_replace_returns_a_changed_copy():
+    options = CrawlOptions(output_file='sources.txt', workers=4, records=['csv'])
+
+    changed = options.replace(output_file='sources_listeria.txt', workers=1)
+
+    assert (changed.output_file, changed.workers, changed.records) == ('sources_listeria.txt', 1, ['csv'])
+    assert (options.output_file, options.workers) == ('sources.txt', 4)
+
+
+def test_replace_rejects_unknown_options():
+    with pytest.raises(TypeError, match='wait_time'):
+        CrawlOptions().replace(wait_time=5)
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+from export_cache import ExportCache
+
+TABLES = [(['Record ID', 'Organism'], [('1', 'Salmonella'), ('2', 'Listeria')])]
+HEADERS = [['Record ID', 'Organism']]
+KINDS = [['text', 'text']]
+
+
+def write_export(path, content):
+    with open(path, 'wb') as file:
+        file.write(content)
+    return str(path)
+
+
+def test_moved_export_is_found_by_its_hash(tmp_path):
+    export = write_export(tmp_path / 'combase_export_page_1.xlsx', b'page 1')
+    cache = ExportCache(str(tmp_path / 'cache'))
+    cache.store(export, TABLES, KINDS)
+    cache.save()
+
+    os.makedirs(tmp_path / 'run_1')
+    moved = shutil.move(export, str(tmp_path / 'run_1' / 'combase_export_page_1.xlsx'))
+    reloaded = ExportCache(str(tmp_path / 'cache'))
+
+    assert reloaded.lookup(moved) == (HEADERS, KINDS)
+    assert reloaded.load(moved) == TABLES
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+
+def test_copy_is_found_among_many_exports(tmp_path):
+    cache = ExportCache(str(tmp_path / 'cache'))
+    exports = [write_export(tmp_path / f"combase_export_page_{i}.xlsx", f"page {i}".encode()) for i in range(50)]
+    for export in exports:
+        cache.store(export, TABLES, KINDS)
+
+    copy = write_export(tmp_path / 'copy.xlsx', b'page 49')
+
+    assert cache.lookup(copy) == (HEADERS, KINDS)
+    assert cache.hits == 1
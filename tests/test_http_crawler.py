@@ -0,0 +1,155 @@
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from combase_stub_server import STUB_PASSWORD, STUB_USERNAME, make_source, start_stub_server
+from crawl_checkpoint import CrawlCheckpoint
+from download_manager import DownloadManager, export_file_name, list_run_exports
+from http_crawler import crawl_with_http
+from sources_sink import read_sources_file
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**state_options):
+        server = start_stub_server(**state_options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def crawl(base_url, run_directory, **options):
+    downloads = DownloadManager(str(run_directory))
+    output_file = os.path.join(str(run_directory), 'sources.txt')
+    checkpoint = CrawlCheckpoint.for_run(downloads.run_directory, 'salmonella spp', output_file)
+    completed = crawl_with_http(STUB_USERNAME, STUB_PASSWORD, output_file=output_file, base_url=base_url,
+                                downloads=downloads, checkpoint=checkpoint, **options)
+    return completed, output_file, downloads
+
+
+def exported_record_ids(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = list(workbook['Data Records'].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+    assert rows[0][0] == 'Record ID'
+    return [row[0] for row in rows[1:]]
+
+
+def record_ids(first, last):
+    return [f"B{record_id:06d}" for record_id in range(first, last + 1)]
+
+
+def test_crawl_writes_sources_exports_and_checkpoint(stub, tmp_path):
+    base_url = stub(pages=4, rows_per_page=5)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site', export_batch=1)
+
+    assert completed
+    assert read_sources_file(output_file) == [make_source(i) for i in range(1, 21)]
+    exports = list_run_exports(downloads.run_directory)
+    assert [os.path.basename(path) for path in exports] == [export_file_name(page) for page in range(1, 5)]
+    for page, path in enumerate(exports, 1):
+        assert exported_record_ids(path) == record_ids(page * 5 - 4, page * 5)
+
+    checkpoint = CrawlCheckpoint.load(downloads.run_directory)
+    assert checkpoint.complete
+    assert checkpoint.total_pages == 4
+    assert checkpoint.last_page == 4
+    assert checkpoint.source_count == 20
+    assert checkpoint.sources_bytes == os.path.getsize(output_file)
+    assert checkpoint.exported_files == dict(enumerate(exports, 1))
+
+
+def test_parallel_sessions_crawl_every_page_once(stub, tmp_path):
+    base_url = stub(pages=7, rows_per_page=3)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site', export_batch=1, workers=3)
+
+    assert completed
+    assert read_sources_file(output_file) == [make_source(i) for i in range(1, 22)]
+    exported = [record_id for path in list_run_exports(downloads.run_directory)
+                for record_id in exported_record_ids(path)]
+    assert exported == record_ids(1, 21)
+    assert CrawlCheckpoint.load(downloads.run_directory).last_page == 7
+
+
+def test_largest_page_size_needs_fewer_pages(stub, tmp_path):
+    base_url = stub(pages=6, rows_per_page=10, page_sizes=[10, 25])
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='max', export_batch=1)
+
+    assert completed
+    assert len(read_sources_file(output_file)) == 60
+    exports = list_run_exports(downloads.run_directory)
+    assert [len(exported_record_ids(path)) for path in exports] == [25, 25, 10]
+    checkpoint = CrawlCheckpoint.load(downloads.run_directory)
+    assert (checkpoint.page_size, checkpoint.total_pages) == (25, 3)
+
+
+def test_batch_export_covers_the_selected_pages(stub, tmp_path):
+    base_url = stub(pages=5, rows_per_page=4, keep_selection=True)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site', export_batch=2)
+
+    assert completed
+    exports = list_run_exports(downloads.run_directory)
+    assert [os.path.basename(path) for path in exports] == [export_file_name(page) for page in (2, 4, 5)]
+    assert [exported_record_ids(path) for path in exports] == [record_ids(1, 8), record_ids(9, 16),
+                                                               record_ids(17, 20)]
+    assert CrawlCheckpoint.load(downloads.run_directory).last_page == 5
+
+
+def test_batches_are_off_by_default(stub, tmp_path):
+    base_url = stub(pages=3, rows_per_page=4, keep_selection=True)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site')
+
+    assert completed
+    exports = list_run_exports(downloads.run_directory)
+    assert [os.path.basename(path) for path in exports] == [export_file_name(page) for page in range(1, 4)]
+
+
+def test_selections_left_by_a_batch_export_are_cleared(stub, tmp_path):
+    base_url = stub(pages=7, rows_per_page=4, keep_selection=True, export_keeps_selection=True)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site', export_batch=3)
+
+    assert completed
+    assert read_sources_file(output_file) == [make_source(i) for i in range(1, 29)]
+    exports = list_run_exports(downloads.run_directory)
+    assert [os.path.basename(path) for path in exports] == [export_file_name(page) for page in (3, 4, 5, 6, 7)]
+    assert [exported_record_ids(path) for path in exports] == [record_ids(1, 12), record_ids(13, 16),
+                                                               record_ids(17, 20), record_ids(21, 24),
+                                                               record_ids(25, 28)]
+    assert CrawlCheckpoint.load(downloads.run_directory).last_page == 7
+
+
+def test_batch_falls_back_to_page_exports_without_kept_selections(stub, tmp_path):
+    base_url = stub(pages=3, rows_per_page=4, keep_selection=False)
+
+    completed, output_file, downloads = crawl(base_url, tmp_path, page_size='site', export_batch=3)
+
+    assert completed
+    exports = list_run_exports(downloads.run_directory)
+    assert [exported_record_ids(path) for path in exports] == [record_ids(1, 4), record_ids(5, 8),
+                                                               record_ids(9, 12)]
+
+
+def test_failed_login_returns_false(stub, tmp_path):
+    base_url = stub(pages=1, rows_per_page=1)
+    downloads = DownloadManager(str(tmp_path))
+
+    completed = crawl_with_http(STUB_USERNAME, 'wrong password', output_file=str(tmp_path / 'sources.txt'),
+                                base_url=base_url, downloads=downloads)
+
+    assert not completed
+    assert list_run_exports(downloads.run_directory) == []
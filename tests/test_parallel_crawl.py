@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from parallel_crawl import RateLimiter, crawl_pages_in_parallel, split_page_range
+
+
+def covered_pages(ranges):
+    return [page for first, last in ranges for page in range(first, last + 1)]
+
+
+@pytest.mark.parametrize('total_pages, workers, first_page, expected', [
+    (10, 1, 1, [(1, 10)]),
+    (10, 3, 1, [(1, 4), (5, 7), (8, 10)]),
+    (10, 4, 2, [(2, 4), (5, 6), (7, 8), (9, 10)]),
+    (2, 5, 1, [(1, 1), (2, 2)]),
+    (5, 2, 6, []),
+    (1, 0, 1, [(1, 1)]),
+])
+def test_split_page_range(total_pages, workers, first_page, expected):
+    assert split_page_range(total_pages, workers, first_page) == expected
+
+
+@pytest.mark.parametrize('align', [1, 3, 10])
+def test_ranges_cover_every_page_once_without_splitting_batches(align):
+    for total_pages in range(1, 40):
+        for workers in (1, 2, 3, 7):
+            for first_page in (1, 2, 5):
+                ranges = split_page_range(total_pages, workers, first_page, align)
+
+                assert covered_pages(ranges) == list(range(first_page, total_pages + 1))
+                assert len(ranges) <= workers
+                assert all(last % align == 0 for first, last in ranges[:-1])
+
+
+def test_aligned_ranges_end_on_batch_boundaries():
+    assert split_page_range(25, 2, align=10) == [(1, 20), (21, 25)]
+    assert split_page_range(25, 3, first_page=7, align=10) == [(7, 10), (11, 20), (21, 25)]
+
+
+class FakeWorker:
+    """Walks pages like a browser: one page at a time, or a jump ahead."""
+
+    def __init__(self, index, fail_at=None):
+        self.index = index
+        self.page = 1
+        self.fail_at = fail_at
+        self.processed = []
+        self.closed = False
+
+    def process_page(self, page_number):
+        assert page_number == self.page
+        if page_number == self.fail_at:
+            raise RuntimeError("page did not load")
+        self.processed.append(page_number)
+        return f"<page {page_number}>"
+
+    def next_page(self, page_number):
+        assert page_number == self.page + 1
+        self.page = page_number
+        return True
+
+    def jump_to_page(self, page_number):
+        self.page = page_number
+        return page_number
+
+    def close(self):
+        self.closed = True
+
+
+def run_crawl(page_ranges, fail_at=None, parse=None):
+    workers = []
+    lock = threading.Lock()
+    delivered = []
+
+    def open_worker(index):
+        worker = FakeWorker(index, fail_at)
+        with lock:
+            workers.append(worker)
+        return worker
+
+    missing = crawl_pages_in_parallel(page_ranges, open_worker, lambda page, result: delivered.append((page, result)),
+                                      parse=parse)
+    return missing, delivered, workers
+
+
+def test_pages_are_delivered_in_order_from_every_worker():
+    missing, delivered, workers = run_crawl(split_page_range(12, 3))
+
+    assert missing == []
+    assert delivered == [(page, f"<page {page}>") for page in range(1, 13)]
+    assert sorted(page for worker in workers for page in worker.processed) == list(range(1, 13))
+    assert all(worker.closed for worker in workers)
+
+
+def test_pipelined_parsing_keeps_the_order():
+    missing, delivered, workers = run_crawl(split_page_range(9, 2), parse=lambda html: html.upper())
+
+    assert missing == []
+    assert delivered == [(page, f"<PAGE {page}>") for page in range(1, 10)]
+
+
+def test_a_failing_page_is_reported_missing_with_the_rest_of_its_range():
+    missing, delivered, workers = run_crawl([(1, 3), (4, 6)], fail_at=5)
+
+    assert missing == [5, 6]
+    assert [page for page, result in delivered if result is not None] == [1, 2, 3, 4]
+    assert [page for page, result in delivered] == list(range(1, 7))
+
+
+def test_rate_limiter_spaces_out_requests(monkeypatch):
+    now = [100.0]
+    sleeps = []
+    monkeypatch.setattr('parallel_crawl.time.monotonic', lambda: now[0])
+    monkeypatch.setattr('parallel_crawl.time.sleep', sleeps.append)
+
+    limiter = RateLimiter(0.5)
+    for _ in range(3):
+        limiter.wait()
+
+    assert sleeps == [0.5, 1.0]
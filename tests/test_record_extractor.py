@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from combase_stub_server import make_record, make_results_page
+from record_extractor import (RECORD_COLUMNS, extract_records, list_run_records, page_records, parse_number,
+                              read_page_records, save_page_records, write_records)
+
+BACKENDS = [None, 'lxml', 'html.parser']
+
+CUSTOM_ROW = """
+<div class="cbRowSummaryResult">
+  <div class="row">
+    <div class="col"><span class="text-primary"> Record&nbsp;ID: </span></div>
+    <div class="col"><span>  B000042 </span></div>
+    <div class="col"><span class="text-primary">Temperature</span></div>
+    <div class="col"><span>n/a</span></div>
+    <div class="col"><span class="text-primary">pH</span></div>
+    <div class="col"><span></span></div>
+    <div class="col"><span class="text-primary">Conditions</span></div>
+    <div class="col"><span>Modified atmosphere</span></div>
+  </div>
+</div>
+"""
+
+
+def expected_record(record_id):
+    record = make_record(record_id)
+    return {'Record ID': record['record_id'], 'Organism': record['organism'], 'Matrix': record['matrix'],
+            'Temperature (C)': float(record['temperature']), 'pH': record['ph'], 'Aw': record['aw'],
+            'Source': record['source']}
+
+
+@pytest.mark.parametrize('text, value', [
+    ('25', 25.0), ('0.997', 0.997), ('-1.5', -1.5), ('+4', 4.0), ('.95', 0.95),
+    ('25 °C', 25.0), ('25°C', 25.0), ('8 °', 8.0), (' 12C ', 12.0),
+    ('', None), (None, None), ('n/a', None), ('5-7', None), ('25 °F', None),
+])
+def test_parse_number(text, value):
+    assert parse_number(text) == value
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stub_page_records_match_the_stub_data(backend):
+    html_content = make_results_page(2, total_pages=3, rows_per_page=5)
+    assert extract_records(html_content, backend) == [expected_record(record_id) for record_id in range(6, 11)]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_labels_and_values_are_cleaned(backend):
+    assert extract_records(CUSTOM_ROW, backend) == [
+        {'Record ID': 'B000042', 'Temperature (C)': None, 'pH': None, 'Conditions': 'Modified atmosphere'}]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('html_content', ['', '   ', None, '<html><body><p>No results</p></body></html>'])
+def test_pages_without_rows_have_no_records(backend, html_content):
+    assert extract_records(html_content, backend) == []
+
+
+def test_records_frame_types_and_column_order():
+    frame = page_records(make_results_page(1, total_pages=1, rows_per_page=3) + CUSTOM_ROW)
+
+    assert list(frame.columns) == RECORD_COLUMNS + ['Conditions']
+    assert str(frame['Record ID'].dtype) == 'string'
+    assert str(frame['Conditions'].dtype) == 'string'
+    assert frame['pH'].dtype == 'float64'
+    assert len(frame) == 4
+    assert frame['Organism'].isna().tolist() == [False, False, False, True]
+    assert pd.isna(frame.loc[3, 'Temperature (C)'])
+
+
+def test_saved_page_records_read_back_the_same(tmp_path):
+    frame = page_records(make_results_page(1, total_pages=1, rows_per_page=3) + CUSTOM_ROW)
+    path = save_page_records(frame, str(tmp_path), 7)
+    save_page_records(frame.head(1), str(tmp_path), 12)
+
+    assert list_run_records(str(tmp_path)) == [path, str(tmp_path / 'ComBaseRecords_page_0012.csv')]
+    pd.testing.assert_frame_equal(read_page_records(path), frame)
+
+
+def test_write_records_combines_pages_as_csv(tmp_path):
+    first = page_records(make_results_page(1, total_pages=2, rows_per_page=2))
+    second = page_records(CUSTOM_ROW)
+
+    count, paths = write_records([first, second], str(tmp_path / 'records.xlsx'), ['csv'])
+    assert count == 3
+    assert paths == [str(tmp_path / 'records_data_records.csv')]
+    combined = pd.read_csv(paths[0], dtype=str, keep_default_na=False)
+    assert list(combined.columns) == RECORD_COLUMNS + ['Conditions']
+    assert combined['Record ID'].tolist() == ['B000001', 'B000002', 'B000042']
+    assert combined['Conditions'].tolist() == ['', '', 'Modified atmosphere']
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+import ntu_fresh_selenium_bs as crawler
+from batch_search import SUMMARY_NAME, SearchQuery
+from crawl_options import CrawlOptions
+
+
+class FakeDriver:
+    def __init__(self, index):
+        self.index = index
+        self.current_url = 'http://combase.test/SearchPage.aspx'
+        self.quit_called = False
+
+    def get_cookies(self):
+        return [{'name': '.ASPXAUTH', 'value': 'token'}, {'name': 'ASP.NET_SessionId', 'value': 'session'}]
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def fake_browsers(monkeypatch):
+    """Replace Chrome with fake drivers and the page crawl with a recorder."""
+    drivers = []
+    crawls = []
+
+    def create_driver(headless=False, downloads=None, browser_index=0, browsing=None):
+        driver = FakeDriver(browser_index)
+        drivers.append(driver)
+        return driver
+
+    def login_to_combase(username, password, options, **kwargs):
+        crawls.append(dict(kwargs, options=options))
+        kwargs['checkpoint'].total_pages = 1
+        kwargs['checkpoint'].finish([])
+        return kwargs['driver']
+
+    monkeypatch.setattr(crawler, 'create_driver', create_driver)
+    monkeypatch.setattr(crawler, 'log_in_browser', lambda *args, **kwargs: None)
+    monkeypatch.setattr(crawler, 'apply_driver_cookies', lambda driver, cookies, search_url: True)
+    monkeypatch.setattr(crawler, 'login_to_combase', login_to_combase)
+    return drivers, crawls
+
+
+def test_batch_crawls_every_query_in_the_started_browsers(tmp_path, fake_browsers):
+    drivers, crawls = fake_browsers
+    queries = [SearchQuery('salmonella spp', ()), SearchQuery('listeria', (('temp', '4'),))]
+
+    options = CrawlOptions(output_file=str(tmp_path / 'sources.txt'), workers=2, page_size='site', export_batch=1)
+    completed = crawler.batch_search_combase('user@example.com', 'secret', queries, str(tmp_path), options)
+
+    assert completed
+    assert sorted(driver.index for driver in drivers) == [0, 1]
+    assert all(driver.quit_called for driver in drivers)
+    assert sorted(crawl['search_term'] for crawl in crawls) == ['listeria', 'salmonella spp']
+    for crawl in crawls:
+        assert crawl['driver'] in drivers
+        assert crawl['search_url'] == 'http://combase.test/SearchPage.aspx'
+        assert crawl['options'].page_size == 'site'
+        # Each query is crawled in its session's browser alone
+        assert crawl['options'].workers == 1
+        assert os.path.dirname(crawl['checkpoint'].path) == crawl['downloads'].run_directory
+    assert len({crawl['options'].output_file for crawl in crawls}) == 2
+    with open(tmp_path / SUMMARY_NAME, 'r', encoding='utf-8') as file:
+        summary = json.load(file)
+    assert [entry['completed'] for entry in summary] == [True, True]
+
+
+def test_batch_fails_when_the_first_browser_cannot_log_in(tmp_path, fake_browsers, monkeypatch):
+    drivers, crawls = fake_browsers
+
+    def log_in_browser(*args, **kwargs):
+        raise RuntimeError("login page did not load")
+
+    monkeypatch.setattr(crawler, 'log_in_browser', log_in_browser)
+    completed = crawler.batch_search_combase('user@example.com', 'secret', [SearchQuery('salmonella spp', ())],
+                                             str(tmp_path))
+
+    assert not completed
+    assert crawls == []
+    assert drivers[0].quit_called
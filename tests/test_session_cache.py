@@ -0,0 +1,74 @@
+import json
+import os
+
+from combase_site import BASE_URL
+from combase_stub_server import STUB_PASSWORD, STUB_USERNAME, start_stub_server
+from http_crawler import HttpCrawler, crawl_with_http
+from session_cache import SessionCache, restore_driver_session
+
+COOKIES = [{'name': '.ASPXAUTH', 'value': 'live-token', 'domain': 'combasebrowser.errc.ars.usda.gov'}]
+LIVE_SEARCH_URL = f"{BASE_URL}/SearchPage.aspx"
+STUB_URL = 'http://127.0.0.1:8765'
+
+
+class FailingDriver:
+    def get(self, url):
+        raise AssertionError(f"opened {url}")
+
+
+def test_entries_are_kept_per_site(tmp_path):
+    cache = SessionCache(str(tmp_path / 'session.json'))
+    cache.save(COOKIES, 'user@example.com', search_url=LIVE_SEARCH_URL)
+    cache.save([{'name': '.ASPXAUTH', 'value': 'stub-token'}], 'user@example.com',
+               search_url=f"{STUB_URL}/SearchPage.aspx")
+
+    assert cache.load('user@example.com')['cookies'] == COOKIES
+    assert cache.load('user@example.com', BASE_URL + '/')['search_url'] == LIVE_SEARCH_URL
+    assert cache.load('user@example.com', STUB_URL)['cookies'][0]['value'] == 'stub-token'
+    assert cache.load('user@example.com', 'http://127.0.0.1:9999') is None
+
+    cache.invalidate('user@example.com', STUB_URL)
+    assert cache.load('user@example.com', STUB_URL) is None
+    assert cache.load('user@example.com') is not None
+
+
+def test_an_entry_for_another_host_is_not_restored(tmp_path):
+    path = str(tmp_path / 'session.json')
+    cache = SessionCache(path)
+    cache.save(COOKIES, 'user@example.com', search_url=LIVE_SEARCH_URL)
+    # An entry whose search page is on another host than its key says
+    with open(path, 'r', encoding='utf-8') as file:
+        entries = json.load(file)
+    entries['127.0.0.1:8765 user@example.com'] = entries.pop('combasebrowser.errc.ars.usda.gov user@example.com')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(entries, file)
+
+    assert cache.load('user@example.com', STUB_URL) is None
+    assert not restore_driver_session(FailingDriver(), cache, 'user@example.com', STUB_URL)
+
+
+def test_stub_crawl_logs_in_instead_of_using_the_live_session(tmp_path, monkeypatch):
+    server = start_stub_server(pages=1, rows_per_page=2)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    cache = SessionCache(str(tmp_path / 'session.json'))
+    cache.save(COOKIES, STUB_USERNAME, search_url=LIVE_SEARCH_URL)
+    requested = []
+    original_get = HttpCrawler.get
+
+    def get(self, url):
+        requested.append(url)
+        return original_get(self, url)
+
+    monkeypatch.setattr(HttpCrawler, 'get', get)
+    try:
+        completed = crawl_with_http(STUB_USERNAME, STUB_PASSWORD, output_file=str(tmp_path / 'sources.txt'),
+                                    base_url=base_url, session_cache=cache, export=False)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert completed
+    assert all(url.startswith(base_url) for url in requested)
+    assert cache.load(STUB_USERNAME, base_url)['search_url'].startswith(base_url)
+    assert cache.load(STUB_USERNAME)['cookies'] == COOKIES
+    assert os.stat(cache.path).st_mode & 0o777 == 0o600
@@ -0,0 +1,54 @@
+import pytest
+
+import source_dedup
+from source_dedup import SourceDeduplicator, dedupe_sources, make_deduplicator, normalize_source
+
+PAPER = 'Smith J. & Jones K. (2001) Growth of Salmonella. J. Food Prot. 64:10-15.'
+PAPER_VARIANT = 'smith j and jones k 2001 growth of salmonella j food prot 64 10 15'
+
+
+@pytest.mark.parametrize('first, second', [
+    (PAPER, PAPER_VARIANT),
+    ('Smith J. et al. (2001) Growth.', 'Smith J (2001) Growth'),
+    ('Smith J. Vol. 3, pp. 10–15', 'smith j 3 10-15'),
+    ('Smith (2001) doi:10.1016/j.fm.2001.01.', 'Smith J. 2001. https://doi.org/10.1016/J.FM.2001.01'),
+])
+def test_citation_variants_share_a_key(first, second):
+    assert normalize_source(first) == normalize_source(second)
+
+
+def test_different_papers_keep_different_keys():
+    assert normalize_source(PAPER) != normalize_source(PAPER.replace('2001', '2002'))
+
+
+def test_exact_mode_drops_only_identical_text():
+    unique, deduplicator = dedupe_sources([PAPER, PAPER_VARIANT, PAPER, 'Other'], mode='exact')
+
+    assert unique == [PAPER, PAPER_VARIANT, 'Other']
+    assert (deduplicator.seen, deduplicator.kept, deduplicator.duplicates) == (4, 3, 1)
+    assert deduplicator.summary() == '4 sources seen, 3 unique, 1 exact duplicates'
+
+
+def test_exact_mode_does_not_normalize(monkeypatch):
+    def fail(source):
+        raise AssertionError('normalize_source called in exact mode')
+
+    monkeypatch.setattr(source_dedup, 'normalize_source', fail)
+    deduplicator = SourceDeduplicator('exact')
+    assert list(deduplicator.filter([PAPER, PAPER, PAPER_VARIANT])) == [PAPER, PAPER_VARIANT]
+
+
+def test_normalized_mode_drops_and_counts_near_duplicates():
+    unique, deduplicator = dedupe_sources([PAPER, PAPER_VARIANT, PAPER, 'Other'], mode='normalized')
+
+    assert unique == [PAPER, 'Other']
+    assert (deduplicator.duplicates, deduplicator.near_duplicates) == (1, 1)
+    assert deduplicator.summary() == '4 sources seen, 2 unique, 1 exact duplicates, 1 near-duplicates'
+
+
+def test_make_deduplicator_modes():
+    assert make_deduplicator(None) is None
+    assert make_deduplicator('none') is None
+    assert make_deduplicator('normalized').mode == 'normalized'
+    with pytest.raises(ValueError):
+        make_deduplicator('fuzzy')
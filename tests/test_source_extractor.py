@@ -0,0 +1,61 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from combase_stub_server import make_results_page
+from source_extractor import PageData, available_backends, extract_page
+
+
+def legacy_extract(html_content):
+    """The original extraction: BeautifulSoup over the whole page, then separate lookups."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    sources = [span.text.strip() for span in soup.find_all('span', id=lambda x: x and x.startswith('lblSource'))]
+    hidden_total_pages = soup.find('input', {'id': 'HiddenTotalPages'})
+    total_pages = int(hidden_total_pages['value']) if hidden_total_pages and hidden_total_pages.get('value') else None
+    checkbox_ids = [element['id'] for element in soup.select('input.exportchk') if element.get('id')]
+    return PageData(sources, total_pages, checkbox_ids)
+
+
+TRICKY_PAGE = """<html><body>
+<input type="hidden" id="HiddenTotalPages" value="12" />
+<div class="cbRowSummaryResult">
+  <input type="checkbox" class="exportchk other" id="chk_1" />
+  <span id="lblSource_0">  Smith &amp; Jones (2001) <b>Growth</b> of <span>Listeria</span> spp.  </span>
+</div>
+<div class="cbRowSummaryResult">
+  <input type="checkbox" class="exportchk" id="chk_2" />
+  <span id="lblSource_1">Caf&eacute; study &#8211; 4&#176;C</span>
+  <span id="lblSourceNote">Second span with the prefix</span>
+</div>
+<span id="notASource">ignored</span>
+</body></html>"""
+
+PAGES = {
+    'stub': make_results_page(3, 7, 25, 'Listeria monocytogenes'),
+    'tricky': TRICKY_PAGE,
+    'empty': '',
+    'no results': '<html><body><p>No records found</p></body></html>',
+}
+
+
+@pytest.mark.parametrize('backend', available_backends())
+@pytest.mark.parametrize('page', sorted(PAGES))
+def test_backends_match_the_legacy_extraction(backend, page):
+    assert extract_page(PAGES[page], backend) == legacy_extract(PAGES[page])
+
+
+def test_stub_page_contents():
+    page_data = extract_page(PAGES['stub'])
+    assert len(page_data.sources) == 25
+    assert page_data.total_pages == 7
+    assert len(page_data.checkbox_ids) == 25
+    assert page_data.records is None
+
+
+def test_invalid_total_pages_is_none():
+    html_content = '<input id="HiddenTotalPages" value="many" />'
+    assert {extract_page(html_content, backend).total_pages for backend in available_backends()} == {None}
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match='Unknown parser backend'):
+        extract_page('<html></html>', 'regex')
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from source_store import SourceStore, source_hash
+from sources_sink import read_sources_file
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCES = [
+    'Smith J. (2001) Growth of Salmonella in chicken at low temperature.',
+    'Jones K. (1999) Survival of Listeria in milk.',
+    'Brown L. (2010) Salmonella in eggs stored at 4 C.',
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SourceStore(str(tmp_path / 'sources.db')) as store:
+        yield store
+
+
+def test_sources_are_stored_once_with_every_sighting(store):
+    assert store.add_sources(SOURCES[:2], page_number=1, search_term='salmonella', record_ids=['B1', 'B2']) == 2
+    assert store.add_sources(SOURCES[1:], page_number=2, search_term='listeria') == 1
+
+    assert store.count() == (3, 4)
+    assert list(store.iter_sources()) == SOURCES
+    assert list(store.iter_sources('listeria')) == SOURCES[1:]
+    sighting = store.connection.execute(
+        'SELECT page_number, search_term, record_id FROM sightings JOIN sources s ON s.id = source_id '
+        'WHERE s.source_hash = ? ORDER BY sightings.id', (source_hash(SOURCES[0]),)).fetchall()
+    assert sighting == [(1, 'salmonella', 'B1')]
+
+
+def test_search_finds_sources_by_words(store):
+    store.add_sources(SOURCES, page_number=1)
+    store.add_sources(SOURCES[:1], page_number=2)
+
+    assert store.search('salmonella AND chicken') == [(SOURCES[0], 2)]
+    assert sorted(source for source, _ in store.search('salmonella')) == sorted([SOURCES[0], SOURCES[2]])
+    assert store.search('salmonella', limit=1)[0][0] in (SOURCES[0], SOURCES[2])
+
+
+def test_export_writes_a_numbered_sources_file(store, tmp_path):
+    store.add_sources(SOURCES, search_term='salmonella')
+    output_file = str(tmp_path / 'exported.txt')
+
+    assert store.export(output_file) == 3
+    assert read_sources_file(output_file) == SOURCES
+
+
+def test_query_with_bad_syntax_prints_a_message(store, tmp_path):
+    if not store.has_fts:
+        pytest.skip('SQLite was built without FTS5')
+    store.add_sources(SOURCES)
+    store.close()
+
+    result = subprocess.run([sys.executable, os.path.join(REPO_ROOT, 'source_store.py'),
+                             '--db', str(tmp_path / 'sources.db'), 'query', 'E. coli AND'],
+                            capture_output=True, text=True)
+
+    assert result.returncode == 1
+    assert "Cannot search for 'E. coli AND'" in result.stdout
+    assert 'Traceback' not in result.stderr
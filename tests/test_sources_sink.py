@@ -0,0 +1,83 @@
+from sources_sink import SourcesSink, read_sources_file
+from source_dedup import SourceDeduplicator
+
+
+def legacy_file_content(sources):
+    """What the original per-page append loop wrote: "N. source" entries separated by blank lines."""
+    return ''.join(f"{number}. {source}\n\n" for number, source in enumerate(sources, 1))
+
+
+def test_numbered_entries_match_the_legacy_format(tmp_path):
+    output_file = str(tmp_path / 'sources.txt')
+    sources = ['First source (2001)', 'Second source. With a period', 'First source (2001)']
+
+    with SourcesSink(output_file, truncate=True) as sink:
+        assert sink.extend(sources[:2]) == 2
+        assert sink.append(sources[2])
+
+    assert sink.count == 3
+    with open(output_file, 'r', encoding='utf-8') as file:
+        assert file.read() == legacy_file_content(sources)
+    assert read_sources_file(output_file) == sources
+
+
+def test_appending_continues_the_numbering(tmp_path):
+    output_file = str(tmp_path / 'sources.txt')
+    with SourcesSink(output_file, truncate=True) as sink:
+        sink.extend(['a', 'b'])
+
+    with SourcesSink(output_file) as sink:
+        assert sink.count == 2
+        sink.extend(['c'])
+
+    with open(output_file, 'r', encoding='utf-8') as file:
+        assert file.read() == legacy_file_content(['a', 'b', 'c'])
+
+
+def test_start_count_skips_the_rescan(tmp_path):
+    output_file = str(tmp_path / 'sources.txt')
+    with SourcesSink(output_file, truncate=True) as sink:
+        sink.extend(['a', 'b'])
+
+    with SourcesSink(output_file, start_count=2) as sink:
+        sink.append('c')
+
+    assert read_sources_file(output_file) == ['a', 'b', 'c']
+    with open(output_file, 'r', encoding='utf-8') as file:
+        assert file.read().startswith('1. a\n\n2. b\n\n3. c')
+
+
+def test_file_without_trailing_separator_gets_one(tmp_path):
+    output_file = tmp_path / 'sources.txt'
+    output_file.write_text('1. a', encoding='utf-8')
+
+    with SourcesSink(str(output_file)) as sink:
+        sink.append('b')
+
+    assert output_file.read_text(encoding='utf-8') == '1. a\n\n2. b\n\n'
+
+
+def test_writes_are_buffered_until_the_batch_is_full(tmp_path):
+    output_file = tmp_path / 'sources.txt'
+    sink = SourcesSink(str(output_file), truncate=True, batch_size=3)
+    sink.extend(['a', 'b'])
+    assert output_file.read_text(encoding='utf-8') == ''
+    sink.append('c')
+    assert read_sources_file(str(output_file)) == ['a', 'b', 'c']
+    sink.append('d')
+    sink.close()
+    assert sink.closed
+    assert read_sources_file(str(output_file)) == ['a', 'b', 'c', 'd']
+
+
+def test_deduplicator_is_seeded_from_an_appended_file(tmp_path):
+    output_file = str(tmp_path / 'sources.txt')
+    with SourcesSink(output_file, truncate=True) as sink:
+        sink.extend(['a', 'b'])
+
+    with SourcesSink(output_file, deduplicator=SourceDeduplicator('exact'), keep_sources=True) as sink:
+        assert sink.extend(['b', 'c', 'a', 'c']) == 1
+        assert sink.sources == ['c']
+        assert len(sink) == 3
+
+    assert read_sources_file(output_file) == ['a', 'b', 'c']